@@ -16,8 +16,10 @@ from .api.user_routes import user_routes
 from .api.course_request_routes import course_request_routes
 from .api.track_routes import track_routes
 from .api.community_routes import community_routes
+from .api.leaderboard_routes import leaderboard_routes
 
 from .seeds import seed_commands
+from .jobs import community_commands, moderation_commands, course_commands, points_commands, art_commands
 
 from .config import Config
 
@@ -41,6 +43,13 @@ def load_user(id):
 # Tell flask about our seed commands
 app.cli.add_command(seed_commands)
 
+# Tell flask about our maintenance jobs
+app.cli.add_command(community_commands)
+app.cli.add_command(moderation_commands)
+app.cli.add_command(course_commands)
+app.cli.add_command(points_commands)
+app.cli.add_command(art_commands)
+
 app.config.from_object(Config)
 app.register_blueprint(user_routes, url_prefix="/api/users")
 app.register_blueprint(auth_routes, url_prefix="/api/auth")
@@ -53,6 +62,7 @@ app.register_blueprint(teacher_routes, url_prefix="/api/teachers")
 app.register_blueprint(course_request_routes, url_prefix="/api/course_requests")
 app.register_blueprint(track_routes, url_prefix="/api/tracks")
 app.register_blueprint(community_routes, url_prefix="/api/community")
+app.register_blueprint(leaderboard_routes, url_prefix="/api/leaderboards")
 db.init_app(app)
 Migrate(app, db)
 
@@ -0,0 +1,297 @@
+# api/art_helpers.py
+from flask import current_app
+from app.models import db, Art, ArtFeedback
+from .aws_helpers import BUCKET_NAME, get_binary_file, upload_bytes_to_s3, key_from_url
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import selectinload
+from sqlalchemy.sql import func
+from datetime import datetime, timedelta
+import io
+import os
+import threading
+
+# ---------------IMAGE VARIANTS----------------
+#
+# Galleries show resized copies of each upload instead of the original (which
+# can be up to 50MB). Variants are rendered with Pillow in worker processes,
+# so resizing never holds up a request or the GIL, and uploaded next to the
+# original as <original name>_<variant>.<ext>.
+
+# name: (longest side in pixels, format, quality)
+ART_VARIANTS = {
+    'thumbnail': (320, 'JPEG', 80),
+    'thumbnail_webp': (320, 'WEBP', 75),
+    'medium': (1280, 'JPEG', 85),
+    'medium_webp': (1280, 'WEBP', 80),
+}
+
+VARIANT_FORMATS = {
+    'JPEG': ('jpg', 'image/jpeg'),
+    'WEBP': ('webp', 'image/webp'),
+}
+
+ART_VARIANT_WORKERS = int(os.environ.get('ART_VARIANT_WORKERS', 2))
+
+# EXIF orientations that rotate the image by 90 degrees
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+# Runs in a worker: returns the original's (width, height) and
+# {name: (bytes, width, height)} for every variant
+def render_variants(data):
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as original:
+        width, height = original.size
+        if original.getexif().get(0x0112) in TRANSPOSED_ORIENTATIONS:
+            width, height = height, width
+
+        # Let JPEGs decode straight at a reduced scale, which is much faster
+        # than decoding every pixel and shrinking afterwards
+        largest = max(max_side for max_side, _, _ in ART_VARIANTS.values())
+        original.draft('RGB', (largest, largest))
+
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or 'A' in image.mode else 'RGB')
+
+    # Each size is shrunk from the next larger one rather than from the original
+    resized = {}
+    for max_side in sorted({max_side for max_side, _, _ in ART_VARIANTS.values()}, reverse=True):
+        image = image.copy()
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        resized[max_side] = image
+
+    rendered = {}
+    for name, (max_side, image_format, quality) in ART_VARIANTS.items():
+        image = resized[max_side]
+        if image_format == 'JPEG' and image.mode == 'RGBA':
+            # JPEG has no alpha channel, so transparent areas become white
+            flattened = Image.new('RGB', image.size, (255, 255, 255))
+            flattened.paste(image, mask=image.getchannel('A'))
+            image = flattened
+        buffer = io.BytesIO()
+        image.save(buffer, image_format, quality=quality, optimize=True)
+        rendered[name] = (buffer.getvalue(), image.width, image.height)
+
+    return (width, height), rendered
+
+# Upload rendered variants next to the original, returning the variants
+# column's value, or None if any upload failed
+def upload_variants(media_url, rendered):
+    stem = key_from_url(media_url).rsplit('.', 1)[0]
+    variants = {}
+    for name, (data, width, height) in rendered.items():
+        image_format = ART_VARIANTS[name][1]
+        extension, content_type = VARIANT_FORMATS[image_format]
+        response = upload_bytes_to_s3(data, f'{stem}_{name}.{extension}', content_type)
+        if 'url' not in response:
+            return None
+        variants[name] = {'url': response['url'], 'width': width, 'height': height, 'format': extension}
+    return variants
+
+# Record the outcome of rendering an artwork's variants (does not commit)
+def save_variants(art_id, variants, size):
+    values = {Art.variants_status: 'failed', Art.updated_date: Art.updated_date}
+    if variants is not None:
+        values.update({
+            Art.variants: variants,
+            Art.variants_status: 'ready',
+            Art.width: size[0],
+            Art.height: size[1],
+        })
+    Art.query.filter_by(id=art_id).update(values, synchronize_session=False)
+
+# Upload and record the variants rendered by a render_variants future (does
+# not commit). Returns whether the artwork's variants are now ready.
+def store_variants(art_id, media_url, rendering):
+    try:
+        size, rendered = rendering.result()
+    except Exception as e:
+        current_app.logger.warning(f"Could not render variants of art {art_id}: {e}")
+        save_variants(art_id, None, None)
+        return False
+
+    variants = upload_variants(media_url, rendered)
+    save_variants(art_id, variants, size)
+    return variants is not None
+
+# ---------------AFTER UPLOAD----------------
+
+# Created on first use in each server process. The threads only wait on the
+# worker processes and S3, so one per worker is enough.
+variant_pools = {}
+variant_pools_lock = threading.Lock()
+
+def get_variant_pools():
+    with variant_pools_lock:
+        if not variant_pools:
+            variant_pools['processes'] = ProcessPoolExecutor(max_workers=ART_VARIANT_WORKERS)
+            variant_pools['threads'] = ThreadPoolExecutor(max_workers=ART_VARIANT_WORKERS)
+    return variant_pools['processes'], variant_pools['threads']
+
+def generate_variants_in_background(app, art_id, media_url, data):
+    processes, _ = get_variant_pools()
+    with app.app_context():
+        if data is None:
+            data = get_binary_file(BUCKET_NAME, key_from_url(media_url))
+        if isinstance(data, Exception):
+            save_variants(art_id, None, None)
+        else:
+            store_variants(art_id, media_url, processes.submit(render_variants, data))
+        db.session.commit()
+
+# Queue an uploaded artwork's variants to be rendered once the request is done
+# with it. Call after the artwork is committed. Pass the original's bytes if
+# the request has them; otherwise (direct uploads) they are fetched from S3.
+# Anything that doesn't finish (a failure, a restart) is picked up by
+# `flask art generate-variants`.
+def schedule_variants(art_id, media_url, data=None):
+    _, threads = get_variant_pools()
+    threads.submit(generate_variants_in_background, current_app._get_current_object(), art_id, media_url, data)
+
+# ---------------BACKFILL----------------
+
+# Render the variants of every artwork that doesn't have them yet, in id order,
+# batch_size originals at a time. Returns how many became ready and failed.
+def backfill_variants(batch_size=50, workers=None):
+    counts = {'ready': 0, 'failed': 0}
+    after_id = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            batch = db.session.query(Art.id, Art.media_url).filter(
+                Art.id > after_id, Art.variants_status != 'ready'
+            ).order_by(Art.id).limit(batch_size).all()
+            if not batch:
+                break
+
+            # Each original starts rendering as soon as it is downloaded,
+            # while the rest of the batch downloads
+            renderings = []
+            for art_id, media_url in batch:
+                data = get_binary_file(BUCKET_NAME, key_from_url(media_url))
+                if isinstance(data, Exception):
+                    save_variants(art_id, None, None)
+                    counts['failed'] += 1
+                    continue
+                renderings.append((art_id, media_url, pool.submit(render_variants, data)))
+
+            for art_id, media_url, rendering in renderings:
+                counts['ready' if store_variants(art_id, media_url, rendering) else 'failed'] += 1
+
+            db.session.commit()
+            after_id = batch[-1][0]
+
+    return counts
+
+# ---------------FEEDBACK QUEUE----------------
+#
+# Artworks open to feedback form a queue that teachers claim from. A claim is
+# a lease: the artwork is held for the teacher until it expires, after which
+# anyone can claim it again, so an abandoned review never blocks an artwork.
+
+FEEDBACK_CLAIM_MINUTES = int(os.environ.get('FEEDBACK_CLAIM_MINUTES', 15))
+
+# Artworks waiting for feedback that nobody holds a live claim on
+def claimable(now):
+    return and_(
+        Art.open_to_feedback == True,
+        or_(Art.feedback_claimed_by.is_(None), Art.feedback_claim_expires < now)
+    )
+
+# Queued artworks, oldest first, optionally for one course
+def feedback_queue(course_id=None):
+    query = Art.query.filter(claimable(datetime.utcnow()))
+    if course_id is not None:
+        query = query.filter(Art.course_id == course_id)
+    return query.order_by(Art.created_date, Art.id)
+
+# Claim up to limit of the oldest queued artworks for a teacher (does not
+# commit). On postgres the candidates are locked with SKIP LOCKED, so
+# concurrent claims pass over each other's rows instead of waiting on them;
+# elsewhere the conditional UPDATE alone decides who wins a contested row.
+# Returns the artworks the teacher now holds.
+def claim_feedback(teacher_id, limit, course_id=None):
+    now = datetime.utcnow()
+    expires = now + timedelta(minutes=FEEDBACK_CLAIM_MINUTES)
+
+    candidates = feedback_queue(course_id).with_entities(Art.id).limit(limit)
+    if db.engine.dialect.name == 'postgresql':
+        candidates = candidates.with_for_update(skip_locked=True)
+    candidate_ids = [art_id for (art_id,) in candidates]
+    if not candidate_ids:
+        return []
+
+    Art.query.filter(Art.id.in_(candidate_ids), claimable(now)).update({
+        Art.feedback_claimed_by: teacher_id,
+        Art.feedback_claim_expires: expires,
+        Art.updated_date: Art.updated_date
+    }, synchronize_session=False)
+
+    # Rows another teacher claimed first kept their own claim
+    return Art.query.filter(
+        Art.id.in_(candidate_ids), Art.feedback_claimed_by == teacher_id, Art.feedback_claim_expires == expires
+    ).options(selectinload(Art.feedback)).order_by(Art.created_date, Art.id).all()
+
+# Give up a teacher's claim on an artwork, returning False if they didn't hold
+# it (does not commit)
+def release_feedback_claim(art_id, teacher_id):
+    return bool(Art.query.filter(
+        Art.id == art_id, Art.feedback_claimed_by == teacher_id
+    ).update({
+        Art.feedback_claimed_by: None,
+        Art.feedback_claim_expires: None,
+        Art.updated_date: Art.updated_date
+    }, synchronize_session=False))
+
+# Record a teacher's feedback and take the artwork off the queue, unless it
+# was already reviewed or another teacher holds a live claim on it. Returns
+# the feedback entry, or None (does not commit).
+def give_feedback(art_id, teacher, text):
+    now = datetime.utcnow()
+    closed = Art.query.filter(
+        Art.id == art_id,
+        Art.open_to_feedback == True,
+        or_(
+            Art.feedback_claimed_by.is_(None),
+            Art.feedback_claimed_by == teacher.id,
+            Art.feedback_claim_expires < now
+        )
+    ).update({
+        Art.open_to_feedback: False,
+        Art.feedback_claimed_by: None,
+        Art.feedback_claim_expires: None
+    }, synchronize_session=False)
+    if not closed:
+        return None
+
+    entry = ArtFeedback(
+        art_id=art_id,
+        teacher_id=teacher.id,
+        teacher_name=f"{teacher.first_name} {teacher.last_name}",
+        feedback=text,
+        created_date=now
+    )
+    db.session.add(entry)
+    return entry
+
+# Queue depth per course (None for gallery art outside any course): how many
+# artworks are waiting, how many of those are claimed and the oldest wait
+def feedback_queue_stats():
+    now = datetime.utcnow()
+    claimed = and_(Art.feedback_claimed_by.isnot(None), Art.feedback_claim_expires >= now)
+    rows = db.session.query(
+        Art.course_id,
+        func.count(Art.id),
+        func.count(Art.id).filter(claimed),
+        func.min(Art.created_date)
+    ).filter(Art.open_to_feedback == True).group_by(Art.course_id).order_by(Art.course_id).all()
+
+    return [{
+        'course_id': course_id,
+        'open': open_count,
+        'claimed': claimed_count,
+        'available': open_count - claimed_count,
+        'oldest_date': oldest.isoformat() if oldest else None
+    } for course_id, open_count, claimed_count, oldest in rows]
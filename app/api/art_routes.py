@@ -2,16 +2,51 @@ from flask import Blueprint, request, jsonify
 from app.models import db, Art, Student, Teacher
 from app.forms import ArtForm
 from flask_login import current_user, login_required
-from ..api.aws_helpers import get_unique_filename, upload_file_to_s3
+from sqlalchemy.exc import IntegrityError
+from ..api.aws_helpers import get_unique_filename, upload_file_to_s3, direct_upload_key, direct_upload_prefix, create_presigned_upload, get_uploaded_object
 import os
-from .helper_functions import award_points, is_allowed_file, file_size_under_limit
+from .helper_functions import award_points, is_id, is_allowed_file, file_size_under_limit, direct_upload_error, MAX_FILE_SIZE
+from .course_helpers import invalidate_course
+from .art_helpers import schedule_variants, feedback_queue, claim_feedback, release_feedback_claim, give_feedback, feedback_queue_stats
+from .community_helpers import encode_cursor, decode_cursor, cursor_id, cursor_date
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import selectinload
 from datetime import datetime
+import mimetypes
 
 art_routes = Blueprint('art', __name__)
 
+# Points for uploading a piece of art
+ART_UPLOAD_POINTS = 20
+
+ART_EXTENSIONS = {"jpg", "jpeg", "png", "gif"}
+
 # ------- UPLOADING ART -------
 
-# Upload art
+# Save a new piece of art from a validated ArtForm, award its points and queue
+# its gallery variants. data is the original's bytes, if the request has them.
+def create_art(student, form, media_url, data=None):
+    new_art = Art(
+        name=form.name.data,
+        type=form.type.data,
+        user_id=student.id,
+        course_id=form.course_id.data,
+        media_url=media_url,
+        public=form.public.data if 'public' in form else True,
+        open_to_feedback=form.open_to_feedback.data if 'open_to_feedback' in form else False
+    )
+    db.session.add(new_art)
+    db.session.flush()
+    award_points(student.id, ART_UPLOAD_POINTS, 'art_upload', new_art.id, new_art.course_id)
+    db.session.commit()
+    schedule_variants(new_art.id, new_art.media_url, data)
+    # Course dicts list the art submitted to them
+    if new_art.course_id:
+        invalidate_course(new_art.course_id)
+    return new_art
+
+# Upload art through the server. Prefer the direct upload below for anything
+# large, which doesn't hold a worker for the whole transfer.
 
 @art_routes.route('', methods=['POST'])
 @login_required
@@ -29,53 +64,114 @@ def upload_art():
 
     if form.validate_on_submit():
         file = request.files.get('file')
-        if file and is_allowed_file(file.filename, {"jpg", "jpeg", "png", "gif"}) and file_size_under_limit(file):
+        if file and is_allowed_file(file.filename, ART_EXTENSIONS) and file_size_under_limit(file):
             file_name = get_unique_filename(file.filename)
+            # Kept for rendering the gallery variants once the upload is saved
+            data = file.read()
+            file.seek(0)
             file_url_response = upload_file_to_s3(file, file_name)
 
             if "url" in file_url_response:
-                new_art = Art(
-                    name=form.name.data,
-                    type=form.type.data,
-                    user_id=student.id,
-                    course_id=form.course_id.data,
-                    media_url=file_url_response["url"],
-                    public=form.public.data if 'public' in form else True,
-                    open_to_feedback=form.open_to_feedback.data if 'open_to_feedback' in form else False
-                )
-                db.session.add(new_art)
-                db.session.commit()
-                award_points(student, 20)
+                new_art = create_art(student, form, file_url_response["url"], data)
                 return jsonify(new_art.to_dict()), 201
             else:
                 error_message = file_url_response.get("errors", "Unknown error during file upload.")
                 return jsonify({"errors": f"File upload failed: {error_message}"}), 500
         else:
-            if not is_allowed_file(file.filename, {"jpg", "jpeg", "png", "gif"}):
+            if not is_allowed_file(file.filename, ART_EXTENSIONS):
                 return jsonify({"error": "File type not allowed"}), 400
             if not file_size_under_limit(file):
                 return jsonify({"error": "File size exceeds limit"}), 400
 
     return jsonify({'errors': form.errors}), 400
 
+# Start a direct upload: returns a presigned POST the browser sends the image
+# to, limited by its policy to this key, content type and size
+@art_routes.route('/uploads', methods=['POST'])
+@login_required
+def start_art_upload():
+    """
+    filename: Name of the image being uploaded (jpg, jpeg, png or gif)
+    size: Its size in bytes
+
+    POST the file to upload.url with upload.fields as form fields, then call
+    /api/art/uploads/confirm with upload.key.
+    """
+    if current_user.type != 'student':
+        return jsonify({'errors': 'Only students can upload art'}), 403
+
+    data = request.get_json(silent=True) or {}
+    filename = data.get('filename')
+    error = direct_upload_error(filename, data.get('size'), ART_EXTENSIONS)
+    if error:
+        return jsonify({'errors': error}), 400
+
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    upload = create_presigned_upload(direct_upload_key('art', current_user.id, filename), content_type, MAX_FILE_SIZE)
+    if 'errors' in upload:
+        return jsonify({'errors': f"Could not start upload: {upload['errors']}"}), 500
+    return jsonify({'upload': upload}), 200
+
+# Finish a direct upload: checks the object in S3 and saves the art
+@art_routes.route('/uploads/confirm', methods=['POST'])
+@login_required
+def confirm_art_upload():
+    """
+    key: The upload.key from /api/art/uploads
+    name, type, course_id, public, open_to_feedback: As for uploading through the server
+    """
+    if current_user.type != 'student':
+        return jsonify({'errors': 'Only students can upload art'}), 403
+
+    student = Student.query.filter_by(user_id=current_user.id).first()
+    if not student:
+        return jsonify({'errors': 'Student not found'}), 404
+
+    form = ArtForm()
+    form['csrf_token'].data = request.cookies['csrf_token']
+    form.user_id.data = student.user_id
+    if not form.validate_on_submit():
+        return jsonify({'errors': form.errors}), 400
+
+    key = (request.get_json(silent=True) or {}).get('key')
+    if not isinstance(key, str) or not key.startswith(direct_upload_prefix('art', current_user.id)):
+        return jsonify({'errors': 'Unknown upload'}), 403
+
+    uploaded = get_uploaded_object(key)
+    if uploaded is None:
+        return jsonify({'errors': 'The file has not been uploaded'}), 400
+    if 'errors' in uploaded:
+        return jsonify({'errors': f"Could not check upload: {uploaded['errors']}"}), 500
+    if uploaded['size'] > MAX_FILE_SIZE or not (uploaded['content_type'] or '').startswith('image/'):
+        return jsonify({'errors': 'Uploaded file is not an allowed image'}), 400
+
+    # The unique media_url settles concurrent confirmations of the same key
+    # before any points are awarded
+    try:
+        new_art = create_art(student, form, uploaded['url'])
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'errors': 'Upload already confirmed'}), 409
+    return jsonify(new_art.to_dict()), 201
+
 # ------- GETTING ALL THE ART IN VARIOUS WAYS -------
 
 # Get all art
 @art_routes.route('/', methods=['GET'])
 def get_all_art():
-    artworks = Art.query.all()
+    artworks = Art.query.options(selectinload(Art.feedback)).all()
     return jsonify([art.to_dict() for art in artworks])
 
 # Get all art based on user
 @art_routes.route('/user/<int:user_id>', methods=['GET'])
 def get_art_by_user(user_id):
-    artworks = Art.query.filter_by(user_id=user_id).all()
+    artworks = Art.query.filter_by(user_id=user_id).options(selectinload(Art.feedback)).all()
     return jsonify([art.to_dict() for art in artworks])
 
 # Get all art based on course
 @art_routes.route('/course/<int:course_id>', methods=['GET'])
 def get_art_by_course(course_id):
-    artworks = Art.query.filter_by(course_id=course_id).all()
+    artworks = Art.query.filter_by(course_id=course_id).options(selectinload(Art.feedback)).all()
     return jsonify([art.to_dict() for art in artworks])
 
 #------- FEEDBACK ON ART -------
@@ -99,16 +195,12 @@ def submit_feedback(art_id):
         return jsonify({'errors': 'Teacher not found'}), 404
 
     feedback_data = request.get_json()
-    feedback = {
-        "teacher_id": teacher.id,
-        "teacher_name": f"{teacher.first_name} {teacher.last_name}",
-        "feedback": feedback_data.get('feedback', ''),
-        "date": datetime.utcnow().isoformat()
-    }
-    art.feedback.append(feedback)
-    art.open_to_feedback = False  # Close feedback once provided
+    # Closes feedback once provided, unless someone else got there first
+    if not give_feedback(art.id, teacher, feedback_data.get('feedback', '')):
+        return jsonify({'errors': 'Art was already reviewed or is claimed by another teacher'}), 409
     db.session.commit()
 
+    db.session.refresh(art)
     return jsonify(art.to_dict()), 200
 
 # Get all art open to feedback
@@ -118,7 +210,7 @@ def get_open_to_feedback_art():
     if current_user.type != 'teacher':
         return jsonify({'errors': 'Only teachers can view this list'}), 403
 
-    artworks = Art.query.filter_by(open_to_feedback=True).all()
+    artworks = Art.query.filter_by(open_to_feedback=True).options(selectinload(Art.feedback)).all()
     return jsonify([art.to_dict() for art in artworks]), 200
 
 # Get all art open to feedback in a speciifc course
@@ -128,7 +220,7 @@ def get_open_to_feedback_art_by_course(course_id):
     if current_user.type != 'teacher':
         return jsonify({'errors': 'Only teachers can view this list'}), 403
 
-    artworks = Art.query.filter_by(course_id=course_id, open_to_feedback=True).all()
+    artworks = Art.query.filter_by(course_id=course_id, open_to_feedback=True).options(selectinload(Art.feedback)).all()
     return jsonify([art.to_dict() for art in artworks]), 200
 
 # Get all art that has not received feedback yet
@@ -138,7 +230,7 @@ def get_no_feedback_art():
     if current_user.type != 'teacher':
         return jsonify({'errors': 'Only teachers can view this list'}), 403
 
-    artworks = Art.query.filter(Art.open_to_feedback == True, Art.feedback == []).all()
+    artworks = Art.query.filter(Art.open_to_feedback == True, ~Art.feedback.any()).order_by(Art.created_date, Art.id).options(selectinload(Art.feedback)).all()
     return jsonify([art.to_dict() for art in artworks]), 200
 
 # Get all art that has not received feedback yet in a specific course
@@ -148,9 +240,112 @@ def get_no_feedback_art_by_course(course_id):
     if current_user.type != 'teacher':
         return jsonify({'errors': 'Only teachers can view this list'}), 403
 
-    artworks = Art.query.filter(Art.course_id == course_id, Art.open_to_feedback == True, Art.feedback == []).all()
+    artworks = Art.query.filter(
+        Art.course_id == course_id, Art.open_to_feedback == True, ~Art.feedback.any()
+    ).order_by(Art.created_date, Art.id).options(selectinload(Art.feedback)).all()
+    return jsonify([art.to_dict() for art in artworks]), 200
+
+#------- FEEDBACK QUEUE -------
+
+MAX_FEEDBACK_QUEUE_PAGE = 100
+MAX_FEEDBACK_CLAIMS = 10
+
+# List the artworks waiting for feedback that nobody has claimed, oldest first
+@art_routes.route('/feedback_queue', methods=['GET'])
+@login_required
+def get_feedback_queue():
+    """
+    course_id: Only list art submitted to this course
+    per_page: Number of artworks per page (at most 100)
+    cursor: Pass the next_cursor from the previous response to get the next page
+    """
+    if current_user.type != 'teacher':
+        return jsonify({'errors': 'Only teachers can view the feedback queue'}), 403
+
+    course_id = request.args.get('course_id', type=int)
+    per_page = min(request.args.get('per_page', 20, type=int), MAX_FEEDBACK_QUEUE_PAGE)
+    if per_page < 1:
+        return jsonify({'errors': 'per_page must be positive'}), 400
+
+    queue = feedback_queue(course_id)
+    cursor = request.args.get('cursor')
+    if cursor:
+        cursor_state = decode_cursor(cursor, ['feedback_queue', course_id], {'created_date': cursor_date, 'id': cursor_id})
+        if not cursor_state:
+            return jsonify({'errors': 'Invalid cursor'}), 400
+        created_date = cursor_state['created_date']
+        queue = queue.filter(or_(
+            Art.created_date > created_date,
+            and_(Art.created_date == created_date, Art.id > cursor_state['id'])
+        ))
+
+    artworks = queue.options(selectinload(Art.feedback)).limit(per_page + 1).all()
+    has_more = len(artworks) > per_page
+    artworks = artworks[:per_page]
+
+    return jsonify({
+        'art': [art.to_dict() for art in artworks],
+        'next_cursor': encode_cursor({
+            'listing': ['feedback_queue', course_id],
+            'created_date': artworks[-1].created_date.isoformat(),
+            'id': artworks[-1].id
+        }) if has_more else None,
+        'has_more': has_more
+    }), 200
+
+# Claim the oldest queued artworks to review. Each is held for the teacher
+# until the claim expires, so concurrent teachers are handed different art.
+@art_routes.route('/feedback_queue/claim', methods=['POST'])
+@login_required
+def claim_feedback_queue():
+    """
+    course_id: Only claim art submitted to this course
+    limit: Number of artworks to claim (at most 10)
+    """
+    if current_user.type != 'teacher':
+        return jsonify({'errors': 'Only teachers can claim art for feedback'}), 403
+
+    teacher = Teacher.query.filter_by(user_id=current_user.id).first()
+    if not teacher:
+        return jsonify({'errors': 'Teacher not found'}), 404
+
+    data = request.get_json(silent=True) or {}
+    course_id = data.get('course_id')
+    limit = data.get('limit', 1)
+    if not isinstance(limit, int) or not 1 <= limit <= MAX_FEEDBACK_CLAIMS:
+        return jsonify({'errors': f'limit must be between 1 and {MAX_FEEDBACK_CLAIMS}'}), 400
+    if course_id is not None and not is_id(course_id):
+        return jsonify({'errors': 'course_id must be a course id'}), 400
+
+    artworks = claim_feedback(teacher.id, limit, course_id)
+    db.session.commit()
     return jsonify([art.to_dict() for art in artworks]), 200
 
+# Hand a claimed artwork back to the queue without reviewing it
+@art_routes.route('/<int:art_id>/feedback_claim', methods=['DELETE'])
+@login_required
+def release_feedback(art_id):
+    if current_user.type != 'teacher':
+        return jsonify({'errors': 'Only teachers can release claims'}), 403
+
+    teacher = Teacher.query.filter_by(user_id=current_user.id).first()
+    if not teacher:
+        return jsonify({'errors': 'Teacher not found'}), 404
+
+    if not release_feedback_claim(art_id, teacher.id):
+        return jsonify({'errors': 'You have not claimed this art'}), 404
+    db.session.commit()
+    return jsonify({'message': 'Claim released'}), 200
+
+# Get the depth of the feedback queue per course
+@art_routes.route('/feedback_queue/stats', methods=['GET'])
+@login_required
+def get_feedback_queue_stats():
+    if current_user.type != 'teacher':
+        return jsonify({'errors': 'Only teachers can view the feedback queue'}), 403
+
+    return jsonify(feedback_queue_stats()), 200
+
 # ------- DELETING ART -------
 
 # Delete art
@@ -164,6 +359,9 @@ def delete_art(art_id):
     if current_user.id != art.user_id:
         return jsonify({'errors': 'You do not have permission to delete this art'}), 403
 
+    course_id = art.course_id
     db.session.delete(art)
     db.session.commit()
+    if course_id:
+        invalidate_course(course_id)
     return jsonify({'message': 'Art deleted successfully'}), 200
@@ -98,13 +98,104 @@ def upload_file_to_s3(file, filename, acl="public-read"):
         return {"errors": error_msg}
 
 
+# Upload in-memory content (e.g. a generated image) under the given key
+def upload_bytes_to_s3(data, filename, content_type, acl="public-read"):
+    try:
+        logger.info(
+            f"Uploading {filename} to S3 with Content-Type: {content_type} and ACL: {acl}"
+        )
+        s3.put_object(
+            Body=data,
+            Bucket=BUCKET_NAME,
+            Key=filename,
+            ACL=acl,
+            ContentType=content_type,
+            CacheControl="public, max-age=31536000, immutable",
+        )
+
+        return {"url": f"{S3_LOCATION}{filename}"}
+
+    except botocore.exceptions.ClientError as e:
+        error_code = e.response["Error"]["Code"]
+        error_msg = f"S3 Error [{error_code}]: {str(e)}"
+        logger.error(f"Error uploading file to S3: {error_msg}")
+        return {"errors": error_msg}
+
+    except Exception as e:
+        error_msg = f"Unknown error: {str(e)}"
+        logger.error(f"Error uploading file to S3: {error_msg}")
+        return {"errors": error_msg}
+
+
 def remove_file_from_s3(url):
     # AWS needs the image file name, not the URL,
     # so you split that out of the URL
-    key = url.rsplit("/", 1)[1]
+    key = key_from_url(url)
     try:
         s3.delete_object(Bucket=BUCKET_NAME, Key=key)
     except Exception as e:
         return {"errors": str(e)}
     return True
 
+
+# The object key behind a URL returned by the upload helpers. Direct uploads
+# live under per-user prefixes, so the key can contain slashes.
+def key_from_url(url):
+    if url.startswith(S3_LOCATION):
+        return url[len(S3_LOCATION):]
+    return url.rsplit("/", 1)[1]
+
+
+# ---------------DIRECT UPLOADS----------------
+#
+# Large files go straight from the browser to S3: the server hands out a
+# presigned POST whose policy pins the key, content type and size range, and
+# the client confirms once the upload is done so the server can check the
+# object with a HEAD before recording it.
+
+DIRECT_UPLOAD_EXPIRES = 600  # Seconds a presigned upload stays valid
+
+
+# A fresh key for a file uploaded by a user, under uploads/<kind>/<user id>/
+# so a user can only ever confirm keys handed out to them
+def direct_upload_key(kind, user_id, filename):
+    return f"uploads/{kind}/{user_id}/{get_unique_filename(filename)}"
+
+
+def direct_upload_prefix(kind, user_id):
+    return f"uploads/{kind}/{user_id}/"
+
+
+def create_presigned_upload(key, content_type, max_size, acl="public-read"):
+    try:
+        upload = s3.generate_presigned_post(
+            BUCKET_NAME,
+            key,
+            Fields={"acl": acl, "Content-Type": content_type},
+            Conditions=[
+                {"acl": acl},
+                {"Content-Type": content_type},
+                ["content-length-range", 1, max_size],
+            ],
+            ExpiresIn=DIRECT_UPLOAD_EXPIRES,
+        )
+        return {"url": upload["url"], "fields": upload["fields"], "key": key, "expires_in": DIRECT_UPLOAD_EXPIRES}
+
+    except Exception as e:
+        error_msg = f"Unknown error: {str(e)}"
+        logger.error(f"Error presigning upload to S3: {error_msg}")
+        return {"errors": error_msg}
+
+
+# Size and content type of an uploaded object, or None if it doesn't exist
+def get_uploaded_object(key):
+    try:
+        response = s3.head_object(Bucket=BUCKET_NAME, Key=key)
+    except botocore.exceptions.ClientError as e:
+        error_code = e.response["Error"]["Code"]
+        if error_code in ("404", "NoSuchKey", "NotFound"):
+            return None
+        error_msg = f"S3 Error [{error_code}]: {str(e)}"
+        logger.error(f"Error checking upload in S3: {error_msg}")
+        return {"errors": error_msg}
+    return {"size": response["ContentLength"], "content_type": response.get("ContentType"), "url": f"{S3_LOCATION}{key}"}
@@ -0,0 +1,515 @@
+# api/community_helpers.py
+from app.models import db, User, UserFollow, CommunityPost, CommunityPostLike, CommunityComment, CommunityPostBucket, PollOption, PollVote, TimelineEntry, dialect_insert
+from .helper_functions import is_id
+from sqlalchemy import select, union_all, literal, or_, and_, bindparam
+from sqlalchemy.sql import func
+from sqlalchemy.orm import aliased
+from collections import Counter
+from datetime import datetime
+import base64
+import json
+import math
+import os
+import threading
+import time
+
+# ---------------ENGAGEMENT COUNTERS----------------
+
+# Truncate a datetime to the start of its hourly rollup bucket
+def bucket_start(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+# Same truncation done in SQL, used when rebuilding buckets from the source tables
+def hour_bucket(column):
+    if db.engine.dialect.name == 'postgresql':
+        return func.date_trunc('hour', column)
+    # sqlite stores datetimes as strings, so match SQLAlchemy's storage format
+    return func.strftime('%Y-%m-%d %H:00:00.000000', column)
+
+# Adjust a post's all-time counter and the hourly bucket the activity falls in.
+# counter is either 'like_count' or 'comment_count'. Does not commit, so the
+# change lands in the same transaction as the like/comment row itself.
+def record_engagement(post_id, counter, delta, moment=None):
+    moment = moment or datetime.utcnow()
+
+    # updated_date is set to itself so the onupdate hook doesn't bump it
+    db.session.query(CommunityPost).filter_by(id=post_id).update({
+        getattr(CommunityPost, counter): getattr(CommunityPost, counter) + delta,
+        CommunityPost.updated_date: CommunityPost.updated_date
+    }, synchronize_session='evaluate')
+
+    buckets = CommunityPostBucket.__table__
+    stmt = dialect_insert(buckets).values(post_id=post_id, bucket_start=bucket_start(moment), **{counter: delta})
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[buckets.c.post_id, buckets.c.bucket_start],
+        set_={counter: buckets.c[counter] + delta}
+    )
+    db.session.execute(stmt)
+    refresh_hot_score(post_id)
+
+# Subquery of (post_id, score) summing a counter over the buckets since start_time
+def windowed_engagement(counter, start_time):
+    return db.session.query(
+        CommunityPostBucket.post_id.label('post_id'),
+        func.sum(getattr(CommunityPostBucket, counter)).label('score')
+    ).filter(
+        CommunityPostBucket.bucket_start >= bucket_start(start_time)
+    ).group_by(CommunityPostBucket.post_id).subquery()
+
+# Remove the rollup buckets of a post that is being deleted
+def clear_post_counters(post_id):
+    db.session.query(CommunityPostBucket).filter_by(post_id=post_id).delete(synchronize_session=False)
+
+# Drift check: recompute every counter and bucket from the like/comment/vote tables
+def rebuild_post_counters():
+    like_totals = select(func.count()).select_from(CommunityPostLike.__table__).where(
+        CommunityPostLike.post_id == CommunityPost.id
+    ).scalar_subquery()
+    comment_totals = select(func.count()).select_from(CommunityComment.__table__).where(
+        CommunityComment.post_id == CommunityPost.id
+    ).scalar_subquery()
+
+    vote_totals = PollOption.legacy_vote_count + select(func.count()).select_from(PollVote.__table__).where(
+        PollVote.option_id == PollOption.id
+    ).scalar_subquery()
+
+    drifted_posts = db.session.query(func.count(CommunityPost.id)).filter(or_(
+        CommunityPost.like_count != like_totals,
+        CommunityPost.comment_count != comment_totals
+    )).scalar()
+
+    db.session.query(CommunityPost).update({
+        CommunityPost.like_count: like_totals,
+        CommunityPost.comment_count: comment_totals,
+        CommunityPost.updated_date: CommunityPost.updated_date
+    }, synchronize_session=False)
+
+    drifted_options = db.session.query(func.count(PollOption.id)).filter(PollOption.vote_count != vote_totals).scalar()
+    db.session.query(PollOption).update({PollOption.vote_count: vote_totals}, synchronize_session=False)
+
+    activity = union_all(
+        select(
+            CommunityPostLike.post_id.label('post_id'),
+            hour_bucket(CommunityPostLike.created_date).label('bucket_start'),
+            literal(1).label('like_count'),
+            literal(0).label('comment_count')
+        ),
+        select(
+            CommunityComment.post_id,
+            hour_bucket(CommunityComment.created_date),
+            literal(0),
+            literal(1)
+        )
+    ).subquery()
+    rebuilt = select(
+        activity.c.post_id,
+        activity.c.bucket_start,
+        func.sum(activity.c.like_count),
+        func.sum(activity.c.comment_count)
+    ).group_by(activity.c.post_id, activity.c.bucket_start)
+
+    db.session.query(CommunityPostBucket).delete(synchronize_session=False)
+    result = db.session.execute(CommunityPostBucket.__table__.insert().from_select(
+        ['post_id', 'bucket_start', 'like_count', 'comment_count'], rebuilt
+    ))
+    db.session.commit()
+
+    return {'drifted_posts': drifted_posts, 'drifted_poll_options': drifted_options, 'buckets': result.rowcount}
+
+# ---------------FEED CURSORS----------------
+
+# Encode a cursor payload as an opaque, url-safe token
+def encode_cursor(payload):
+    token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode())
+    return token.decode().rstrip('=')
+
+# Decode a cursor token issued for listing, returning its fields converted by
+# their readers in fields, or None if it was tampered with, malformed or
+# issued for another listing
+def decode_cursor(token, listing, fields):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if not isinstance(payload, dict) or payload.get('listing') != listing:
+            return None
+        return {name: read(payload[name]) for name, read in fields.items()}
+    except (KeyError, ValueError, TypeError):
+        return None
+
+# Cursor field readers, raising ValueError or TypeError for a value of the wrong type
+def cursor_id(value):
+    if not is_id(value):
+        raise TypeError('cursor ids must be integers')
+    return value
+
+def cursor_number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise TypeError('cursor sort keys must be numbers')
+    return value
+
+def cursor_date(value):
+    return datetime.fromisoformat(value)
+
+# Sort keys are stored in cursors as JSON: datetimes as ISO strings, counts as numbers
+def serialize_sort_key(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+# Restrict a query to the rows that come after (sort_key, last_id) in the given order
+def keyset_filter(query, sort_column, id_column, sort_key, last_id, sort_order):
+    if sort_order == 'asc':
+        return query.filter(or_(sort_column > sort_key, and_(sort_column == sort_key, id_column > last_id)))
+    return query.filter(or_(sort_column < sort_key, and_(sort_column == sort_key, id_column < last_id)))
+
+# ---------------FEED SERIALIZATION----------------
+
+# Number of latest top-level comments shown under each post in the feed
+COMMENT_PREVIEW_SIZE = 3
+
+# Serialize a page of posts with a fixed number of set-based queries: poll
+# options, the viewer's likes, comment previews and their reply counts are
+# each loaded for the whole page at once and stitched together in memory
+def serialize_feed_posts(posts, viewer_id):
+    if not posts:
+        return []
+    post_ids = [post.id for post in posts]
+
+    options_by_post = {post_id: [] for post_id in post_ids}
+    for option in PollOption.query.filter(PollOption.post_id.in_(post_ids)).order_by(PollOption.id):
+        options_by_post[option.post_id].append(option)
+
+    liked_post_ids = {
+        post_id for (post_id,) in db.session.query(CommunityPostLike.post_id).filter(
+            CommunityPostLike.post_id.in_(post_ids),
+            CommunityPostLike.user_id == viewer_id
+        )
+    }
+
+    ranked = db.session.query(
+        CommunityComment.id.label('id'),
+        func.row_number().over(
+            partition_by=CommunityComment.post_id,
+            order_by=(CommunityComment.created_date.desc(), CommunityComment.id.desc())
+        ).label('position')
+    ).filter(
+        CommunityComment.post_id.in_(post_ids),
+        CommunityComment.parent_comment_id.is_(None),
+        CommunityComment.hidden == False
+    ).subquery()
+    previews = CommunityComment.query.join(ranked, ranked.c.id == CommunityComment.id).filter(
+        ranked.c.position <= COMMENT_PREVIEW_SIZE
+    ).order_by(CommunityComment.created_date, CommunityComment.id).all()
+
+    reply_counts = {}
+    if previews:
+        reply_counts = dict(db.session.query(CommunityComment.parent_comment_id, func.count()).filter(
+            CommunityComment.parent_comment_id.in_([comment.id for comment in previews]),
+            CommunityComment.hidden == False
+        ).group_by(CommunityComment.parent_comment_id).all())
+
+    comments_by_post = {post_id: [] for post_id in post_ids}
+    for comment in previews:
+        comments_by_post[comment.post_id].append(comment.to_preview_dict(reply_counts.get(comment.id, 0)))
+
+    return [
+        post.to_feed_dict(options_by_post[post.id], post.id in liked_post_ids, comments_by_post[post.id])
+        for post in posts
+    ]
+
+# ---------------HOME TIMELINE----------------
+
+# Authors with more followers than this are not fanned out on write; their
+# posts are merged into followers' timelines at read time instead
+FANOUT_FOLLOWER_LIMIT = 5000
+
+# Number of recent posts copied into a timeline when starting to follow someone
+FOLLOW_BACKFILL_SIZE = 50
+
+# Fan a post out into its author's and followers' timelines (does not commit)
+def fan_out_post(post):
+    entries = TimelineEntry.__table__
+    db.session.execute(dialect_insert(entries).values(
+        user_id=post.user_id, post_id=post.id, author_id=post.user_id, created_date=post.created_date
+    ).on_conflict_do_nothing())
+
+    if post.user.follower_count > FANOUT_FOLLOWER_LIMIT:
+        return
+
+    followers = select(
+        UserFollow.follower_id, literal(post.id), literal(post.user_id), literal(post.created_date)
+    ).where(UserFollow.followee_id == post.user_id)
+    db.session.execute(dialect_insert(entries).from_select(
+        ['user_id', 'post_id', 'author_id', 'created_date'], followers
+    ).on_conflict_do_nothing())
+
+# Remove a hidden or deleted post from every timeline (does not commit)
+def remove_post_from_timelines(post_ids):
+    db.session.query(TimelineEntry).filter(TimelineEntry.post_id.in_(post_ids)).delete(synchronize_session=False)
+
+# Copy a newly followed user's recent posts into the follower's timeline
+def backfill_timeline(follower_id, followee):
+    if followee.follower_count > FANOUT_FOLLOWER_LIMIT:
+        return
+
+    recent = select(
+        literal(follower_id), CommunityPost.id, CommunityPost.user_id, CommunityPost.created_date
+    ).where(
+        CommunityPost.user_id == followee.id,
+        CommunityPost.hidden == False
+    ).order_by(CommunityPost.created_date.desc()).limit(FOLLOW_BACKFILL_SIZE)
+    db.session.execute(dialect_insert(TimelineEntry.__table__).from_select(
+        ['user_id', 'post_id', 'author_id', 'created_date'], recent
+    ).on_conflict_do_nothing())
+
+# Drop an unfollowed user's posts from the follower's timeline
+def prune_timeline(follower_id, followee_id):
+    db.session.query(TimelineEntry).filter_by(user_id=follower_id, author_id=followee_id).delete(synchronize_session=False)
+
+# Read one page of a user's timeline: a range scan over the materialized
+# entries, merged with the recent posts of followed high-follower accounts.
+# Returns the posts (newest first) and whether there are more.
+def read_timeline(user_id, per_page, after=None):
+    materialized = CommunityPost.query.join(
+        TimelineEntry, TimelineEntry.post_id == CommunityPost.id
+    ).filter(
+        TimelineEntry.user_id == user_id,
+        CommunityPost.hidden == False
+    )
+    if after:
+        materialized = keyset_filter(materialized, TimelineEntry.created_date, TimelineEntry.post_id, after[0], after[1], 'desc')
+    posts = materialized.order_by(
+        TimelineEntry.created_date.desc(), TimelineEntry.post_id.desc()
+    ).limit(per_page + 1).all()
+
+    high_follower_ids = db.session.query(UserFollow.followee_id).join(
+        User, User.id == UserFollow.followee_id
+    ).filter(
+        UserFollow.follower_id == user_id,
+        User.follower_count > FANOUT_FOLLOWER_LIMIT
+    ).all()
+    if high_follower_ids:
+        on_read = CommunityPost.query.filter(
+            CommunityPost.user_id.in_([followee_id for (followee_id,) in high_follower_ids]),
+            CommunityPost.hidden == False
+        )
+        if after:
+            on_read = keyset_filter(on_read, CommunityPost.created_date, CommunityPost.id, after[0], after[1], 'desc')
+        posts += on_read.order_by(
+            CommunityPost.created_date.desc(), CommunityPost.id.desc()
+        ).limit(per_page + 1).all()
+        # An account can cross the limit after some of its posts were fanned out
+        posts = sorted({post.id: post for post in posts}.values(), key=lambda post: (post.created_date, post.id), reverse=True)
+
+    return posts[:per_page], len(posts) > per_page
+
+# ---------------POLL VOTES----------------
+
+class PollVoteBuffer:
+    """
+    Coalesces vote_count increments in memory for hot polls and hands them
+    back as one batch once flush_size votes or flush_interval seconds have
+    accumulated. The poll_votes ledger is always written immediately, so any
+    increments lost with a worker are restored by rebuild_post_counters.
+    """
+
+    def __init__(self, flush_size, flush_interval=2.0):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._pending = 0
+        self._flushed_at = time.monotonic()
+
+    # Add a vote; returns the increments to write now, or an empty dict
+    def add(self, option_id):
+        with self._lock:
+            self._counts[option_id] += 1
+            self._pending += 1
+            if self._pending < self.flush_size and time.monotonic() - self._flushed_at < self.flush_interval:
+                return {}
+            counts, self._counts = self._counts, Counter()
+            self._pending = 0
+            self._flushed_at = time.monotonic()
+            return counts
+
+    # Put back increments handed out by add whose write was rolled back
+    def restore(self, counts):
+        with self._lock:
+            self._counts.update(counts)
+            self._pending += sum(counts.values())
+
+# Set POLL_VOTE_BUFFER_SIZE to coalesce vote counter writes; 0 writes every vote
+POLL_VOTE_BUFFER_SIZE = int(os.environ.get('POLL_VOTE_BUFFER_SIZE', 0))
+poll_vote_buffer = PollVoteBuffer(POLL_VOTE_BUFFER_SIZE) if POLL_VOTE_BUFFER_SIZE else None
+
+# Write vote increments as atomic vote_count = vote_count + n UPDATEs (executemany)
+def apply_vote_increments(counts):
+    if not counts:
+        return
+    options = PollOption.__table__
+    db.session.execute(
+        options.update().where(options.c.id == bindparam('option_id')).values(vote_count=options.c.vote_count + bindparam('increment')),
+        [{'option_id': option_id, 'increment': increment} for option_id, increment in counts.items()]
+    )
+
+# Count a vote that was just added to the ledger (does not commit). Returns
+# the other votes' increments taken from the buffer along with it, which the
+# caller hands to restore_vote_increments if the transaction rolls back.
+def record_poll_vote(post_id, option_id):
+    if not poll_vote_buffer:
+        apply_vote_increments({option_id: 1})
+        refresh_hot_score(post_id)
+        return Counter()
+
+    counts = poll_vote_buffer.add(option_id)
+    apply_vote_increments(counts)
+    refresh_hot_score(post_id)
+    others = Counter(counts)
+    others[option_id] -= 1
+    return +others
+
+# Requeue buffered increments whose write was rolled back
+def restore_vote_increments(counts):
+    if poll_vote_buffer and counts:
+        poll_vote_buffer.restore(counts)
+
+# Per-option vote totals of a poll, from one aggregate over the vote ledger
+# plus the votes cast before it
+def poll_results(post_id):
+    rows = db.session.query(PollOption, PollOption.legacy_vote_count + func.count(PollVote.id)).outerjoin(
+        PollVote, and_(PollVote.post_id == PollOption.post_id, PollVote.option_id == PollOption.id)
+    ).filter(
+        PollOption.post_id == post_id
+    ).group_by(PollOption.id).order_by(PollOption.id).all()
+
+    return [
+        {'id': option.id, 'post_id': option.post_id, 'text': option.text, 'vote_count': votes}
+        for option, votes in rows
+    ]
+
+# ---------------COMMENT THREADS----------------
+
+# Deepest reply level the thread endpoint will expand
+MAX_THREAD_DEPTH = 10
+
+# Load the subtrees under the given top-level comments down to max_depth with
+# one recursive CTE, and nest them in memory. Comments at the depth limit
+# carry the number of replies that were left collapsed under them.
+def load_comment_threads(roots, max_depth):
+    if not roots:
+        return []
+
+    tree = select(
+        CommunityComment.id, CommunityComment.parent_comment_id, literal(1).label('depth')
+    ).where(
+        CommunityComment.id.in_([root.id for root in roots])
+    ).cte('comment_tree', recursive=True)
+    replies = aliased(CommunityComment)
+    tree = tree.union_all(
+        select(replies.id, replies.parent_comment_id, tree.c.depth + 1).join(
+            tree, replies.parent_comment_id == tree.c.id
+        ).where(
+            replies.hidden == False,
+            tree.c.depth < max_depth
+        )
+    )
+
+    rows = db.session.query(CommunityComment, tree.c.depth).join(
+        tree, tree.c.id == CommunityComment.id
+    ).order_by(CommunityComment.created_date, CommunityComment.id).all()
+
+    collapsed_ids = [comment.id for comment, depth in rows if depth == max_depth]
+    collapsed_counts = {}
+    if collapsed_ids:
+        collapsed_counts = dict(db.session.query(CommunityComment.parent_comment_id, func.count()).filter(
+            CommunityComment.parent_comment_id.in_(collapsed_ids),
+            CommunityComment.hidden == False
+        ).group_by(CommunityComment.parent_comment_id).all())
+
+    nodes = {}
+    for comment, depth in rows:
+        node = comment.to_preview_dict(collapsed_counts.get(comment.id, 0))
+        node['depth'] = depth
+        if depth < max_depth:
+            node['replies'] = []
+        nodes[comment.id] = node
+    for comment, depth in rows:
+        if depth > 1:
+            parent = nodes[comment.parent_comment_id]
+            parent['replies'].append(nodes[comment.id])
+            parent['reply_count'] += 1
+
+    return [nodes[root.id] for root in roots]
+
+# ---------------HOT RANKING----------------
+
+# How much each kind of engagement counts towards a post's hot score
+HOT_WEIGHTS = {'likes': 1.0, 'comments': 2.0, 'votes': 0.5}
+
+# Every HOT_DECAY_SECONDS of age weighs as much as 10x the engagement
+HOT_EPOCH = datetime(2024, 1, 1)
+HOT_DECAY_SECONDS = 45000
+
+# Log-scaled engagement plus a term that grows with the creation time. Newer
+# posts start higher, so older posts decay relative to them without their
+# stored scores having to change as the clock moves.
+def hot_score(like_count, comment_count, vote_count, created_date):
+    engagement = (
+        HOT_WEIGHTS['likes'] * like_count
+        + HOT_WEIGHTS['comments'] * comment_count
+        + HOT_WEIGHTS['votes'] * vote_count
+    )
+    return math.log10(max(engagement, 1)) + (created_date - HOT_EPOCH).total_seconds() / HOT_DECAY_SECONDS
+
+# Total poll votes per post, as a subquery of (post_id, vote_count)
+def post_vote_totals():
+    return db.session.query(
+        PollOption.post_id.label('post_id'),
+        func.sum(PollOption.vote_count).label('vote_count')
+    ).group_by(PollOption.post_id).subquery()
+
+# Recalculate one post's hot score after its engagement changed (does not
+# commit). Only this post's poll options are summed, not every post's.
+def refresh_hot_score(post_id):
+    votes = select(func.coalesce(func.sum(PollOption.vote_count), 0)).where(
+        PollOption.post_id == post_id
+    ).scalar_subquery()
+    row = db.session.query(
+        CommunityPost.like_count, CommunityPost.comment_count, votes, CommunityPost.created_date
+    ).filter(CommunityPost.id == post_id).first()
+    if not row:
+        return
+
+    db.session.query(CommunityPost).filter_by(id=post_id).update({
+        CommunityPost.hot_score: hot_score(*row),
+        CommunityPost.updated_date: CommunityPost.updated_date
+    }, synchronize_session='evaluate')
+
+# Periodic job: recompute every hot score in batches, to apply weight changes
+# and to fold in counter corrections and buffered poll votes
+def refresh_hot_scores(batch_size=1000):
+    votes = post_vote_totals()
+    posts = CommunityPost.__table__
+    update_score = posts.update().where(posts.c.id == bindparam('post_id')).values(
+        hot_score=bindparam('score'), updated_date=posts.c.updated_date
+    )
+
+    refreshed = 0
+    last_id = 0
+    while True:
+        rows = db.session.query(
+            CommunityPost.id, CommunityPost.like_count, CommunityPost.comment_count,
+            func.coalesce(votes.c.vote_count, 0), CommunityPost.created_date
+        ).outerjoin(votes, votes.c.post_id == CommunityPost.id).filter(
+            CommunityPost.id > last_id
+        ).order_by(CommunityPost.id).limit(batch_size).all()
+        if not rows:
+            break
+
+        db.session.execute(update_score, [
+            {'post_id': post_id, 'score': hot_score(likes, comments, votes_cast, created_date)}
+            for post_id, likes, comments, votes_cast, created_date in rows
+        ])
+        db.session.commit()
+        refreshed += len(rows)
+        last_id = rows[-1][0]
+
+    return refreshed
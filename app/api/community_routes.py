@@ -1,9 +1,12 @@
 # routes/community_routes.py
 from flask import Blueprint, request, jsonify
-from app.models import db, CommunityPost, PollOption, CommunityComment, User, CommunityPostLike, UserFollow
+from app.models import db, CommunityPost, PollOption, CommunityComment, User, CommunityPostLike, UserFollow, PollVote
 from flask_login import current_user, login_required
 from .helper_functions import contains_inappropriate_content
+from .search_helpers import index_post, index_comment, unindex_post, unindex_comment, search_matches
+from .community_helpers import record_engagement, windowed_engagement, clear_post_counters, encode_cursor, decode_cursor, cursor_id, cursor_number, cursor_date, serialize_sort_key, keyset_filter, serialize_feed_posts, fan_out_post, remove_post_from_timelines, backfill_timeline, prune_timeline, read_timeline, record_poll_vote, restore_vote_increments, poll_results, load_comment_threads, MAX_THREAD_DEPTH, hot_score
 from sqlalchemy.sql import func
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta
 
 community_routes = Blueprint('community', __name__)
@@ -32,13 +35,18 @@ def create_community_post():
             if contains_inappropriate_content(option_text):
                 return jsonify({'errors': 'Inappropriate content detected in poll options'}), 400
 
+    created_date = datetime.utcnow()
     new_post = CommunityPost(
         user_id=current_user.id,
         post_type=post_type,
         text=text,
-        image_url=image_url
+        image_url=image_url,
+        created_date=created_date,
+        hot_score=hot_score(0, 0, 0, created_date)
     )
     db.session.add(new_post)
+    db.session.flush()
+    index_post(new_post)
     db.session.commit()
 
     if post_type == 'poll' and poll_options:
@@ -50,6 +58,10 @@ def create_community_post():
             db.session.add(poll_option)
         db.session.commit()
 
+    # Push the post into the author's and followers' home timelines
+    fan_out_post(new_post)
+    db.session.commit()
+
     return jsonify(new_post.to_dict()), 201
 
 # Edit a community post
@@ -82,6 +94,7 @@ def edit_community_post(post_id):
     post.text = text
     post.image_url = image_url
     post.updated_date = datetime.utcnow()
+    index_post(post)
 
     db.session.commit()
 
@@ -98,11 +111,32 @@ def delete_community_post(post_id):
     if post.user_id != current_user.id:
         return jsonify({'errors': 'You do not have permission to delete this post'}), 403
 
+    clear_post_counters(post.id)
+    remove_post_from_timelines([post.id])
+    unindex_post(post.id)
     db.session.delete(post)
     db.session.commit()
 
     return jsonify({'message': 'Post deleted successfully'}), 200
 
+# Columns the feed can be sorted by
+SORT_COLUMNS = {
+    'created_date': CommunityPost.created_date,
+    'updated_date': CommunityPost.updated_date,
+    'likes': CommunityPost.like_count,
+    'comments': CommunityPost.comment_count,
+    'hot': CommunityPost.hot_score
+}
+
+# Sorts whose cursor keys are datetimes
+DATE_SORTS = ('created_date', 'updated_date')
+
+# Counter backing each engagement sort
+ENGAGEMENT_COUNTERS = {
+    'likes': 'like_count',
+    'comments': 'comment_count'
+}
+
 # Get all community posts with pagination, filtering, and sorting
 @community_routes.route('/posts', methods=['GET'])
 @login_required
@@ -113,6 +147,7 @@ def get_community_posts():
         • updated_date: Sort by the date the post was last updated.
         • likes: Sort by the number of likes the post has received.
         • comments: Sort by the number of comments the post has received.
+        • hot: Sort by the trending score, which weighs likes, comments and poll votes and decays with age.
 
     sort_order: The sorting order
         • asc: Ascending order.
@@ -131,6 +166,16 @@ def get_community_posts():
         • last_30_days: Only consider likes/comments made in the last 30 days.
         • last_week: Only consider likes/comments made in the last week.
         • last_24_hours: Only consider likes/comments made in the last 24 hours.
+
+    cursor: Switch to cursor pagination instead of page numbers
+        • Pass an empty cursor for the first page, then the next_cursor from each response.
+          The sort, filters and time frame must stay the same while following a cursor.
+
+    include_total: Set to true to also count the matching posts in cursor mode
+
+    Posts are returned in their feed form: like/comment counts, whether the
+    current user liked the post, and a preview of the latest top-level comments
+    with their reply counts. The full thread is available from the post itself.
     """
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
@@ -139,6 +184,13 @@ def get_community_posts():
     filter_type = request.args.get('filter_type', None)  # Filter by post type
     filter_user = request.args.get('filter_user', None)  # Filter by user ID
     time_frame = request.args.get('time_frame', 'all_time')  # Time frame for sorting likes/comments
+    cursor = request.args.get('cursor', None)  # Opaque cursor, enables cursor pagination
+    include_total = request.args.get('include_total', 'false') == 'true'
+
+    if sort_by not in SORT_COLUMNS:
+        sort_by = 'created_date'
+    if sort_order != 'asc':
+        sort_order = 'desc'
 
     # Base query
     posts_query = CommunityPost.query.filter_by(hidden=False)  # Exclude hidden posts
@@ -160,37 +212,178 @@ def get_community_posts():
     else:
         start_time = None
 
-    if start_time:
-        posts_query = posts_query.outerjoin(CommunityPostLike).outerjoin(CommunityComment)
-        posts_query = posts_query.group_by(CommunityPost.id)
-
-        if sort_by == 'likes':
-            posts_query = posts_query.add_columns(
-                func.count(CommunityPostLike.id).filter(CommunityPostLike.created_date >= start_time).label('like_count')
-            ).order_by(func.count(CommunityPostLike.id).filter(CommunityPostLike.created_date >= start_time).desc() if sort_order == 'desc' else func.count(CommunityPostLike.id).filter(CommunityPostLike.created_date >= start_time).asc())
-
-        elif sort_by == 'comments':
-            posts_query = posts_query.add_columns(
-                func.count(CommunityComment.id).filter(CommunityComment.created_date >= start_time).label('comment_count')
-            ).order_by(func.count(CommunityComment.id).filter(CommunityComment.created_date >= start_time).desc() if sort_order == 'desc' else func.count(CommunityComment.id).filter(CommunityComment.created_date >= start_time).asc())
+    # A cursor only makes sense for the listing it was issued for
+    cursor_state = None
+    if cursor:
+        cursor_fields = {'key': cursor_date if sort_by in DATE_SORTS else cursor_number, 'id': cursor_id}
+        if start_time:
+            cursor_fields['window'] = cursor_date
+        cursor_state = decode_cursor(cursor, [sort_by, sort_order, time_frame, filter_type, filter_user], cursor_fields)
+        if not cursor_state:
+            return jsonify({'errors': 'Invalid cursor'}), 400
+
+    # Keep the time window fixed while paging so scores don't shift between pages
+    if start_time and cursor_state:
+        start_time = cursor_state['window']
+
+    # Likes/comments are read from the maintained counters: the all-time
+    # columns on the post, or the hourly buckets summed over the time frame
+    scores_sort = bool(start_time and sort_by in ENGAGEMENT_COUNTERS)
+    if scores_sort:
+        scores = windowed_engagement(ENGAGEMENT_COUNTERS[sort_by], start_time)
+        posts_query = posts_query.outerjoin(scores, scores.c.post_id == CommunityPost.id)
+        sort_column = func.coalesce(scores.c.score, 0)
+    else:
+        sort_column = SORT_COLUMNS.get(sort_by, CommunityPost.created_date)
 
+    # Apply sorting, with the post id as a tie-breaker so pages are stable
+    if sort_order == 'asc':
+        posts_query = posts_query.order_by(sort_column.asc(), CommunityPost.id.asc())
     else:
-        # Apply sorting
-        if sort_order == 'asc':
-            posts_query = posts_query.order_by(getattr(CommunityPost, sort_by).asc())
-        else:
-            posts_query = posts_query.order_by(getattr(CommunityPost, sort_by).desc())
+        posts_query = posts_query.order_by(sort_column.desc(), CommunityPost.id.desc())
+
+    # Cursor pagination: seek past the last row seen instead of OFFSET/COUNT
+    if cursor is not None:
+        total = posts_query.order_by(None).count() if include_total else None
+        if cursor_state:
+            posts_query = keyset_filter(posts_query, sort_column, CommunityPost.id, cursor_state['key'], cursor_state['id'], sort_order)
+
+        rows = posts_query.add_columns(sort_column).limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+
+        next_cursor = None
+        if has_more:
+            last_post, last_key = rows[-1]
+            next_cursor = encode_cursor({
+                'listing': [sort_by, sort_order, time_frame, filter_type, filter_user],
+                'window': start_time.isoformat() if start_time else None,
+                'key': serialize_sort_key(last_key),
+                'id': last_post.id
+            })
+
+        response = {
+            'posts': serialize_feed_posts([post for post, _ in rows], current_user.id),
+            'next_cursor': next_cursor,
+            'has_more': has_more
+        }
+        if include_total:
+            response['total'] = total
+        return jsonify(response), 200
 
     # Pagination
     posts = posts_query.paginate(page=page, per_page=per_page)
 
     return jsonify({
-        'posts': [post.to_dict() for post in posts.items],
+        'posts': serialize_feed_posts(posts.items, current_user.id),
         'total': posts.total,
         'pages': posts.pages,
         'current_page': posts.page
     }), 200
 
+# Get the current user's home timeline: their own posts and the posts of the users they follow
+@community_routes.route('/timeline', methods=['GET'])
+@login_required
+def get_timeline():
+    """
+    cursor: Pass the next_cursor from the previous response to get the next page
+    per_page: Number of posts per page
+    """
+    per_page = request.args.get('per_page', 10, type=int)
+    cursor = request.args.get('cursor', None)
+
+    after = None
+    if cursor:
+        cursor_state = decode_cursor(cursor, ['timeline'], {'key': cursor_date, 'id': cursor_id})
+        if not cursor_state:
+            return jsonify({'errors': 'Invalid cursor'}), 400
+        after = (cursor_state['key'], cursor_state['id'])
+
+    posts, has_more = read_timeline(current_user.id, per_page, after)
+
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor({
+            'listing': ['timeline'],
+            'key': posts[-1].created_date.isoformat(),
+            'id': posts[-1].id
+        })
+
+    return jsonify({
+        'posts': serialize_feed_posts(posts, current_user.id),
+        'next_cursor': next_cursor,
+        'has_more': has_more
+    }), 200
+
+# Search community posts or comments, best matches first
+@community_routes.route('/search', methods=['GET'])
+@login_required
+def search_community():
+    """
+    q: The words to search for
+
+    search_in: What to search
+        • posts: Search the text of posts (default).
+        • comments: Search the text of comments.
+
+    filter_type: Only match posts (or comments on posts) of this type
+    filter_user: Only match posts (or comments) written by this user ID
+
+    Hidden posts and comments, and comments on hidden posts, are never returned.
+    """
+    terms = request.args.get('q', '').strip()
+    search_in = request.args.get('search_in', 'posts')
+    filter_type = request.args.get('filter_type', None)
+    filter_user = request.args.get('filter_user', None)
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 10, type=int)
+
+    if not terms:
+        return jsonify({'errors': 'A search query is required'}), 400
+    if search_in not in ('posts', 'comments'):
+        return jsonify({'errors': 'search_in must be posts or comments'}), 400
+
+    matches = search_matches(search_in, terms)
+
+    if search_in == 'posts':
+        results_query = CommunityPost.query.join(matches, matches.c.id == CommunityPost.id).filter(
+            CommunityPost.hidden == False
+        )
+        if filter_user:
+            results_query = results_query.filter(CommunityPost.user_id == filter_user)
+        id_column = CommunityPost.id
+    else:
+        results_query = CommunityComment.query.join(matches, matches.c.id == CommunityComment.id).join(
+            CommunityPost, CommunityPost.id == CommunityComment.post_id
+        ).filter(CommunityComment.hidden == False, CommunityPost.hidden == False)
+        if filter_user:
+            results_query = results_query.filter(CommunityComment.user_id == filter_user)
+        id_column = CommunityComment.id
+
+    if filter_type:
+        results_query = results_query.filter(CommunityPost.post_type == filter_type)
+
+    results = results_query.order_by(matches.c.rank.desc(), id_column.desc()).paginate(page=page, per_page=per_page)
+
+    if search_in == 'posts':
+        items = serialize_feed_posts(results.items, current_user.id)
+    else:
+        # Direct reply counts for the whole page in one grouped query
+        comment_ids = [comment.id for comment in results.items]
+        reply_counts = dict(db.session.query(
+            CommunityComment.parent_comment_id, func.count(CommunityComment.id)
+        ).filter(
+            CommunityComment.parent_comment_id.in_(comment_ids), CommunityComment.hidden == False
+        ).group_by(CommunityComment.parent_comment_id).all()) if comment_ids else {}
+        items = [comment.to_preview_dict(reply_counts.get(comment.id, 0)) for comment in results.items]
+
+    return jsonify({
+        search_in: items,
+        'total': results.total,
+        'pages': results.pages,
+        'current_page': results.page
+    }), 200
+
 # View a single community post
 @community_routes.route('/posts/<int:post_id>', methods=['GET'])
 @login_required
@@ -220,8 +413,9 @@ def like_community_post(post_id):
     if like:
         return jsonify({'errors': 'Already liked'}), 400
 
-    like = CommunityPostLike(post_id=post_id, user_id=current_user.id)
+    like = CommunityPostLike(post_id=post_id, user_id=current_user.id, created_date=datetime.utcnow())
     db.session.add(like)
+    record_engagement(post.id, 'like_count', 1, like.created_date)
     db.session.commit()
 
     return jsonify(post.to_dict()), 200
@@ -242,6 +436,7 @@ def unlike_community_post(post_id):
         return jsonify({'errors': 'Not liked yet'}), 400
 
     db.session.delete(like)
+    record_engagement(post.id, 'like_count', -1, like.created_date)
     db.session.commit()
 
     return jsonify(post.to_dict()), 200
@@ -261,17 +456,74 @@ def comment_on_community_post(post_id):
     text = data.get('text')
     parent_comment_id = data.get('parent_comment_id', None)
 
+    # Check for inappropriate content
+    if contains_inappropriate_content(text):
+        return jsonify({'errors': 'Inappropriate content detected'}), 400
+
     new_comment = CommunityComment(
         post_id=post.id,
         user_id=current_user.id,
         text=text,
-        parent_comment_id=parent_comment_id
+        parent_comment_id=parent_comment_id,
+        created_date=datetime.utcnow()
     )
     db.session.add(new_comment)
+    db.session.flush()
+    index_comment(new_comment)
+    record_engagement(post.id, 'comment_count', 1, new_comment.created_date)
     db.session.commit()
 
     return jsonify(new_comment.to_dict()), 201
 
+# Get the comment threads of a post, paginated over top-level comments
+@community_routes.route('/posts/<int:post_id>/comments', methods=['GET'])
+@login_required
+def get_post_comments(post_id):
+    """
+    cursor: Pass the next_cursor from the previous response to get the next page
+    per_page: Number of top-level comments per page
+    max_depth: How many levels of replies to expand (1 = top-level comments only).
+        Comments at the last expanded level include a reply_count for their collapsed replies.
+    """
+    per_page = request.args.get('per_page', 20, type=int)
+    max_depth = min(max(request.args.get('max_depth', 3, type=int), 1), MAX_THREAD_DEPTH)
+    cursor = request.args.get('cursor', None)
+
+    post = CommunityPost.query.get(post_id)
+    if not post:
+        return jsonify({'errors': 'Post not found'}), 404
+
+    if post.hidden and current_user.type not in ['teacher', 'parent']:
+        return jsonify({'errors': 'You do not have permission to view this post'}), 403
+
+    roots_query = CommunityComment.query.filter_by(post_id=post_id, parent_comment_id=None, hidden=False)
+    if cursor:
+        cursor_state = decode_cursor(cursor, ['comments', post_id], {'key': cursor_date, 'id': cursor_id})
+        if not cursor_state:
+            return jsonify({'errors': 'Invalid cursor'}), 400
+        roots_query = keyset_filter(
+            roots_query, CommunityComment.created_date, CommunityComment.id,
+            cursor_state['key'], cursor_state['id'], 'asc'
+        )
+
+    roots = roots_query.order_by(CommunityComment.created_date, CommunityComment.id).limit(per_page + 1).all()
+    has_more = len(roots) > per_page
+    roots = roots[:per_page]
+
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor({
+            'listing': ['comments', post_id],
+            'key': roots[-1].created_date.isoformat(),
+            'id': roots[-1].id
+        })
+
+    return jsonify({
+        'comments': load_comment_threads(roots, max_depth),
+        'next_cursor': next_cursor,
+        'has_more': has_more
+    }), 200
+
 # Edit a community comment
 @community_routes.route('/comments/<int:comment_id>', methods=['PUT'])
 @login_required
@@ -292,6 +544,7 @@ def edit_community_comment(comment_id):
 
     comment.text = text
     comment.updated_date = datetime.utcnow()
+    index_comment(comment)
 
     db.session.commit()
 
@@ -311,11 +564,44 @@ def vote_poll_option(post_id):
     if not poll_option:
         return jsonify({'errors': 'Poll option not found'}), 404
 
-    poll_option.vote_count += 1
-    db.session.commit()
+    if PollVote.query.filter_by(post_id=post_id, user_id=current_user.id).first():
+        return jsonify({'errors': 'Already voted on this poll'}), 400
+
+    # The ledger row and the counter update commit together; the unique
+    # (post, user) constraint settles concurrent double votes, at the flush or
+    # at the commit
+    db.session.add(PollVote(post_id=post_id, option_id=poll_option.id, user_id=current_user.id))
+    buffered = {}
+    try:
+        db.session.flush()
+        buffered = record_poll_vote(post_id, poll_option.id)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        # Other voters' buffered increments went down with this transaction
+        restore_vote_increments(buffered)
+        return jsonify({'errors': 'Already voted on this poll'}), 400
 
     return jsonify(poll_option.to_dict()), 200
 
+# Get the results of a poll
+@community_routes.route('/posts/<int:post_id>/poll/results', methods=['GET'])
+@login_required
+def get_poll_results(post_id):
+    post = CommunityPost.query.get(post_id)
+    if not post or post.post_type != 'poll':
+        return jsonify({'errors': 'Poll not found'}), 404
+
+    options = poll_results(post_id)
+    my_vote = PollVote.query.filter_by(post_id=post_id, user_id=current_user.id).first()
+
+    return jsonify({
+        'post_id': post_id,
+        'options': options,
+        'total_votes': sum(option['vote_count'] for option in options),
+        'my_vote': my_vote.option_id if my_vote else None
+    }), 200
+
 # Delete a community comment
 @community_routes.route('/comments/<int:comment_id>', methods=['DELETE'])
 @login_required
@@ -327,6 +613,8 @@ def delete_community_comment(comment_id):
     if comment.user_id != current_user.id:
         return jsonify({'errors': 'You do not have permission to delete this comment'}), 403
 
+    record_engagement(comment.post_id, 'comment_count', -1, comment.created_date)
+    unindex_comment(comment.id)
     db.session.delete(comment)
     db.session.commit()
 
@@ -343,8 +631,13 @@ def follow_user(followee_id):
     if current_user.id == followee_id:
         return jsonify({'errors': 'You cannot follow yourself'}), 400
 
+    if UserFollow.query.filter_by(follower_id=current_user.id, followee_id=followee.id).first():
+        return jsonify({'errors': 'Already following this user'}), 400
+
     follow = UserFollow(follower_id=current_user.id, followee_id=followee.id)
     db.session.add(follow)
+    User.query.filter_by(id=followee.id).update({User.follower_count: User.follower_count + 1, User.updated_date: User.updated_date})
+    backfill_timeline(current_user.id, followee)
     db.session.commit()
     return jsonify({'message': 'Followed successfully', 'user': current_user.to_dict()}), 200
 
@@ -357,6 +650,8 @@ def unfollow_user(followee_id):
         return jsonify({'errors': 'Not following this user'}), 400
 
     db.session.delete(follow)
+    User.query.filter_by(id=followee_id).update({User.follower_count: User.follower_count - 1, User.updated_date: User.updated_date})
+    prune_timeline(current_user.id, followee_id)
     db.session.commit()
     return jsonify({'message': 'Unfollowed successfully', 'user': current_user.to_dict()}), 200
 
@@ -375,6 +670,10 @@ def hide_community_post(post_id):
     data = request.get_json()
     hide = data.get('hide', True)
     post.hidden = hide
+    if hide:
+        remove_post_from_timelines([post.id])
+    else:
+        fan_out_post(post)
     db.session.commit()
 
     return jsonify(post.to_dict()), 200
@@ -406,6 +705,7 @@ def report_community_post(post_id):
         return jsonify({'errors': 'Post not found'}), 404
 
     post.hidden = True
+    remove_post_from_timelines([post.id])
     db.session.commit()
 
     return jsonify({'message': 'Post reported and hidden for review'}), 200
@@ -427,7 +727,7 @@ def get_hidden_community_posts():
     posts = posts_query.paginate(page=page, per_page=per_page)
 
     return jsonify({
-        'posts': [post.to_dict() for post in posts.items],
+        'posts': serialize_feed_posts(posts.items, current_user.id),
         'total': posts.total,
         'pages': posts.pages,
         'current_page': posts.page
@@ -0,0 +1,94 @@
+# api/content_filter.py
+import hashlib
+import os
+import re
+import threading
+import time
+
+# ---------------PATTERN BUILDING----------------
+
+# Build one regex that matches any of the words, with the alternatives folded
+# into a trie ("ass", "asses", "asshole" -> "ass(?:es|hole)?") so the regex
+# engine walks shared prefixes once instead of trying every word separately
+def build_trie_pattern(words):
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+    # Lookarounds instead of \b so words that start or end with symbols
+    # ("a$$") still need a non-word character (or the edge) on each side
+    return r'(?<!\w)' + _trie_node_pattern(trie) + r'(?!\w)'
+
+def _trie_node_pattern(node):
+    branches = [re.escape(char) + _trie_node_pattern(child) for char, child in sorted(node.items()) if char != '']
+    if not branches:
+        return ''
+    if '' in node:
+        # The word may end here; the optional group is greedy so longer words win
+        return '(?:' + '|'.join(branches) + ')?'
+    if len(branches) == 1:
+        return branches[0]
+    return '(?:' + '|'.join(branches) + ')'
+
+# ---------------MATCHER----------------
+
+class BannedWordMatcher:
+    """Finds whole-word occurrences of a word list in a single regex pass"""
+
+    def __init__(self, words):
+        self.words = sorted({word.strip().lower() for word in words if word and word.strip()})
+        self.version = hashlib.sha1('\n'.join(self.words).encode()).hexdigest()
+        self.pattern = re.compile(build_trie_pattern(self.words), re.IGNORECASE) if self.words else None
+
+    def matches(self, text):
+        return bool(self.pattern and text and self.pattern.search(text))
+
+    def find(self, text):
+        if not self.pattern or not text:
+            return []
+        return [
+            {'term': match.group(0).lower(), 'start': match.start(), 'end': match.end()}
+            for match in self.pattern.finditer(text)
+        ]
+
+class ReloadableMatcher:
+    """
+    Holds a BannedWordMatcher built from load_words() and rebuilds it when the
+    optional word list file changes, checking its mtime at most every
+    check_interval seconds so running workers pick up edits without a restart
+    """
+
+    def __init__(self, load_words, watch_path=None, check_interval=30):
+        self.load_words = load_words
+        self.watch_path = watch_path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._matcher = None
+        self._mtime = None
+        self._checked_at = 0
+
+    def _watched_mtime(self):
+        if not self.watch_path:
+            return None
+        try:
+            return os.path.getmtime(self.watch_path)
+        except OSError:
+            return None
+
+    def reload(self):
+        with self._lock:
+            self._mtime = self._watched_mtime()
+            self._checked_at = time.monotonic()
+            self._matcher = BannedWordMatcher(self.load_words())
+        return self._matcher
+
+    def get(self):
+        if self._matcher is None:
+            return self.reload()
+        if self.watch_path and time.monotonic() - self._checked_at >= self.check_interval:
+            self._checked_at = time.monotonic()
+            if self._watched_mtime() != self._mtime:
+                return self.reload()
+        return self._matcher
@@ -0,0 +1,420 @@
+# api/course_helpers.py
+from app.models import db, Art, Course, Lesson, Student, User, StudentCourseProgress, student_course_table, student_lesson_table, course_type_table, course_subject_table, dialect_insert
+from app.utils.cache import ResponseCache
+from .recommendation_helpers import mark_recommendations_stale
+from .helper_functions import award_points, award_points_batch, is_id
+from .track_helpers import rollup_track_progress, invalidate_tracks
+from sqlalchemy import and_, bindparam, case, literal, or_, select
+from sqlalchemy.orm import selectinload
+from sqlalchemy.sql import func
+from datetime import datetime
+
+# ---------------COURSE CACHE----------------
+
+# Cached course responses. The catalog lives in the 'catalog' namespace and
+# each course's detail in 'course:<id>'; everything Course.to_dict reads
+# (lessons, art, enrollments, progress) invalidates both when it changes.
+course_cache = ResponseCache.from_env('courses')
+
+# The relationship behind each Course.to_dict field, loaded with one query
+# each (and only when the field is requested) instead of lazily per course
+COURSE_FIELD_LOADERS = {
+    'student_work': selectinload(Course.student_work),
+    'lessons': selectinload(Course.lessons),
+    'types': selectinload(Course.types),
+    'subjects': selectinload(Course.subjects),
+    'students': selectinload(Course.students),
+    'students_progress': selectinload(Course.students_progress),
+}
+
+def course_loaders(fields):
+    return [loader for field, loader in COURSE_FIELD_LOADERS.items() if fields is None or field in fields]
+
+def course_namespace(course_id):
+    return f'course:{course_id}'
+
+# Each fieldset is cached under its own key in the same namespace. Fieldsets
+# come from requested_fields, validated and in canonical order, so clients
+# can't mint keys beyond the model's own combinations.
+def fields_key(fields):
+    return ','.join(fields) if fields is not None else 'full'
+
+def cached_catalog(fields=None):
+    return course_cache.get_or_set('catalog', fields_key(fields), lambda: [
+        course.to_dict(fields=fields)
+        for course in Course.query.options(*course_loaders(fields)).order_by(Course.id).all()
+    ])
+
+# Returns None if the course doesn't exist (misses for missing courses aren't cached)
+def cached_course(course_id, fields=None):
+    def build():
+        course = Course.query.options(*course_loaders(fields)).get(course_id)
+        return course.to_dict(fields=fields) if course else None
+
+    return course_cache.get_or_set(course_namespace(course_id), fields_key(fields), build)
+
+# Call after committing a change to anything a course's dict includes. Pass
+# tracks=True when the change touches what expanded tracks embed (the course
+# summary fields or its lessons), so they are invalidated too.
+def invalidate_course(course_id, tracks=False):
+    course_cache.invalidate('catalog', course_namespace(course_id))
+    if tracks:
+        invalidate_tracks()
+
+# ---------------ENROLLMENT----------------
+
+# Keep Course.student_count in step with an enrollment change (does not commit)
+def adjust_student_count(course_id, delta):
+    Course.query.filter_by(id=course_id).update({
+        Course.student_count: Course.student_count + delta,
+        Course.updated_date: Course.updated_date
+    }, synchronize_session=False)
+
+# Enroll a student, returning False if they already were (does not commit)
+def enroll_student(student_id, course_id):
+    result = db.session.execute(
+        dialect_insert(student_course_table).values(student_id=student_id, course_id=course_id).on_conflict_do_nothing()
+    )
+    if not result.rowcount:
+        return False
+    adjust_student_count(course_id, 1)
+    mark_recommendations_stale(student_id)
+    return True
+
+# Withdraw a student, returning False if they weren't enrolled (does not commit)
+def withdraw_student(student_id, course_id):
+    result = db.session.execute(student_course_table.delete().where(
+        student_course_table.c.student_id == student_id, student_course_table.c.course_id == course_id
+    ))
+    if not result.rowcount:
+        return False
+    adjust_student_count(course_id, -1)
+    mark_recommendations_stale(student_id)
+    return True
+
+# ---------------COURSE PROGRESS----------------
+
+# Points for completing a lesson, and the one-off bonus for finishing a course
+LESSON_POINTS = 10
+COURSE_COMPLETION_BONUS = 50
+
+# Progress columns recomputed from the (already updated) counters in the same
+# UPDATE, so concurrent toggles can't leave them out of step
+def progress_values(completed_lessons, total_lessons):
+    return {
+        StudentCourseProgress.progress: case(
+            (total_lessons > 0, completed_lessons * literal(100.0) / total_lessons), else_=0.0
+        ),
+        StudentCourseProgress.completed: and_(total_lessons > 0, completed_lessons >= total_lessons),
+    }
+
+# Create a student's progress row for a course from the current counts, unless
+# it already exists (does not commit)
+def ensure_course_progress(student_id, course_id):
+    if StudentCourseProgress.query.get((student_id, course_id)):
+        return
+
+    total = db.session.query(func.count(Lesson.id)).filter(Lesson.course_id == course_id).scalar()
+    completed = db.session.query(func.count()).select_from(student_lesson_table).join(
+        Lesson, Lesson.id == student_lesson_table.c.lesson_id
+    ).filter(student_lesson_table.c.student_id == student_id, Lesson.course_id == course_id).scalar()
+    progress = completed * 100.0 / total if total else 0.0
+
+    stmt = dialect_insert(StudentCourseProgress.__table__).values(
+        student_id=student_id,
+        course_id=course_id,
+        completed_lessons=completed,
+        total_lessons=total,
+        progress=progress,
+        completed=bool(total) and completed >= total,
+        bonus_awarded=False,
+        updated_date=datetime.utcnow()
+    ).on_conflict_do_nothing(index_elements=['student_id', 'course_id'])
+    db.session.execute(stmt)
+
+# Flip a lesson between complete and incomplete and move the course counters
+# with it. Completing a lesson earns its points the first time only, and
+# reaching 100% earns the completion bonus the first time only; marking a
+# lesson incomplete takes nothing back. Returns the points awarded (does not commit).
+def toggle_lesson(student_id, lesson):
+    ensure_course_progress(student_id, lesson.course_id)
+
+    # The primary key on (student_id, lesson_id) makes this an index lookup
+    complete = db.session.query(student_lesson_table.c.lesson_id).filter(
+        student_lesson_table.c.student_id == student_id, student_lesson_table.c.lesson_id == lesson.id
+    ).first() is None
+
+    if complete:
+        db.session.execute(student_lesson_table.insert().values(student_id=student_id, lesson_id=lesson.id))
+    else:
+        db.session.execute(student_lesson_table.delete().where(
+            student_lesson_table.c.student_id == student_id, student_lesson_table.c.lesson_id == lesson.id
+        ))
+
+    delta = 1 if complete else -1
+    completed_lessons = StudentCourseProgress.completed_lessons + delta
+    progress_row = StudentCourseProgress.query.filter_by(student_id=student_id, course_id=lesson.course_id)
+    progress_row.update({
+        StudentCourseProgress.completed_lessons: completed_lessons,
+        **progress_values(completed_lessons, StudentCourseProgress.total_lessons)
+    }, synchronize_session=False)
+
+    points = 0
+    if complete and award_points(student_id, LESSON_POINTS, 'lesson_completed', lesson.id, lesson.course_id):
+        points += LESSON_POINTS
+
+    # Only the request that flips bonus_awarded gets the bonus
+    claimed = progress_row.filter_by(completed=True, bonus_awarded=False).update(
+        {StudentCourseProgress.bonus_awarded: True}, synchronize_session=False
+    )
+    if claimed and award_points(student_id, COURSE_COMPLETION_BONUS, 'course_completed', lesson.course_id, lesson.course_id):
+        points += COURSE_COMPLETION_BONUS
+
+    rollup_track_progress(student_id=student_id, course_id=lesson.course_id)
+    return points
+
+# Pay the completion bonus to every student a course change has just pushed to
+# 100% who hasn't had it yet (does not commit). The ledger pays each student
+# at most once per course, so a concurrent toggle can't double it.
+def award_completion_bonuses(course_id):
+    unpaid = StudentCourseProgress.query.filter_by(course_id=course_id, completed=True, bonus_awarded=False)
+    student_ids = [student_id for (student_id,) in unpaid.with_entities(StudentCourseProgress.student_id)]
+    if not student_ids:
+        return
+
+    unpaid.filter(StudentCourseProgress.student_id.in_(student_ids)).update(
+        {StudentCourseProgress.bonus_awarded: True}, synchronize_session=False
+    )
+    award_points_batch([{
+        'student_id': student_id,
+        'points': COURSE_COMPLETION_BONUS,
+        'reason': 'course_completed',
+        'source_id': course_id,
+        'course_id': course_id
+    } for student_id in student_ids])
+
+# Account for lessons added to (or removed from) a course in every student's
+# course and track progress with set-based UPDATEs (does not commit)
+def adjust_course_total(course_id, delta):
+    total_lessons = StudentCourseProgress.total_lessons + delta
+    StudentCourseProgress.query.filter_by(course_id=course_id).update({
+        StudentCourseProgress.total_lessons: total_lessons,
+        **progress_values(StudentCourseProgress.completed_lessons, total_lessons)
+    }, synchronize_session=False)
+    rollup_track_progress(course_id=course_id)
+
+# ---------------LESSON AUTHORING----------------
+
+# Position for a lesson appended to the end of a course
+def next_lesson_position(course_id):
+    return db.session.query(func.coalesce(func.max(Lesson.position) + 1, 0)).filter(Lesson.course_id == course_id).scalar()
+
+def lesson_field_errors(item, creating):
+    for field, max_length in (('title', 100), ('url', 255)):
+        value = item.get(field)
+        if value is None:
+            if creating:
+                return f'{field} is required for new lessons'
+            continue
+        if not isinstance(value, str) or not value.strip():
+            return f'{field} must be a non-empty string'
+        if len(value) > max_length:
+            return f'{field} must be at most {max_length} characters'
+    return None
+
+# Apply a batch of lesson changes to a course (does not commit). items is the
+# new lesson order: entries with an id update that lesson, entries without one
+# create a lesson. Lessons that aren't listed keep their relative order after
+# the listed ones. Returns an error message, or None once everything is applied.
+def apply_lesson_changes(course_id, items, delete_ids):
+    existing = Lesson.query.filter_by(course_id=course_id).order_by(Lesson.position, Lesson.id).all()
+    existing_by_id = {lesson.id: lesson for lesson in existing}
+    if not all(is_id(lesson_id) for lesson_id in delete_ids):
+        return 'Lessons to delete must be given by ID'
+    delete_ids = set(delete_ids)
+
+    if not delete_ids <= existing_by_id.keys():
+        return 'Lessons to delete must belong to this course'
+
+    listed_ids = []
+    for item in items:
+        if not isinstance(item, dict):
+            return 'Each lesson must be an object'
+        lesson_id = item.get('id')
+        if lesson_id is not None:
+            if not is_id(lesson_id):
+                return 'Lesson IDs must be integers'
+            if lesson_id not in existing_by_id:
+                return f'Lesson {lesson_id} does not belong to this course'
+            if lesson_id in delete_ids or lesson_id in listed_ids:
+                return f'Lesson {lesson_id} is listed more than once'
+            listed_ids.append(lesson_id)
+        error = lesson_field_errors(item, creating=lesson_id is None)
+        if error:
+            return error
+
+    creates = []
+    updates = []
+    new_positions = {}
+    for position, item in enumerate(items):
+        lesson_id = item.get('id')
+        if lesson_id is None:
+            creates.append({'course_id': course_id, 'title': item['title'], 'url': item['url'], 'position': position})
+            continue
+        lesson = existing_by_id[lesson_id]
+        if lesson.position != position:
+            new_positions[lesson_id] = position
+        title = item.get('title', lesson.title)
+        url = item.get('url', lesson.url)
+        if (title, url) != (lesson.title, lesson.url):
+            updates.append({'lesson_id': lesson_id, 'title': title, 'url': url})
+
+    # Lessons that weren't listed follow the listed ones, in their current order
+    remaining = [lesson for lesson in existing if lesson.id not in delete_ids and lesson.id not in listed_ids]
+    for position, lesson in enumerate(remaining, len(items)):
+        if lesson.position != position:
+            new_positions[lesson.id] = position
+
+    if delete_ids:
+        # Take the deleted lessons out of each student's completed count first
+        deleted_completed = select(func.count()).select_from(student_lesson_table).where(
+            student_lesson_table.c.student_id == StudentCourseProgress.student_id,
+            student_lesson_table.c.lesson_id.in_(delete_ids)
+        ).scalar_subquery()
+        StudentCourseProgress.query.filter_by(course_id=course_id).update({
+            StudentCourseProgress.completed_lessons: StudentCourseProgress.completed_lessons - deleted_completed
+        }, synchronize_session=False)
+        db.session.execute(student_lesson_table.delete().where(student_lesson_table.c.lesson_id.in_(delete_ids)))
+        Lesson.query.filter(Lesson.id.in_(delete_ids)).delete(synchronize_session=False)
+
+    lessons = Lesson.__table__
+    if updates:
+        db.session.execute(
+            lessons.update().where(lessons.c.id == bindparam('lesson_id')).values(
+                title=bindparam('title'), url=bindparam('url'), updated_date=datetime.utcnow()
+            ),
+            updates
+        )
+
+    # One UPDATE moves every lesson whose position changed
+    if new_positions:
+        Lesson.query.filter(Lesson.id.in_(new_positions)).update(
+            {Lesson.position: case(new_positions, value=Lesson.id)}, synchronize_session=False
+        )
+
+    if creates:
+        db.session.execute(lessons.insert(), creates)
+
+    if creates or delete_ids:
+        adjust_course_total(course_id, len(creates) - len(delete_ids))
+    if delete_ids:
+        # Students whose only incomplete lessons were deleted just finished the course
+        award_completion_bonuses(course_id)
+
+    return None
+
+# ---------------COURSE ROSTER----------------
+
+ROSTER_COLUMNS = [
+    'student_id', 'user_id', 'username', 'progress', 'completed', 'completed_lessons',
+    'total_lessons', 'art_submissions', 'last_activity'
+]
+
+# One row per enrolled student, ordered by student id: progress from the
+# maintained counters and art counts from a grouped subquery, in a single
+# statement so the roster can be paged or streamed without loading the course
+def roster_query(course_id):
+    # Art rows store the student id in user_id (see upload_art)
+    submissions = db.session.query(
+        Art.user_id.label('student_id'),
+        func.count(Art.id).label('art_submissions'),
+        func.max(Art.created_date).label('last_submission')
+    ).filter(Art.course_id == course_id).group_by(Art.user_id).subquery()
+
+    return db.session.query(
+        Student.id.label('student_id'),
+        Student.user_id,
+        User.username,
+        func.coalesce(StudentCourseProgress.progress, 0.0).label('progress'),
+        func.coalesce(StudentCourseProgress.completed, False).label('completed'),
+        func.coalesce(StudentCourseProgress.completed_lessons, 0).label('completed_lessons'),
+        StudentCourseProgress.total_lessons,
+        func.coalesce(submissions.c.art_submissions, 0).label('art_submissions'),
+        StudentCourseProgress.updated_date.label('last_progress'),
+        submissions.c.last_submission
+    ).select_from(student_course_table).join(
+        Student, Student.id == student_course_table.c.student_id
+    ).join(
+        User, User.id == Student.user_id
+    ).outerjoin(
+        StudentCourseProgress,
+        and_(StudentCourseProgress.student_id == Student.id, StudentCourseProgress.course_id == course_id)
+    ).outerjoin(
+        submissions, submissions.c.student_id == Student.id
+    ).filter(student_course_table.c.course_id == course_id).order_by(Student.id)
+
+# Flatten a roster row; last activity is the latest progress change or submission
+def roster_row(row):
+    activity = [moment for moment in (row.last_progress, row.last_submission) if moment]
+    last_activity = max(activity) if activity else None
+    return {
+        'student_id': row.student_id,
+        'user_id': row.user_id,
+        'username': row.username,
+        'progress': row.progress,
+        'completed': bool(row.completed),
+        'completed_lessons': row.completed_lessons,
+        'total_lessons': row.total_lessons,
+        'art_submissions': row.art_submissions,
+        'last_activity': last_activity.isoformat() if last_activity else None
+    }
+
+# ---------------CATALOG SEARCH----------------
+
+# Orderings for catalog search, each with the course id as a tie-breaker
+COURSE_SORTS = {
+    'popular': (Course.student_count.desc(), Course.id.desc()),
+    'recent': (Course.created_date.desc(), Course.id.desc()),
+}
+
+# Filter the catalog by keyword and facets. Within a facet any of the given
+# values matches; across facets all must match. Returns the filtered query of
+# courses and the facet counts of the whole result set.
+def search_courses(keyword=None, type_ids=(), subject_ids=(), skill_levels=()):
+    courses_query = Course.query
+    if keyword:
+        keyword = keyword.lower()
+        courses_query = courses_query.filter(or_(
+            func.lower(Course.title).contains(keyword, autoescape=True),
+            func.lower(Course.description).contains(keyword, autoescape=True)
+        ))
+    if type_ids:
+        courses_query = courses_query.filter(Course.id.in_(
+            select(course_type_table.c.course_id).where(course_type_table.c.type_id.in_(type_ids))
+        ))
+    if subject_ids:
+        courses_query = courses_query.filter(Course.id.in_(
+            select(course_subject_table.c.course_id).where(course_subject_table.c.subject_id.in_(subject_ids))
+        ))
+    if skill_levels:
+        courses_query = courses_query.filter(Course.skill_level.in_(skill_levels))
+
+    # Facets are counted in the database over the matching ids, through the
+    # association tables' indexes
+    matching_ids = courses_query.with_entities(Course.id).subquery()
+    type_counts = db.session.query(course_type_table.c.type_id, func.count()).filter(
+        course_type_table.c.course_id.in_(select(matching_ids.c.id))
+    ).group_by(course_type_table.c.type_id).all()
+    subject_counts = db.session.query(course_subject_table.c.subject_id, func.count()).filter(
+        course_subject_table.c.course_id.in_(select(matching_ids.c.id))
+    ).group_by(course_subject_table.c.subject_id).all()
+    skill_level_counts = courses_query.with_entities(Course.skill_level, func.count(Course.id)).group_by(
+        Course.skill_level
+    ).all()
+
+    facets = {
+        'types': {type_id: count for type_id, count in type_counts},
+        'subjects': {subject_id: count for subject_id, count in subject_counts},
+        'skill_levels': {skill_level: count for skill_level, count in skill_level_counts},
+    }
+    return courses_query, facets
@@ -1,8 +1,14 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from app.models import db, Course, Type, Subject, Teacher, Lesson, Student, StudentCourseProgress
 from app.forms import CourseForm, LessonForm
 from flask_login import current_user, login_required
-from .helper_functions import parse_duration, award_points
+from sqlalchemy.sql import func
+from .helper_functions import parse_duration, requested_fields
+from .course_helpers import next_lesson_position, apply_lesson_changes, enroll_student, withdraw_student, search_courses, COURSE_SORTS, course_loaders, course_cache, cached_catalog, cached_course, invalidate_course, ensure_course_progress, toggle_lesson, adjust_course_total, roster_query, roster_row, ROSTER_COLUMNS
+from .community_helpers import encode_cursor, decode_cursor, cursor_id
+from .recommendation_helpers import recommended_courses
+import csv
+import io
 
 course_routes = Blueprint('courses', __name__)
 
@@ -57,6 +63,7 @@ def create_course():
 
         db.session.add(new_course)
         db.session.commit()
+        invalidate_course(new_course.id)
         return jsonify(new_course.to_dict()), 201
     return jsonify({'errors': form.errors}), 400
 
@@ -114,6 +121,7 @@ def edit_course(course_id):
             course.subjects = [Subject.query.get(subject_id) for subject_id in form.subjects.data]
 
         db.session.commit()
+        invalidate_course(course.id, tracks=True)
         return jsonify(course.to_dict())
     return jsonify({'errors': form.errors}), 400
 
@@ -144,10 +152,13 @@ def add_lesson(course_id):
         new_lesson = Lesson(
             title=form.title.data,
             course_id=course_id,
-            url=form.url.data
+            url=form.url.data,
+            position=next_lesson_position(course_id)
         )
         db.session.add(new_lesson)
+        adjust_course_total(course_id, 1)
         db.session.commit()
+        invalidate_course(course_id, tracks=True)
         return jsonify(new_lesson.to_dict()), 201
     return jsonify({'errors': form.errors}), 400
 
@@ -180,26 +191,180 @@ def edit_lesson(course_id, lesson_id):
         lesson.url = payload['url']
 
     db.session.commit()
+    invalidate_course(course_id, tracks=True)
     return jsonify(lesson.to_dict()), 200
 
 
+# Create, update, delete and reorder the lessons of a course in one request
+@course_routes.route('/<int:course_id>/lessons/bulk', methods=['POST'])
+@login_required
+def bulk_edit_lessons(course_id):
+    """
+    lessons: The lessons in their new order
+        • {"title": ..., "url": ...}: Create a lesson at this position.
+        • {"id": ..., "title"?: ..., "url"?: ...}: Move an existing lesson here, updating the fields given.
+      Lessons left out keep their relative order after the listed ones.
+
+    delete: IDs of lessons to delete
+
+    All changes are applied together or not at all. Returns the course's lessons in order.
+    """
+    if current_user.type != 'teacher':
+        return jsonify({'errors': 'Only teachers can edit lessons'}), 403
+
+    teacher = Teacher.query.filter_by(user_id=current_user.id).first()
+    if not teacher:
+        return jsonify({'errors': 'Teacher not found'}), 404
+
+    course = Course.query.get_or_404(course_id)
+    if course.instructor_id != teacher.id:
+        return jsonify({'errors': 'You are not authorized to edit lessons in this course'}), 403
+
+    payload = request.get_json() or {}
+    items = payload.get('lessons', [])
+    delete_ids = payload.get('delete', [])
+    if not isinstance(items, list) or not isinstance(delete_ids, list):
+        return jsonify({'errors': 'lessons and delete must be lists'}), 400
+
+    error = apply_lesson_changes(course_id, items, delete_ids)
+    if error:
+        db.session.rollback()
+        return jsonify({'errors': error}), 400
+
+    db.session.commit()
+    invalidate_course(course_id, tracks=True)
+
+    lessons = Lesson.query.filter_by(course_id=course_id).order_by(Lesson.position, Lesson.id).all()
+    return jsonify([lesson.to_dict() for lesson in lessons]), 200
+
+
 # Get all courses
 @course_routes.route('/', methods=['GET'])
 def get_all_courses():
-    courses = Course.query.all()
-    return jsonify([course.to_dict() for course in courses])
+    """
+    view: How much of each course to return
+        • full: Every field, including enrolled students and their progress (default).
+        • summary: Only fields whose size doesn't grow with enrollment.
+
+    fields: Comma separated list of the fields to return, instead of a view
+    """
+    fields, error = requested_fields(request.args, Course)
+    if error:
+        return jsonify({'errors': error}), 400
+
+    return jsonify(cached_catalog(fields))
+
+# Search the catalog by keyword and facets, with facet counts for the results
+@course_routes.route('/search', methods=['GET'])
+def search_catalog():
+    """
+    q: Keyword matched against course titles and descriptions
+    types: Comma separated type IDs; courses with any of them match
+    subjects: Comma separated subject IDs; courses with any of them match
+    skill_level: Comma separated skill levels; courses with any of them match
+
+    sort: How to order the results
+        • popular: Most enrolled students first (default).
+        • recent: Newest courses first.
+
+    view / fields: As on the catalog, but the summary view is the default here
+
+    Facet counts are computed over every matching course, not just the current page.
+    """
+    page = request.args.get('page', 1, type=int)
+    per_page = min(request.args.get('per_page', 20, type=int), 100)
+    sort = request.args.get('sort', 'popular')
+
+    def id_list(name):
+        try:
+            return [int(value) for value in request.args.get(name, '').split(',') if value.strip()]
+        except ValueError:
+            return None
+
+    type_ids = id_list('types')
+    subject_ids = id_list('subjects')
+    if type_ids is None or subject_ids is None:
+        return jsonify({'errors': 'types and subjects must be comma separated IDs'}), 400
+    if sort not in COURSE_SORTS:
+        return jsonify({'errors': f"sort must be one of {', '.join(COURSE_SORTS)}"}), 400
+
+    skill_levels = [level.strip() for level in request.args.get('skill_level', '').split(',') if level.strip()]
+    courses_query, facets = search_courses(request.args.get('q', '').strip(), type_ids, subject_ids, skill_levels)
+
+    fields, error = requested_fields(request.args, Course)
+    if error:
+        return jsonify({'errors': error}), 400
+    if 'view' not in request.args and 'fields' not in request.args:
+        fields = Course.SUMMARY_FIELDS
+
+    courses = courses_query.options(*course_loaders(fields)).order_by(*COURSE_SORTS[sort]).paginate(
+        page=page, per_page=per_page
+    )
+
+    return jsonify({
+        'courses': [course.to_dict(fields=fields) for course in courses.items],
+        'facets': facets,
+        'total': courses.total,
+        'pages': courses.pages,
+        'current_page': courses.page
+    }), 200
+
+# Get course recommendations for the current student
+@course_routes.route('/recommended', methods=['GET'])
+@login_required
+def get_recommended_courses():
+    """
+    limit: Number of courses to return (at most 20)
+    view / fields: As on the catalog, but the summary view is the default here
+
+    source is "personalized" when the courses come from the student's interests
+    and enrollments, or "popular" until their recommendations have been computed.
+    """
+    if current_user.type != 'student':
+        return jsonify({'errors': 'Only students can get course recommendations'}), 403
 
-# Get course details based on course id
+    student = Student.query.filter_by(user_id=current_user.id).first()
+    if not student:
+        return jsonify({'errors': 'Student not found'}), 404
+
+    limit = min(request.args.get('limit', 10, type=int), 20)
+    fields, error = requested_fields(request.args, Course)
+    if error:
+        return jsonify({'errors': error}), 400
+    if 'view' not in request.args and 'fields' not in request.args:
+        fields = Course.SUMMARY_FIELDS
+
+    rows, source = recommended_courses(student.id, limit, course_loaders(fields))
+    return jsonify({
+        'courses': [dict(course.to_dict(fields=fields), score=score) for course, score in rows],
+        'source': source
+    }), 200
+
+# Get course details based on course id (supports the same view/fields parameters as the catalog)
 @course_routes.route('/<int:course_id>', methods=['GET'])
 def get_course_details(course_id):
-    course = Course.query.get_or_404(course_id)
-    return jsonify(course.to_dict())
+    fields, error = requested_fields(request.args, Course)
+    if error:
+        return jsonify({'errors': error}), 400
+
+    course = cached_course(course_id, fields)
+    if course is None:
+        return jsonify({'errors': 'Course not found'}), 404
+    return jsonify(course)
+
+# Get the hit/miss counts of the course cache
+@course_routes.route('/cache_stats', methods=['GET'])
+@login_required
+def get_course_cache_stats():
+    if current_user.type != 'teacher':
+        return jsonify({'errors': 'Only teachers can view cache statistics'}), 403
+    return jsonify(course_cache.stats()), 200
 
 
 # Get all lessons of a specific course
 @course_routes.route('/<int:course_id>/lessons', methods=['GET'])
 def get_all_lessons(course_id):
-    lessons = Lesson.query.filter_by(course_id=course_id).all()
+    lessons = Lesson.query.filter_by(course_id=course_id).order_by(Lesson.position, Lesson.id).all()
     return jsonify([lesson.to_dict() for lesson in lessons])
 
 # -------------COURSE PROGRESS ROUTES----------------
@@ -211,15 +376,22 @@ def join_course(course_id):
     if current_user.type != 'student':
         return jsonify({'errors': 'Only students can join courses'}), 403
 
+    fields, error = requested_fields(request.args, Student)
+    if error:
+        return jsonify({'errors': error}), 400
+
     student = Student.query.filter_by(user_id=current_user.id).first()
     course = Course.query.get(course_id)
 
     if not student or not course:
         return jsonify({'errors': 'Student or Course not found'}), 404
 
-    student.joined_courses.append(course)
+    if not enroll_student(student.id, course.id):
+        return jsonify({'errors': 'Course already in student\'s joined courses'}), 400
+    ensure_course_progress(student.id, course.id)
     db.session.commit()
-    return jsonify(student.to_dict()), 200
+    invalidate_course(course.id, tracks=True)
+    return jsonify(student.to_dict(fields=fields)), 200
 
 # Remove a course from a student's joined courses
 @course_routes.route('/withdraw/<int:course_id>', methods=['POST'])
@@ -228,16 +400,20 @@ def unjoin_course(course_id):
     if current_user.type != 'student':
         return jsonify({'errors': 'Only students can withdraw from courses'}), 403
 
+    fields, error = requested_fields(request.args, Student)
+    if error:
+        return jsonify({'errors': error}), 400
+
     student = Student.query.filter_by(user_id=current_user.id).first()
     course = Course.query.get(course_id)
 
     if not student or not course:
         return jsonify({'errors': 'Student or Course not found'}), 404
 
-    if course in student.joined_courses:
-        student.joined_courses.remove(course)
+    if withdraw_student(student.id, course.id):
         db.session.commit()
-        return jsonify(student.to_dict()), 200
+        invalidate_course(course.id, tracks=True)
+        return jsonify(student.to_dict(fields=fields)), 200
     else:
         return jsonify({'errors': 'Course not found in student\'s joined courses'}), 400
 
@@ -249,23 +425,24 @@ def toggle_lesson_completion(course_id, lesson_id):
     if current_user.type != 'student':
         return jsonify({'errors': 'Only students can complete lessons'}), 403
 
+    fields, error = requested_fields(request.args, Student)
+    if error:
+        return jsonify({'errors': error}), 400
+
     student = Student.query.filter_by(user_id=current_user.id).first()
     lesson = Lesson.query.get(lesson_id)
 
     if not student or not lesson or lesson.course_id != course_id:
         return jsonify({'errors': 'Student, Lesson, or Course not found'}), 404
 
-    if lesson in student.completed_lessons:
-        student.completed_lessons.remove(lesson)
-        # Deduct points if lesson is marked incomplete
-        award_points(student, -10)
-    else:
-        student.completed_lessons.append(lesson)
-        # Award points if lesson is marked complete
-        award_points(student, 10)
-
+    # Points are awarded the first time the lesson is completed, plus the
+    # completion bonus the first time the course is finished. Marking a lesson
+    # incomplete keeps its points, and completing it again doesn't repeat them.
+    toggle_lesson(student.id, lesson)
     db.session.commit()
-    return jsonify(student.to_dict()), 200
+    # The course's dict includes every student's progress
+    invalidate_course(course_id)
+    return jsonify(student.to_dict(fields=fields)), 200
 
 # Get progress of a student in a course
 @course_routes.route('/<int:course_id>/progress', methods=['GET'])
@@ -275,32 +452,99 @@ def get_progress(course_id):
         return jsonify({'errors': 'Only students can view progress'}), 403
 
     student = Student.query.filter_by(user_id=current_user.id).first()
-    course = Course.query.get(course_id)
-
-    if not student or not course:
+    if not student:
         return jsonify({'errors': 'Student or Course not found'}), 404
 
-    total_lessons = len(course.lessons)
-    completed_lessons = len([lesson for lesson in student.completed_lessons if lesson.course_id == course_id])
-    progress = (completed_lessons / total_lessons) * 100 if total_lessons > 0 else 0
+    # Counts are kept up to date as lessons are completed, so this only reads one row
+    student_course_progress = StudentCourseProgress.query.get((student.id, course_id))
+    if not student_course_progress:
+        if not Course.query.get(course_id):
+            return jsonify({'errors': 'Student or Course not found'}), 404
+        total_lessons = db.session.query(func.count(Lesson.id)).filter(Lesson.course_id == course_id).scalar()
+        return jsonify({'progress': 0, 'completed': False, 'completed_lessons': 0, 'total_lessons': total_lessons}), 200
 
-    student_course_progress = StudentCourseProgress.query.filter_by(student_id=student.id, course_id=course_id).first()
-    if student_course_progress:
-        student_course_progress.progress = progress
-        student_course_progress.completed = (progress == 100.0)
-    else:
-        new_progress = StudentCourseProgress(
-            student_id=student.id,
-            course_id=course_id,
-            progress=progress,
-            completed=(progress == 100.0)
-        )
-        db.session.add(new_progress)
+    return jsonify({
+        'progress': student_course_progress.progress,
+        'completed': student_course_progress.completed,
+        'completed_lessons': student_course_progress.completed_lessons,
+        'total_lessons': student_course_progress.total_lessons
+    }), 200
 
-    # Award points for completing a course
-    if progress == 100.0:
-        award_points(student, 50)
+# -------------COURSE ROSTER ROUTES----------------
 
-    db.session.commit()
+# Rows fetched per round trip while streaming a roster export
+ROSTER_EXPORT_BATCH_SIZE = 1000
+
+# Find the course if the current user is the teacher who owns it, otherwise the error response
+def get_owned_course(course_id):
+    if current_user.type != 'teacher':
+        return None, (jsonify({'errors': 'Only teachers can view course rosters'}), 403)
+
+    teacher = Teacher.query.filter_by(user_id=current_user.id).first()
+    if not teacher:
+        return None, (jsonify({'errors': 'Teacher not found'}), 404)
 
-    return jsonify({'progress': progress}), 200
+    course = Course.query.get_or_404(course_id)
+    if course.instructor_id != teacher.id:
+        return None, (jsonify({'errors': 'You are not authorized to view this course\'s roster'}), 403)
+
+    return course, None
+
+# Get the students enrolled in a course with their progress, one page at a time
+@course_routes.route('/<int:course_id>/roster', methods=['GET'])
+@login_required
+def get_course_roster(course_id):
+    """
+    per_page: Number of students per page (at most 500)
+    cursor: Pass the next_cursor from the previous response to get the next page
+    """
+    course, error = get_owned_course(course_id)
+    if error:
+        return error
+
+    per_page = min(request.args.get('per_page', 50, type=int), 500)
+    cursor = request.args.get('cursor', None)
+
+    roster = roster_query(course.id)
+    if cursor:
+        cursor_state = decode_cursor(cursor, ['roster', course.id], {'id': cursor_id})
+        if not cursor_state:
+            return jsonify({'errors': 'Invalid cursor'}), 400
+        roster = roster.filter(Student.id > cursor_state['id'])
+
+    rows = roster.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    return jsonify({
+        'students': [roster_row(row) for row in rows],
+        'next_cursor': encode_cursor({'listing': ['roster', course.id], 'id': rows[-1].student_id}) if has_more else None,
+        'has_more': has_more
+    }), 200
+
+# Export the whole roster of a course as CSV, streamed as it is read
+@course_routes.route('/<int:course_id>/roster.csv', methods=['GET'])
+@login_required
+def export_course_roster(course_id):
+    course, error = get_owned_course(course_id)
+    if error:
+        return error
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=ROSTER_COLUMNS)
+        writer.writeheader()
+
+        for index, row in enumerate(roster_query(course.id).yield_per(ROSTER_EXPORT_BATCH_SIZE), 1):
+            writer.writerow(roster_row(row))
+            if index % ROSTER_EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename="course-{course.id}-roster.csv"'}
+    )
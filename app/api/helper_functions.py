@@ -1,8 +1,11 @@
 from app import db
+from app.models import Student, PointsEvent, dialect_insert
+from sqlalchemy import func, select
+from datetime import datetime
 import isodate
 import os
-import re
 from .banned_words import BANNED_WORDS
+from .content_filter import ReloadableMatcher
 
 # Utility function to convert ISO 8601 duration to timedelta
 def parse_duration(duration):
@@ -11,12 +14,86 @@ def parse_duration(duration):
     except isodate.ISO8601Error:
         return None
 
+# Whether a value from a JSON body is a row ID. JSON booleans are ints in
+# python, but never IDs (and postgres won't compare them with integer columns).
+def is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+# ---------------SPARSE FIELDSETS----------------
+
+# The fields of model a request asked for: an explicit comma separated
+# `fields` list, or `view=summary` for the model's SUMMARY_FIELDS. fields is
+# None (every field) for `view=full`, the default. Returns (fields, error),
+# where error names any fields the model doesn't have. Requested fields come
+# back de-duplicated in the model's FIELDS order, so the same set always
+# makes the same cache key.
+def requested_fields(args, model):
+    requested = {field.strip() for field in args.get('fields', '').split(',') if field.strip()}
+    if requested:
+        unknown = requested - set(model.FIELDS)
+        if unknown:
+            return None, f"Unknown fields: {', '.join(sorted(unknown))}. fields must be a comma separated list of {', '.join(model.FIELDS)}"
+        return tuple(field for field in model.FIELDS if field in requested), None
+    if args.get('view') == 'summary':
+        return model.SUMMARY_FIELDS, None
+    return None, None
+
 # ---------------POINTS----------------
 
-# Award points
-def award_points(student, points):
-    student.points += points
-    db.session.commit()
+# Award points for something the student did, at most once per
+# (reason, source_id). Records the award in the ledger and bumps the running
+# total in place, as part of the caller's transaction (does not commit).
+# Returns whether the points were awarded.
+def award_points(student_id, points, reason, source_id, course_id=None):
+    result = db.session.execute(
+        dialect_insert(PointsEvent.__table__).values(
+            student_id=student_id,
+            reason=reason,
+            source_id=source_id,
+            course_id=course_id,
+            points=points,
+            created_date=datetime.utcnow()
+        ).on_conflict_do_nothing(index_elements=['student_id', 'reason', 'source_id'])
+    )
+    if not result.rowcount:
+        return False
+
+    Student.query.filter_by(id=student_id).update({
+        Student.points: Student.points + points,
+        Student.updated_date: Student.updated_date
+    }, synchronize_session=False)
+    return True
+
+# Award many points events at once, for backfills (does not commit). Events
+# already in the ledger are skipped; the totals of the students involved are
+# then recomputed from the ledger. events are dicts with the award_points arguments.
+def award_points_batch(events):
+    if not events:
+        return
+    now = datetime.utcnow()
+    db.session.execute(
+        dialect_insert(PointsEvent.__table__).on_conflict_do_nothing(
+            index_elements=['student_id', 'reason', 'source_id']
+        ),
+        [dict({'course_id': None, 'created_date': now}, **event) for event in events]
+    )
+    recompute_points({event['student_id'] for event in events})
+
+# Set students' running totals to the sum of their ledger (all students if
+# student_ids is None), with one UPDATE (does not commit). Returns the number
+# of students whose total had drifted.
+def recompute_points(student_ids=None):
+    ledger_total = select(func.coalesce(func.sum(PointsEvent.points), 0)).where(
+        PointsEvent.student_id == Student.id
+    ).scalar_subquery()
+
+    students_query = Student.query.filter(Student.points != ledger_total)
+    if student_ids is not None:
+        students_query = students_query.filter(Student.id.in_(student_ids))
+    return students_query.update({
+        Student.points: ledger_total,
+        Student.updated_date: Student.updated_date
+    }, synchronize_session=False)
 
 # ---------------FILE UPLOADS----------------
 
@@ -32,13 +109,37 @@ def file_size_under_limit(file):
     file.seek(0)  # Reset the file position to the beginning
     return file_size <= MAX_FILE_SIZE
 
+# Check the filename and declared size of a file about to be uploaded
+# straight to S3, returning an error message or None
+def direct_upload_error(filename, size, allowed_extensions):
+    if not isinstance(filename, str) or not is_allowed_file(filename, allowed_extensions):
+        return 'File type not allowed'
+    if not isinstance(size, int) or size < 1:
+        return 'size must be the file size in bytes'
+    if size > MAX_FILE_SIZE:
+        return 'File size exceeds limit'
+    return None
+
 # ---------------INAPPROPRIATE CONTENT----------------
 
+# Optional newline-separated file of extra banned words; edits are picked up
+# by running workers without a restart
+BANNED_WORDS_FILE = os.environ.get('BANNED_WORDS_FILE')
+
+def load_banned_words():
+    words = list(BANNED_WORDS)
+    if BANNED_WORDS_FILE and os.path.exists(BANNED_WORDS_FILE):
+        with open(BANNED_WORDS_FILE) as banned_words_file:
+            words.extend(line.strip() for line in banned_words_file)
+    return words
+
+banned_word_matcher = ReloadableMatcher(load_banned_words, watch_path=BANNED_WORDS_FILE)
+
 # Check if text contains inappropriate content
 def contains_inappropriate_content(text):
-    text = text.lower()
-    for word in BANNED_WORDS:
-        if re.search(rf"\b{word}\b", text):
-            return True
-    return False
+    return banned_word_matcher.get().matches(text)
+
+# Find the banned terms in a text, with their positions
+def find_inappropriate_content(text):
+    return banned_word_matcher.get().find(text)
 
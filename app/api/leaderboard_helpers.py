@@ -0,0 +1,136 @@
+# api/leaderboard_helpers.py
+from app.models import db, Student, User, PointsEvent, LeaderboardRank, LeaderboardCheckpoint, track_course_table
+from sqlalchemy import select, literal
+from sqlalchemy.sql import func
+from datetime import datetime, timedelta
+import os
+
+# ---------------MATERIALIZED LEADERBOARDS----------------
+#
+# Leaderboards are materialized into leaderboard_ranks by the refresh job
+# rather than ranked per request: reading the top N is a range scan on
+# (scope, scope_id, rank) and a student's own rank is a primary key lookup.
+#   • global: Student.points
+#   • course: points from the ledger earned in that course
+#   • track: points from the ledger earned in any of the track's courses
+# Only students with points in a scope are ranked in it. Ties share a rank.
+
+LEADERBOARD_SCOPES = ('global', 'course', 'track')
+GLOBAL_SCOPE_ID = 0
+CHECKPOINT_NAME = 'points_events'
+
+# Event ids are handed out before the awarding transaction commits, so an
+# event can become visible after a refresh has already passed its id. The
+# checkpoint only moves past events at least this old; newer ones are looked
+# at again by the next refresh, which rebuilds their boards a second time.
+LEADERBOARD_SETTLE_MINUTES = int(os.environ.get('LEADERBOARD_SETTLE_MINUTES', 10))
+
+# (student_id, points) for every student with points in the scope
+def scope_points(scope, scope_id):
+    if scope == 'global':
+        return select(Student.id.label('student_id'), Student.points.label('points')).where(Student.points > 0)
+
+    total = func.sum(PointsEvent.points)
+    query = select(PointsEvent.student_id.label('student_id'), total.label('points'))
+    if scope == 'course':
+        query = query.where(PointsEvent.course_id == scope_id)
+    else:
+        query = query.join(
+            track_course_table, track_course_table.c.course_id == PointsEvent.course_id
+        ).where(track_course_table.c.track_id == scope_id)
+    return query.group_by(PointsEvent.student_id).having(total > 0)
+
+# Replace a scope's ranks with freshly computed ones in one INSERT ... SELECT
+# (does not commit)
+def rebuild_leaderboard(scope, scope_id):
+    LeaderboardRank.query.filter_by(scope=scope, scope_id=scope_id).delete(synchronize_session=False)
+
+    points = scope_points(scope, scope_id).subquery()
+    ranked = select(
+        literal(scope), literal(scope_id), points.c.student_id, points.c.points,
+        func.rank().over(order_by=points.c.points.desc())
+    )
+    db.session.execute(LeaderboardRank.__table__.insert().from_select(
+        ['scope', 'scope_id', 'student_id', 'points', 'rank'], ranked
+    ))
+
+# Rebuild the leaderboards touched by points awarded since the last run: the
+# global board, the courses the new points were earned in and the tracks
+# holding those courses. Points awarded in the last LEADERBOARD_SETTLE_MINUTES
+# are looked at again by the next run, in case an older award commits after
+# them. full rebuilds every board instead, which also picks up totals
+# corrected by `flask points recompute` (track boards are rebuilt by the track
+# routes when their courses change). Returns the boards rebuilt.
+def refresh_leaderboards(full=False):
+    checkpoint = LeaderboardCheckpoint.query.get(CHECKPOINT_NAME)
+    if not checkpoint:
+        checkpoint = LeaderboardCheckpoint(name=CHECKPOINT_NAME, last_event_id=0)
+        db.session.add(checkpoint)
+
+    last_event_id = db.session.query(func.max(PointsEvent.id)).scalar() or 0
+    after_id = 0 if full else checkpoint.last_event_id
+    if not full and last_event_id <= after_id:
+        return 0
+
+    course_ids = select(PointsEvent.course_id).where(
+        PointsEvent.id > after_id, PointsEvent.id <= last_event_id, PointsEvent.course_id.isnot(None)
+    ).distinct()
+    track_ids = select(track_course_table.c.track_id).where(track_course_table.c.course_id.in_(course_ids)).distinct()
+
+    boards = [('global', GLOBAL_SCOPE_ID)]
+    boards += [('course', course_id) for (course_id,) in db.session.execute(course_ids)]
+    boards += [('track', track_id) for (track_id,) in db.session.execute(track_ids)]
+
+    settled_event_id = db.session.query(func.max(PointsEvent.id)).filter(
+        PointsEvent.id <= last_event_id,
+        PointsEvent.created_date < datetime.utcnow() - timedelta(minutes=LEADERBOARD_SETTLE_MINUTES)
+    ).scalar() or 0
+
+    # One transaction per board, so readers never see a board half rebuilt
+    for scope, scope_id in boards:
+        rebuild_leaderboard(scope, scope_id)
+        db.session.commit()
+
+    if full:
+        # Drop the boards of scopes that no longer have any points
+        for scope in ('course', 'track'):
+            kept = [scope_id for board_scope, scope_id in boards if board_scope == scope]
+            LeaderboardRank.query.filter(
+                LeaderboardRank.scope == scope, LeaderboardRank.scope_id.notin_(kept)
+            ).delete(synchronize_session=False)
+
+    checkpoint.last_event_id = max(checkpoint.last_event_id, settled_event_id)
+    checkpoint.updated_date = datetime.utcnow()
+    db.session.commit()
+    return len(boards)
+
+# ---------------READS----------------
+
+def leaderboard_entry_dict(entry, username):
+    return {
+        'student_id': entry.student_id,
+        'username': username,
+        'points': entry.points,
+        'rank': entry.rank
+    }
+
+# The top `limit` students of a board, best first
+def leaderboard_top(scope, scope_id, limit):
+    rows = db.session.query(LeaderboardRank, User.username).join(
+        Student, Student.id == LeaderboardRank.student_id
+    ).join(
+        User, User.id == Student.user_id
+    ).filter(
+        LeaderboardRank.scope == scope, LeaderboardRank.scope_id == scope_id
+    ).order_by(LeaderboardRank.rank, LeaderboardRank.student_id).limit(limit).all()
+    return [leaderboard_entry_dict(entry, username) for entry, username in rows]
+
+# A student's entry on a board, or None while they have no points in its scope
+def leaderboard_rank_of(scope, scope_id, student_id):
+    entry = LeaderboardRank.query.get((scope, scope_id, student_id))
+    return entry.to_dict() if entry else None
+
+# When the boards were last refreshed, or None if they never have been
+def leaderboard_refreshed_date():
+    checkpoint = LeaderboardCheckpoint.query.get(CHECKPOINT_NAME)
+    return checkpoint.updated_date.isoformat() if checkpoint else None
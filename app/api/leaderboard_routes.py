@@ -0,0 +1,59 @@
+# routes/leaderboard_routes.py
+from flask import Blueprint, request, jsonify
+from app.models import db, Course, Track, Student
+from flask_login import current_user, login_required
+from .leaderboard_helpers import GLOBAL_SCOPE_ID, leaderboard_top, leaderboard_rank_of, leaderboard_refreshed_date
+
+leaderboard_routes = Blueprint('leaderboards', __name__)
+
+MAX_LEADERBOARD_LIMIT = 100
+
+# Top students of a board along with the current student's own entry
+def leaderboard_response(scope, scope_id):
+    limit = min(request.args.get('limit', 10, type=int), MAX_LEADERBOARD_LIMIT)
+    if limit < 1:
+        return jsonify({'errors': 'limit must be positive'}), 400
+
+    me = None
+    if current_user.type == 'student':
+        student_id = db.session.query(Student.id).filter_by(user_id=current_user.id).scalar()
+        if student_id:
+            me = leaderboard_rank_of(scope, scope_id, student_id)
+
+    return jsonify({
+        'scope': scope,
+        'scope_id': scope_id,
+        'leaders': leaderboard_top(scope, scope_id, limit),
+        'me': me,
+        'refreshed_date': leaderboard_refreshed_date()
+    }), 200
+
+# Get the global leaderboard
+@leaderboard_routes.route('/global', methods=['GET'])
+@login_required
+def get_global_leaderboard():
+    """
+    limit: Number of students to return (at most 100)
+
+    me is the current student's entry, or null while they have no points.
+    Boards are refreshed periodically, as of refreshed_date.
+    """
+    return leaderboard_response('global', GLOBAL_SCOPE_ID)
+
+# Get a course's leaderboard, ranked by the points earned in the course
+@leaderboard_routes.route('/courses/<int:course_id>', methods=['GET'])
+@login_required
+def get_course_leaderboard(course_id):
+    if not db.session.query(Course.id).filter_by(id=course_id).scalar():
+        return jsonify({'errors': 'Course not found'}), 404
+
+    return leaderboard_response('course', course_id)
+
+# Get a track's leaderboard, ranked by the points earned in the track's courses
+@leaderboard_routes.route('/tracks/<int:track_id>', methods=['GET'])
+@login_required
+def get_track_leaderboard(track_id):
+    if not db.session.query(Track.id).filter_by(id=track_id).scalar():
+        return jsonify({'errors': 'Track not found'}), 404
+
+    return leaderboard_response('track', track_id)
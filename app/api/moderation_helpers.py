@@ -0,0 +1,120 @@
+# api/moderation_helpers.py
+from app.models import db, CommunityPost, CommunityComment, PollOption, ModerationCheckpoint
+from .helper_functions import banned_word_matcher
+from .content_filter import BannedWordMatcher
+from .community_helpers import remove_post_from_timelines
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+import os
+from sqlalchemy import select
+
+# ---------------BACKFILL SCANNER----------------
+
+# Tables the rescan walks, in order, with the text column checked for each
+SCAN_SOURCES = {
+    'posts': (CommunityPost, CommunityPost.text),
+    'comments': (CommunityComment, CommunityComment.text),
+    'poll_options': (PollOption, PollOption.text),
+}
+
+# Each worker process builds its own matcher once, from the parent's word list
+worker_matcher = None
+
+def init_scan_worker(words):
+    global worker_matcher
+    worker_matcher = BannedWordMatcher(words)
+
+# Runs in a worker: returns the flagged ids of a chunk and the chunk's last id
+def scan_chunk(rows):
+    flagged_ids = [row_id for row_id, text in rows if worker_matcher.matches(text)]
+    return flagged_ids, rows[-1][0]
+
+# Hide flagged rows with set-based UPDATEs (does not commit). Poll options
+# can't be hidden on their own, so their poll post is hidden instead.
+def hide_flagged(source, flagged_ids):
+    if source == 'comments':
+        db.session.query(CommunityComment).filter(CommunityComment.id.in_(flagged_ids)).update(
+            {CommunityComment.hidden: True, CommunityComment.updated_date: CommunityComment.updated_date},
+            synchronize_session=False
+        )
+        return
+
+    if source == 'poll_options':
+        flagged_ids = [post_id for (post_id,) in db.session.query(PollOption.post_id).filter(
+            PollOption.id.in_(flagged_ids)
+        ).distinct()]
+
+    db.session.query(CommunityPost).filter(CommunityPost.id.in_(flagged_ids)).update(
+        {CommunityPost.hidden: True, CommunityPost.updated_date: CommunityPost.updated_date},
+        synchronize_session=False
+    )
+    remove_post_from_timelines(flagged_ids)
+
+# Stream (id, text) rows in id order, chunk by chunk. On postgres this is one
+# query over a server-side cursor on its own connection, so committing progress
+# doesn't close it; sqlite can't write while a read is open on another
+# connection, so there each chunk is its own keyset query on the primary key.
+def stream_chunks(model, column, after_id, chunk_size):
+    if db.engine.dialect.name == 'postgresql':
+        with db.engine.connect() as connection:
+            result = connection.execution_options(stream_results=True).execute(
+                select(model.id, column).where(model.id > after_id, column.isnot(None)).order_by(model.id)
+            )
+            while True:
+                rows = result.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield [tuple(row) for row in rows]
+        return
+
+    while True:
+        rows = db.session.execute(
+            select(model.id, column).where(model.id > after_id, column.isnot(None)).order_by(model.id).limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        yield [tuple(row) for row in rows]
+        after_id = rows[-1][0]
+
+# Rescan stored content against the current banned word list. Each source
+# resumes from its checkpoint unless the word list changed since the last
+# run (or full is set), in which case it starts over from the first row.
+def rescan_content(chunk_size=1000, workers=None, full=False):
+    matcher = banned_word_matcher.get()
+    flagged_counts = {}
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_scan_worker, initargs=(matcher.words,)) as pool:
+        # Bound the chunks in flight so the whole table is never held in memory
+        max_in_flight = (workers or os.cpu_count() or 1) * 2
+
+        for source, (model, column) in SCAN_SOURCES.items():
+            checkpoint = ModerationCheckpoint.query.get(source)
+            if not checkpoint:
+                checkpoint = ModerationCheckpoint(source=source, last_id=0)
+                db.session.add(checkpoint)
+            if full or checkpoint.word_list_version != matcher.version:
+                checkpoint.last_id = 0
+                checkpoint.word_list_version = matcher.version
+
+            flagged_counts[source] = 0
+            pending = deque()
+            chunks = stream_chunks(model, column, checkpoint.last_id, chunk_size)
+            for chunk in chunks:
+                pending.append(pool.submit(scan_chunk, chunk))
+                if len(pending) >= max_in_flight:
+                    flagged_counts[source] += apply_scan_result(source, checkpoint, pending.popleft().result())
+            while pending:
+                flagged_counts[source] += apply_scan_result(source, checkpoint, pending.popleft().result())
+            db.session.commit()
+
+    return flagged_counts
+
+# Results are applied in submission order, so the checkpoint only ever moves
+# past rows that have been scanned
+def apply_scan_result(source, checkpoint, result):
+    flagged_ids, last_id = result
+    if flagged_ids:
+        hide_flagged(source, flagged_ids)
+    checkpoint.last_id = last_id
+    db.session.commit()
+    return len(flagged_ids)
@@ -0,0 +1,142 @@
+# api/recommendation_helpers.py
+from app.models import db, Course, Student, CourseRecommendation, student_course_table, student_type_table, student_subject_table, course_type_table, course_subject_table
+from sqlalchemy import select
+from datetime import datetime
+
+# ---------------BATCH SCORING----------------
+#
+# Scores come from two signals, each scaled to [0, 1] per student:
+#   • interest: how many of the student's types and subjects a course carries
+#   • co-enrollment: "students who joined X also joined Y", from the cosine
+#     similarity of the courses' enrollment columns
+# numpy and scipy are only needed by the refresh job, so they are imported there.
+
+RECOMMENDATIONS_PER_STUDENT = 20
+INTEREST_WEIGHT = 0.4
+CO_ENROLLMENT_WEIGHT = 0.6
+
+# Flag a student for the next incremental refresh (does not commit)
+def mark_recommendations_stale(student_id):
+    Student.query.filter_by(id=student_id).update({
+        Student.recommendations_stale: True,
+        Student.updated_date: Student.updated_date
+    }, synchronize_session=False)
+
+# 0/1 CSR matrix from (row key, column key) pairs
+def incidence_matrix(pairs, row_index, column_index):
+    import numpy as np
+    from scipy import sparse
+
+    cells = [(row_index[row], column_index[column]) for row, column in pairs if row in row_index and column in column_index]
+    rows = np.array([row for row, _ in cells], dtype=np.int64)
+    columns = np.array([column for _, column in cells], dtype=np.int64)
+    return sparse.csr_matrix(
+        (np.ones(len(cells)), (rows, columns)), shape=(len(row_index), len(column_index))
+    )
+
+# Scale each row of a dense matrix so its largest value is 1
+def scale_rows(matrix):
+    import numpy as np
+
+    peaks = matrix.max(axis=1, keepdims=True)
+    return np.divide(matrix, peaks, out=np.zeros_like(matrix), where=peaks > 0)
+
+# Recompute the top courses of every stale student (or every student, with
+# full), batch_size students at a time. Returns how many were refreshed.
+def refresh_recommendations(full=False, batch_size=500, per_student=RECOMMENDATIONS_PER_STUDENT):
+    import numpy as np
+    from scipy import sparse
+
+    course_ids = [course_id for (course_id,) in db.session.query(Course.id).order_by(Course.id)]
+    student_ids = [student_id for (student_id,) in db.session.query(Student.id).order_by(Student.id)]
+    if not course_ids or not student_ids:
+        return 0
+
+    course_index = {course_id: index for index, course_id in enumerate(course_ids)}
+    student_index = {student_id: index for index, student_id in enumerate(student_ids)}
+
+    # Types and subjects share one tag space, kept apart by a prefix
+    student_tags = [(student_id, ('type', type_id)) for student_id, type_id in db.session.execute(select(student_type_table))]
+    student_tags += [(student_id, ('subject', subject_id)) for student_id, subject_id in db.session.execute(select(student_subject_table))]
+    course_tags = [(course_id, ('type', type_id)) for course_id, type_id in db.session.execute(select(course_type_table))]
+    course_tags += [(course_id, ('subject', subject_id)) for course_id, subject_id in db.session.execute(select(course_subject_table))]
+    tag_index = {tag: index for index, tag in enumerate({tag for _, tag in student_tags + course_tags})}
+
+    enrollments = incidence_matrix(db.session.execute(select(student_course_table)), student_index, course_index)
+    student_interests = incidence_matrix(student_tags, student_index, tag_index)
+    course_interests = incidence_matrix(course_tags, course_index, tag_index)
+
+    # Course x course cosine similarity of enrollments, without self-similarity
+    enrollment_counts = np.asarray(enrollments.sum(axis=0)).ravel()
+    inverse_norms = sparse.diags(np.divide(
+        1.0, np.sqrt(enrollment_counts), out=np.zeros_like(enrollment_counts), where=enrollment_counts > 0
+    ))
+    similarity = (inverse_norms @ (enrollments.T @ enrollments) @ inverse_norms).tolil()
+    similarity.setdiag(0)
+    similarity = similarity.tocsr()
+
+    stale_query = db.session.query(Student.id).order_by(Student.id)
+    if not full:
+        stale_query = stale_query.filter(Student.recommendations_stale == True)
+    stale_ids = [student_id for (student_id,) in stale_query]
+
+    per_student = min(per_student, len(course_ids))
+    refreshed = 0
+    for start in range(0, len(stale_ids), batch_size):
+        batch_ids = stale_ids[start:start + batch_size]
+        rows = [student_index[student_id] for student_id in batch_ids]
+        joined = enrollments[rows]
+
+        interest = (student_interests[rows] @ course_interests.T).toarray()
+        co_enrollment = (joined @ similarity).toarray()
+        scores = INTEREST_WEIGHT * scale_rows(interest) + CO_ENROLLMENT_WEIGHT * scale_rows(co_enrollment)
+
+        # Never recommend a course the student already joined
+        scores[joined.nonzero()] = 0
+
+        top = np.argpartition(-scores, per_student - 1, axis=1)[:, :per_student]
+        now = datetime.utcnow()
+        recommendations = []
+        for student_id, row_scores, candidates in zip(batch_ids, scores, top):
+            ranked = [column for column in candidates[np.argsort(-row_scores[candidates], kind='stable')] if row_scores[column] > 0]
+            recommendations.extend({
+                'student_id': student_id,
+                'course_id': course_ids[column],
+                'rank': rank,
+                'score': float(row_scores[column]),
+                'created_date': now
+            } for rank, column in enumerate(ranked))
+
+        CourseRecommendation.query.filter(CourseRecommendation.student_id.in_(batch_ids)).delete(synchronize_session=False)
+        if recommendations:
+            db.session.execute(CourseRecommendation.__table__.insert(), recommendations)
+        Student.query.filter(Student.id.in_(batch_ids)).update({
+            Student.recommendations_stale: False,
+            Student.updated_date: Student.updated_date
+        }, synchronize_session=False)
+        db.session.commit()
+        refreshed += len(batch_ids)
+
+    return refreshed
+
+# ---------------SERVING----------------
+
+# The student's precomputed recommendations, best first, as (course, score)
+# pairs. Falls back to the most popular courses the student hasn't joined
+# until the refresh job has run for them; those come with a score of None.
+def recommended_courses(student_id, limit, loaders=()):
+    # Courses joined since the last refresh are skipped until it runs again
+    joined = select(student_course_table.c.course_id).where(student_course_table.c.student_id == student_id)
+
+    rows = db.session.query(Course, CourseRecommendation.score).join(
+        CourseRecommendation, CourseRecommendation.course_id == Course.id
+    ).filter(
+        CourseRecommendation.student_id == student_id, Course.id.notin_(joined)
+    ).order_by(CourseRecommendation.rank).options(*loaders).limit(limit).all()
+    if rows:
+        return rows, 'personalized'
+
+    popular = Course.query.filter(Course.id.notin_(joined)).order_by(
+        Course.student_count.desc(), Course.id.desc()
+    ).options(*loaders).limit(limit).all()
+    return [(course, None) for course in popular], 'popular'
@@ -0,0 +1,108 @@
+# api/search_helpers.py
+from app.models import db, CommunityPost, CommunityComment
+from sqlalchemy import DDL, Float, Integer, event, literal_column, text
+from sqlalchemy.sql import func
+
+# ---------------FULL-TEXT SEARCH----------------
+#
+# On postgres posts and comments are searched through GIN indexes on
+# to_tsvector('english', text) (see the community search migration), which
+# postgres keeps up to date by itself. On sqlite they are mirrored into an
+# FTS5 table (created and filled by the same migration) that the routes keep
+# in sync through the index/unindex helpers.
+
+SEARCH_CONFIG = literal_column("'english'")
+
+SEARCH_MODELS = {
+    'posts': CommunityPost,
+    'comments': CommunityComment,
+}
+
+SQLITE_SEARCH_TABLE = 'community_search'
+
+# Must match the table created by the community search migration
+SQLITE_SEARCH_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_SEARCH_TABLE} USING fts5("
+    "text, kind UNINDEXED, source_id UNINDEXED, post_id UNINDEXED, tokenize = 'porter unicode61')"
+)
+
+# db.create_all() doesn't know about virtual tables, so databases built from
+# the models rather than the migrations get an (empty) FTS5 table alongside them
+event.listen(db.metadata, 'after_create', DDL(SQLITE_SEARCH_DDL).execute_if(dialect='sqlite'))
+event.listen(db.metadata, 'before_drop', DDL(f"DROP TABLE IF EXISTS {SQLITE_SEARCH_TABLE}").execute_if(dialect='sqlite'))
+
+def uses_fts5():
+    return db.engine.dialect.name == 'sqlite'
+
+def fill_search_table():
+    db.session.execute(text(
+        f"INSERT INTO {SQLITE_SEARCH_TABLE} (text, kind, source_id, post_id) "
+        "SELECT text, 'posts', id, id FROM community_posts WHERE text IS NOT NULL"
+    ))
+    db.session.execute(text(
+        f"INSERT INTO {SQLITE_SEARCH_TABLE} (text, kind, source_id, post_id) "
+        "SELECT text, 'comments', id, post_id FROM community_comments WHERE text IS NOT NULL"
+    ))
+
+# Rebuild the FTS5 table from posts and comments (does not commit, sqlite only)
+def reindex_search():
+    db.session.execute(text(SQLITE_SEARCH_DDL))
+    db.session.execute(text(f"DELETE FROM {SQLITE_SEARCH_TABLE}"))
+    fill_search_table()
+    return db.session.execute(text(f"SELECT count(*) FROM {SQLITE_SEARCH_TABLE}")).scalar()
+
+def _replace_search_row(kind, source_id, post_id, body):
+    db.session.execute(
+        text(f"DELETE FROM {SQLITE_SEARCH_TABLE} WHERE kind = :kind AND source_id = :source_id"),
+        {'kind': kind, 'source_id': source_id}
+    )
+    if body:
+        db.session.execute(
+            text(f"INSERT INTO {SQLITE_SEARCH_TABLE} (text, kind, source_id, post_id) VALUES (:text, :kind, :source_id, :post_id)"),
+            {'text': body, 'kind': kind, 'source_id': source_id, 'post_id': post_id}
+        )
+
+# Add or refresh a post's search entry (does not commit, post must be flushed)
+def index_post(post):
+    if uses_fts5():
+        _replace_search_row('posts', post.id, post.id, post.text)
+
+# Add or refresh a comment's search entry (does not commit, comment must be flushed)
+def index_comment(comment):
+    if uses_fts5():
+        _replace_search_row('comments', comment.id, comment.post_id, comment.text)
+
+# Drop a post's entry along with the entries of its comments (does not commit)
+def unindex_post(post_id):
+    if uses_fts5():
+        db.session.execute(text(f"DELETE FROM {SQLITE_SEARCH_TABLE} WHERE post_id = :post_id"), {'post_id': post_id})
+
+# Drop a comment's search entry (does not commit)
+def unindex_comment(comment_id):
+    if uses_fts5():
+        db.session.execute(
+            text(f"DELETE FROM {SQLITE_SEARCH_TABLE} WHERE kind = 'comments' AND source_id = :source_id"),
+            {'source_id': comment_id}
+        )
+
+# FTS5 treats punctuation in a raw query as syntax, so every word is quoted
+# and the words are ANDed together, like websearch_to_tsquery does for plain input
+def fts5_query(terms):
+    return ' '.join('"' + word.replace('"', '""') + '"' for word in terms.split())
+
+# Subquery of (id, rank) for the rows of `kind` matching terms, where a higher
+# rank is a better match
+def search_matches(kind, terms):
+    if uses_fts5():
+        return text(
+            f"SELECT source_id AS id, -bm25({SQLITE_SEARCH_TABLE}) AS rank FROM {SQLITE_SEARCH_TABLE} "
+            f"WHERE {SQLITE_SEARCH_TABLE} MATCH :query AND kind = :kind"
+        ).bindparams(query=fts5_query(terms), kind=kind).columns(id=Integer, rank=Float).subquery()
+
+    model = SEARCH_MODELS[kind]
+    # Must match the indexed expression exactly for the GIN index to be used
+    vector = func.to_tsvector(SEARCH_CONFIG, func.coalesce(model.text, ''))
+    query = func.websearch_to_tsquery(SEARCH_CONFIG, terms)
+    return db.session.query(
+        model.id.label('id'), func.ts_rank(vector, query).label('rank')
+    ).filter(vector.op('@@')(query)).subquery()
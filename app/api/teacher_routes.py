@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from app.models import db, Teacher, User
 from app.forms import TeacherSignUpForm, LoginForm
 from flask_login import login_user, logout_user, login_required, current_user
+from .track_helpers import invalidate_tracks
 
 teacher_routes = Blueprint('teachers', __name__)
 
@@ -84,6 +85,8 @@ def update_teacher_profile():
                 teacher.bio = form.bio.data
                 teacher.expertise = form.expertise.data
                 db.session.commit()
+                # Expanded tracks embed their teacher
+                invalidate_tracks()
                 return jsonify(teacher.to_dict()), 200
         return jsonify(form.errors), 400
     return jsonify({"error": "Unauthorized access"}), 401
@@ -0,0 +1,245 @@
+# api/track_helpers.py
+from app.models import db, Track, Course, Lesson, StudentCourseProgress, StudentTrackProgress, track_course_table, dialect_insert
+from app.utils.cache import ResponseCache
+from .leaderboard_helpers import rebuild_leaderboard
+from sqlalchemy import and_, case, literal, select
+from sqlalchemy.orm import selectinload
+from sqlalchemy.sql import func
+from datetime import datetime
+
+# ---------------TRACK CACHE----------------
+
+# Cached track responses, expanded or not, all in the 'tracks' namespace. They
+# embed course summaries, lessons and teachers, so course edits, lesson
+# changes and enrollments (through invalidate_course) and teacher profile
+# edits invalidate them along with track edits.
+track_cache = ResponseCache.from_env('tracks')
+
+# Loaders for each include, so an expanded list costs one query per
+# relationship however many tracks and courses it holds
+def track_loaders(include):
+    courses = selectinload(Track.courses)
+    loaders = [courses]
+    if 'courses' in include or 'lessons' in include:
+        loaders += [courses.selectinload(Course.types), courses.selectinload(Course.subjects)]
+    if 'lessons' in include:
+        loaders.append(courses.selectinload(Course.lessons))
+    if 'teacher' in include:
+        loaders.append(selectinload(Track.teacher))
+    return loaders
+
+# The includes asked for in a comma-separated include parameter, in a stable
+# order, or None if any of them is unknown
+def requested_includes(value):
+    include = {name.strip() for name in (value or '').split(',') if name.strip()}
+    if not include <= set(Track.INCLUDES):
+        return None
+    return tuple(name for name in Track.INCLUDES if name in include)
+
+def include_key(include):
+    return ','.join(include) or 'none'
+
+def cached_tracks(include=()):
+    return track_cache.get_or_set('tracks', f'all:{include_key(include)}', lambda: [
+        track.to_dict(include=include)
+        for track in Track.query.options(*track_loaders(include)).order_by(Track.id).all()
+    ])
+
+# Returns None if the track doesn't exist (misses for missing tracks aren't cached)
+def cached_track(track_id, include=()):
+    def build():
+        track = Track.query.options(*track_loaders(include)).get(track_id)
+        return track.to_dict(include=include) if track else None
+
+    return track_cache.get_or_set('tracks', f'{track_id}:{include_key(include)}', build)
+
+# Call after committing a change to anything a track's dict includes
+def invalidate_tracks():
+    track_cache.invalidate('tracks')
+
+# ---------------TRACK PROGRESS----------------
+#
+# student_track_progress rolls a track member's course progress up to the
+# track. Rows exist for track members only and are recomputed, set-based, for
+# the (student, track) pairs a change can affect:
+#   • a lesson toggled: the student's tracks holding the course
+#   • lessons added to or removed from a course: every track holding it
+#   • courses added to or removed from a track: every member of the track
+
+# Recompute the rollup rows matching every filter given (does not commit)
+def rollup_track_progress(student_id=None, track_id=None, course_id=None):
+    rows = StudentTrackProgress.query
+    if student_id is not None:
+        rows = rows.filter(StudentTrackProgress.student_id == student_id)
+    if track_id is not None:
+        rows = rows.filter(StudentTrackProgress.track_id == track_id)
+    if course_id is not None:
+        rows = rows.filter(StudentTrackProgress.track_id.in_(
+            select(track_course_table.c.track_id).where(track_course_table.c.course_id == course_id)
+        ))
+
+    in_track = track_course_table.c.track_id == StudentTrackProgress.track_id
+    own_progress = select(StudentCourseProgress).join(
+        track_course_table, track_course_table.c.course_id == StudentCourseProgress.course_id
+    ).where(in_track, StudentCourseProgress.student_id == StudentTrackProgress.student_id)
+
+    rows.update({
+        StudentTrackProgress.total_courses: select(func.count()).select_from(track_course_table).where(
+            in_track
+        ).scalar_subquery(),
+        StudentTrackProgress.total_lessons: select(func.count(Lesson.id)).join(
+            track_course_table, track_course_table.c.course_id == Lesson.course_id
+        ).where(in_track).scalar_subquery(),
+        StudentTrackProgress.completed_lessons: own_progress.with_only_columns(
+            func.coalesce(func.sum(StudentCourseProgress.completed_lessons), 0)
+        ).scalar_subquery(),
+        StudentTrackProgress.completed_courses: own_progress.with_only_columns(func.count()).where(
+            StudentCourseProgress.completed == True
+        ).scalar_subquery(),
+        StudentTrackProgress.updated_date: datetime.utcnow()
+    }, synchronize_session=False)
+
+    # Derived from the counters just written, like the course progress columns
+    rows.update({
+        StudentTrackProgress.progress: case(
+            (StudentTrackProgress.total_lessons > 0,
+             StudentTrackProgress.completed_lessons * literal(100.0) / StudentTrackProgress.total_lessons),
+            else_=0.0
+        ),
+        StudentTrackProgress.completed: and_(
+            StudentTrackProgress.total_courses > 0,
+            StudentTrackProgress.completed_courses >= StudentTrackProgress.total_courses
+        ),
+        StudentTrackProgress.updated_date: StudentTrackProgress.updated_date
+    }, synchronize_session=False)
+
+# Start a new member's rollup row (does not commit)
+def start_track_progress(student_id, track_id):
+    db.session.execute(dialect_insert(StudentTrackProgress.__table__).values(
+        student_id=student_id,
+        track_id=track_id,
+        completed_courses=0,
+        total_courses=0,
+        completed_lessons=0,
+        total_lessons=0,
+        progress=0.0,
+        completed=False,
+        updated_date=datetime.utcnow()
+    ).on_conflict_do_nothing(index_elements=['student_id', 'track_id']))
+    rollup_track_progress(student_id=student_id, track_id=track_id)
+
+# Drop a former member's rollup row (does not commit)
+def end_track_progress(student_id, track_id):
+    StudentTrackProgress.query.filter_by(student_id=student_id, track_id=track_id).delete(synchronize_session=False)
+
+# The student's progress in each of the track's courses, in track order, from
+# one query. Courses the student hasn't started report no completed lessons.
+def track_course_progress(student_id, track_id):
+    lesson_counts = select(
+        Lesson.course_id, func.count(Lesson.id).label('total_lessons')
+    ).where(Lesson.course_id.in_(
+        select(track_course_table.c.course_id).where(track_course_table.c.track_id == track_id)
+    )).group_by(Lesson.course_id).subquery()
+
+    rows = db.session.query(
+        Course.id, Course.title, lesson_counts.c.total_lessons, StudentCourseProgress
+    ).join(
+        track_course_table, track_course_table.c.course_id == Course.id
+    ).outerjoin(
+        lesson_counts, lesson_counts.c.course_id == Course.id
+    ).outerjoin(
+        StudentCourseProgress, and_(
+            StudentCourseProgress.course_id == Course.id, StudentCourseProgress.student_id == student_id
+        )
+    ).filter(
+        track_course_table.c.track_id == track_id
+    ).order_by(track_course_table.c.order, Course.id).all()
+
+    return [{
+        'course_id': course_id,
+        'title': title,
+        'order': order,
+        'progress': progress.progress if progress else 0.0,
+        'completed': progress.completed if progress else False,
+        'completed_lessons': progress.completed_lessons if progress else 0,
+        'total_lessons': total_lessons or 0,
+        'started': progress is not None
+    } for order, (course_id, title, total_lessons, progress) in enumerate(rows, start=1)]
+
+# ---------------TRACK COURSES----------------
+#
+# Track courses are numbered 1..n without gaps. Edits compare the wanted order
+# with the current one and only write the rows whose order actually changes.
+
+# Courses in a track whose membership changed need the members' progress and
+# the track leaderboard brought up to date (does not commit)
+def track_courses_changed(track_id):
+    rollup_track_progress(track_id=track_id)
+    rebuild_leaderboard('track', track_id)
+
+# Replace a track's ordered course list (does not commit). Courses not listed
+# are removed, new ones are added and the rest are renumbered with one UPDATE.
+# Returns the number of courses added, removed and moved.
+def set_track_courses(track_id, course_ids):
+    current = dict(db.session.execute(
+        select(track_course_table.c.course_id, track_course_table.c.order).where(track_course_table.c.track_id == track_id)
+    ).all())
+    wanted = {course_id: order for order, course_id in enumerate(course_ids, start=1)}
+
+    removed = current.keys() - wanted.keys()
+    if removed:
+        db.session.execute(track_course_table.delete().where(
+            track_course_table.c.track_id == track_id, track_course_table.c.course_id.in_(removed)
+        ))
+
+    moved = {course_id: order for course_id, order in wanted.items() if course_id in current and current[course_id] != order}
+    if moved:
+        db.session.execute(track_course_table.update().where(
+            track_course_table.c.track_id == track_id, track_course_table.c.course_id.in_(moved)
+        ).values(order=case(moved, value=track_course_table.c.course_id)))
+
+    added = [
+        {'track_id': track_id, 'course_id': course_id, 'order': order}
+        for course_id, order in wanted.items() if course_id not in current
+    ]
+    if added:
+        # A concurrent edit that added the same course is overwritten, not an error
+        stmt = dialect_insert(track_course_table)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['track_id', 'course_id'], set_={'order': stmt.excluded.order}
+        ), added)
+
+    if added or removed:
+        track_courses_changed(track_id)
+
+    return {'added': len(added), 'removed': len(removed), 'moved': len(moved)}
+
+# Append a course to the end of a track, returning False if it is already
+# there (does not commit)
+def append_track_course(track_id, course_id):
+    next_order = select(func.coalesce(func.max(track_course_table.c.order), 0) + 1).where(
+        track_course_table.c.track_id == track_id
+    ).scalar_subquery()
+    result = db.session.execute(dialect_insert(track_course_table).values(
+        track_id=track_id, course_id=course_id, order=next_order
+    ).on_conflict_do_nothing(index_elements=['track_id', 'course_id']))
+    if not result.rowcount:
+        return False
+    track_courses_changed(track_id)
+    return True
+
+# Remove a course from a track and close the gap it leaves with one UPDATE,
+# returning False if it wasn't in the track (does not commit)
+def remove_track_course(track_id, course_id):
+    in_track = and_(track_course_table.c.track_id == track_id, track_course_table.c.course_id == course_id)
+    removed = db.session.execute(select(track_course_table.c.order).where(in_track)).first()
+    if not removed:
+        return False
+
+    db.session.execute(track_course_table.delete().where(in_track))
+    if removed.order is not None:
+        db.session.execute(track_course_table.update().where(
+            track_course_table.c.track_id == track_id, track_course_table.c.order > removed.order
+        ).values(order=track_course_table.c.order - 1))
+    track_courses_changed(track_id)
+    return True
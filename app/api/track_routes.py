@@ -1,11 +1,14 @@
 # routes/track_routes.py
 from flask import Blueprint, request, jsonify
-from app.models import db, Track, Course, Student, Teacher, track_course_table
-from ..api.aws_helpers import get_unique_filename, upload_file_to_s3
-from .helper_functions import is_allowed_file
+from app.models import db, Track, Course, Student, Teacher, StudentTrackProgress, track_course_table
+from ..api.aws_helpers import get_unique_filename, upload_file_to_s3, direct_upload_key, direct_upload_prefix, create_presigned_upload, get_uploaded_object
+from .helper_functions import is_allowed_file, is_id, direct_upload_error, MAX_FILE_SIZE
+from .track_helpers import start_track_progress, end_track_progress, track_course_progress, set_track_courses, append_track_course, remove_track_course, requested_includes, cached_tracks, cached_track, invalidate_tracks
 
 from flask_login import current_user, login_required
+from sqlalchemy import case
 from datetime import datetime
+import mimetypes
 
 track_routes = Blueprint('tracks', __name__)
 
@@ -35,70 +38,97 @@ def create_track():
     )
     db.session.add(new_track)
     db.session.commit()
+    invalidate_tracks()
 
     return jsonify(new_track.to_dict()), 201
 
-# Add a course to a track
-@track_routes.route('/<int:track_id>/courses/<int:course_id>', methods=['POST'])
-@login_required
-def add_course_to_track(track_id, course_id):
+# Find the track if the current user is the teacher who created it, otherwise
+# the error response. The track and its creator's user come from one query.
+def get_owned_track(track_id, role_error):
     if current_user.type != 'teacher':
-        return jsonify({'errors': 'Only teachers can add courses to tracks'}), 403
+        return None, (jsonify({'errors': role_error}), 403)
 
-    track = Track.query.get(track_id)
-    if not track:
-        return jsonify({'errors': 'Track not found'}), 404
+    row = db.session.query(Track, Teacher.user_id).join(
+        Teacher, Teacher.id == Track.teacher_id
+    ).filter(Track.id == track_id).first()
+    if not row:
+        return None, (jsonify({'errors': 'Track not found'}), 404)
 
-    teacher = Teacher.query.filter_by(user_id=current_user.id).first()
-    if not teacher:
-        return jsonify({'errors': 'Teacher not found'}), 404
+    track, owner_user_id = row
+    if owner_user_id != current_user.id:
+        return None, (jsonify({'errors': 'You are not the creator of this track'}), 403)
 
-    if track.teacher_id != teacher.id:
-        return jsonify({'errors': 'You are not the creator of this track'}), 403
+    return track, None
+
+# Add a course to a track
+@track_routes.route('/<int:track_id>/courses/<int:course_id>', methods=['POST'])
+@login_required
+def add_course_to_track(track_id, course_id):
+    track, error = get_owned_track(track_id, 'Only teachers can add courses to tracks')
+    if error:
+        return error
 
-    course = Course.query.get(course_id)
-    if not course:
+    if not db.session.query(Course.id).filter_by(id=course_id).scalar():
         return jsonify({'errors': 'Course not found'}), 404
 
-    # Check if the course is already in the track
-    existing_entry = db.session.query(track_course_table).filter_by(track_id=track_id, course_id=course_id).first()
-    if existing_entry:
+    if not append_track_course(track_id, course_id):
         return jsonify({'errors': 'Course already in track'}), 400
-
-    order = len(track.courses) + 1
-    db.session.execute(track_course_table.insert().values(track_id=track_id, course_id=course_id, order=order))
     db.session.commit()
+    invalidate_tracks()
 
     return jsonify(track.to_dict()), 200
 
+# Replace a track's courses with an ordered list of course ids
+@track_routes.route('/<int:track_id>/courses', methods=['PUT'])
+@login_required
+def set_courses_in_track(track_id):
+    """
+    courses: Every course id the track should hold, in order. Courses left out
+    are removed from the track; only rows whose position changes are written.
+    """
+    track, error = get_owned_track(track_id, 'Only teachers can edit courses in tracks')
+    if error:
+        return error
+
+    course_ids = (request.get_json() or {}).get('courses')
+    if not isinstance(course_ids, list) or not all(is_id(course_id) for course_id in course_ids):
+        return jsonify({'errors': 'courses must be a list of course ids'}), 400
+    if len(set(course_ids)) != len(course_ids):
+        return jsonify({'errors': 'A course can only be listed once'}), 400
+
+    found = {course_id for (course_id,) in db.session.query(Course.id).filter(Course.id.in_(course_ids))}
+    missing = [course_id for course_id in course_ids if course_id not in found]
+    if missing:
+        return jsonify({'errors': f'Courses not found: {missing}'}), 404
+
+    changes = set_track_courses(track_id, course_ids)
+    db.session.commit()
+    invalidate_tracks()
+
+    return jsonify({**track.to_dict(), 'changes': changes}), 200
+
 # Reorder courses in a track
 @track_routes.route('/<int:track_id>/reorder_courses', methods=['PUT'])
 @login_required
 def reorder_courses_in_track(track_id):
-    if current_user.type != 'teacher':
-        return jsonify({'errors': 'Only teachers can reorder courses in tracks'}), 403
-
-    track = Track.query.get(track_id)
-    if not track:
-        return jsonify({'errors': 'Track not found'}), 404
-
-    teacher = Teacher.query.filter_by(user_id=current_user.id).first()
-    if not teacher:
-        return jsonify({'errors': 'Teacher not found'}), 404
-
-    if track.teacher_id != teacher.id:
-        return jsonify({'errors': 'You are not the creator of this track'}), 403
+    track, error = get_owned_track(track_id, 'Only teachers can reorder courses in tracks')
+    if error:
+        return error
 
     data = request.get_json()
     new_order = data.get('order')  # Expects a list of course IDs in the new order
 
-    for index, course_id in enumerate(new_order):
+    # One UPDATE renumbers every listed course
+    if new_order:
         db.session.execute(track_course_table.update().where(
             track_course_table.c.track_id == track_id,
-            track_course_table.c.course_id == course_id
-        ).values(order=index + 1))
+            track_course_table.c.course_id.in_(new_order)
+        ).values(order=case(
+            {course_id: index + 1 for index, course_id in enumerate(new_order)}, value=track_course_table.c.course_id
+        )))
 
     db.session.commit()
+    invalidate_tracks()
 
     return jsonify(track.to_dict()), 200
 
@@ -106,35 +136,17 @@ def reorder_courses_in_track(track_id):
 @track_routes.route('/<int:track_id>/courses/<int:course_id>', methods=['DELETE'])
 @login_required
 def remove_course_from_track(track_id, course_id):
-    if current_user.type != 'teacher':
-        return jsonify({'errors': 'Only teachers can remove courses from tracks'}), 403
+    track, error = get_owned_track(track_id, 'Only teachers can remove courses from tracks')
+    if error:
+        return error
 
-    track = Track.query.get(track_id)
-    if not track:
-        return jsonify({'errors': 'Track not found'}), 404
-
-    teacher = Teacher.query.filter_by(user_id=current_user.id).first()
-    if not teacher:
-        return jsonify({'errors': 'Teacher not found'}), 404
-
-    if track.teacher_id != teacher.id:
-        return jsonify({'errors': 'You are not the creator of this track'}), 403
-
-    # Check if the course is in the track
-    course_in_track = db.session.query(track_course_table).filter_by(track_id=track_id, course_id=course_id).first()
-    if not course_in_track:
+    # The courses after it move up, so the order stays gap-free
+    if not remove_track_course(track_id, course_id):
         return jsonify({'errors': 'Course not in track'}), 404
-
-    # Remove the course from the track
-    db.session.execute(track_course_table.delete().where(
-        track_course_table.c.track_id == track_id,
-        track_course_table.c.course_id == course_id
-    ))
     db.session.commit()
+    invalidate_tracks()
 
-    # Ensure the courses are returned in the correct order
-    updated_track = Track.query.get(track_id)
-    return jsonify(updated_track.to_dict()), 200
+    return jsonify(track.to_dict()), 200
 
 # Student joins a track
 @track_routes.route('/<int:track_id>/join', methods=['POST'])
@@ -150,6 +162,8 @@ def join_track(track_id):
         return jsonify({'errors': 'Student or Track not found'}), 404
 
     student.joined_tracks.append(track)
+    db.session.flush()
+    start_track_progress(student.id, track.id)
     db.session.commit()
     return jsonify(student.to_dict()), 200
 
@@ -169,6 +183,7 @@ def withdraw_track(track_id):
     # Check if the track exists in the student's joined tracks
     if track in student.joined_tracks:
         student.joined_tracks.remove(track)
+        end_track_progress(student.id, track.id)
         db.session.commit()
         return jsonify(student.to_dict()), 200
     else:
@@ -178,20 +193,74 @@ def withdraw_track(track_id):
 @track_routes.route('', methods=['GET'])
 @login_required
 def get_all_tracks():
-    tracks = Track.query.all()
-    return jsonify([track.to_dict() for track in tracks]), 200
+    """
+    include: Comma-separated relationships to expand in place: courses,
+    lessons (nested in each course, implies courses) and teacher
+    """
+    include = requested_includes(request.args.get('include'))
+    if include is None:
+        return jsonify({'errors': f'include must be a comma-separated list of {", ".join(Track.INCLUDES)}'}), 400
+
+    return jsonify(cached_tracks(include)), 200
 
 # Get a specific track
 @track_routes.route('/<int:track_id>', methods=['GET'])
 @login_required
 def get_track(track_id):
-    track = Track.query.get(track_id)
-    if not track:
+    """
+    include: As on the track list
+    """
+    include = requested_includes(request.args.get('include'))
+    if include is None:
+        return jsonify({'errors': f'include must be a comma-separated list of {", ".join(Track.INCLUDES)}'}), 400
+
+    track = cached_track(track_id, include)
+    if track is None:
         return jsonify({'errors': 'Track not found'}), 404
 
-    return jsonify(track.to_dict()), 200
+    return jsonify(track), 200
+
+# Get the current student's progress in every track they joined
+@track_routes.route('/progress', methods=['GET'])
+@login_required
+def get_all_track_progress():
+    if current_user.type != 'student':
+        return jsonify({'errors': 'Only students have track progress'}), 403
 
-# Upload downloadable files for a track
+    student = Student.query.filter_by(user_id=current_user.id).first()
+    if not student:
+        return jsonify({'errors': 'Student not found'}), 404
+
+    rows = StudentTrackProgress.query.filter_by(student_id=student.id).all()
+    return jsonify([row.to_dict() for row in rows]), 200
+
+# Get the current student's progress in a track, overall and per course
+@track_routes.route('/<int:track_id>/progress', methods=['GET'])
+@login_required
+def get_track_progress(track_id):
+    if current_user.type != 'student':
+        return jsonify({'errors': 'Only students have track progress'}), 403
+
+    student = Student.query.filter_by(user_id=current_user.id).first()
+    if not student:
+        return jsonify({'errors': 'Student not found'}), 404
+
+    if not db.session.query(Track.id).filter_by(id=track_id).scalar():
+        return jsonify({'errors': 'Track not found'}), 404
+
+    overall = StudentTrackProgress.query.get((student.id, track_id))
+    if not overall:
+        return jsonify({'errors': 'Track not found in student\'s joined tracks'}), 404
+
+    return jsonify({
+        **overall.to_dict(),
+        'courses': track_course_progress(student.id, track_id)
+    }), 200
+
+TRACK_FILE_EXTENSIONS = {"pdf", "doc", "docx", "ppt", "pptx"}
+
+# Upload downloadable files for a track through the server. Prefer the direct
+# upload below for anything large.
 @track_routes.route('/<int:track_id>/files', methods=['POST'])
 @login_required
 def upload_files_for_track(track_id):
@@ -213,7 +282,7 @@ def upload_files_for_track(track_id):
     file_urls = []
 
     for file in files:
-        if file and is_allowed_file(file.filename, {"pdf", "doc", "docx", "ppt", "pptx"}):
+        if file and is_allowed_file(file.filename, TRACK_FILE_EXTENSIONS):
             file_name = get_unique_filename(file.filename)
             file_url_response = upload_file_to_s3(file, file_name)
 
@@ -223,10 +292,83 @@ def upload_files_for_track(track_id):
                 error_message = file_url_response.get("errors", "Unknown error during file upload.")
                 return jsonify({"errors": f"File upload failed: {error_message}"}), 500
 
-    if not track.downloadable_files:
-        track.downloadable_files = []
+    # The JSON column only notices a new list, not one changed in place
+    track.downloadable_files = (track.downloadable_files or []) + file_urls
+    db.session.commit()
+    invalidate_tracks()
 
-    track.downloadable_files.extend(file_urls)
+    return jsonify(track.to_dict()), 200
+
+# Start direct uploads of downloadable files: returns a presigned POST per
+# file, each limited by its policy to its key, content type and size
+@track_routes.route('/<int:track_id>/files/uploads', methods=['POST'])
+@login_required
+def start_track_file_uploads(track_id):
+    """
+    files: [{filename, size}] for each file (pdf, doc, docx, ppt or pptx)
+
+    POST each file to its upload.url with upload.fields as form fields, then
+    call /api/tracks/<track_id>/files/confirm with the keys.
+    """
+    track, error = get_owned_track(track_id, 'Only teachers can upload files for tracks')
+    if error:
+        return error
+
+    files = (request.get_json(silent=True) or {}).get('files')
+    if not isinstance(files, list) or not files or not all(isinstance(file, dict) for file in files):
+        return jsonify({'errors': 'files must be a non-empty list of {filename, size}'}), 400
+
+    uploads = []
+    for file in files:
+        filename = file.get('filename')
+        error = direct_upload_error(filename, file.get('size'), TRACK_FILE_EXTENSIONS)
+        if error:
+            return jsonify({'errors': f"{filename}: {error}"}), 400
+
+        content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        upload = create_presigned_upload(direct_upload_key('tracks', current_user.id, filename), content_type, MAX_FILE_SIZE)
+        if 'errors' in upload:
+            return jsonify({'errors': f"Could not start upload: {upload['errors']}"}), 500
+        uploads.append(upload)
+
+    return jsonify({'uploads': uploads}), 200
+
+# Finish direct uploads: checks each object in S3 and adds it to the track's files
+@track_routes.route('/<int:track_id>/files/confirm', methods=['POST'])
+@login_required
+def confirm_track_file_uploads(track_id):
+    """
+    keys: The upload.key of each file uploaded
+    """
+    track, error = get_owned_track(track_id, 'Only teachers can upload files for tracks')
+    if error:
+        return error
+
+    keys = (request.get_json(silent=True) or {}).get('keys')
+    if not isinstance(keys, list) or not keys or not all(isinstance(key, str) for key in keys):
+        return jsonify({'errors': 'keys must be a non-empty list of upload keys'}), 400
+
+    prefix = direct_upload_prefix('tracks', current_user.id)
+    file_urls = []
+    for key in dict.fromkeys(keys):
+        if not key.startswith(prefix):
+            return jsonify({'errors': 'Unknown upload'}), 403
+
+        uploaded = get_uploaded_object(key)
+        if uploaded is None:
+            return jsonify({'errors': f"{key} has not been uploaded"}), 400
+        if 'errors' in uploaded:
+            return jsonify({'errors': f"Could not check upload: {uploaded['errors']}"}), 500
+        if uploaded['size'] > MAX_FILE_SIZE:
+            return jsonify({'errors': f"{key}: File size exceeds limit"}), 400
+        file_urls.append(uploaded['url'])
+
+    # Lock the row so concurrent confirmations don't drop each other's files,
+    # re-reading it since get_owned_track already loaded it before the lock
+    track = Track.query.filter_by(id=track_id).with_for_update().populate_existing().one()
+    existing = track.downloadable_files or []
+    track.downloadable_files = existing + [url for url in file_urls if url not in existing]
     db.session.commit()
+    invalidate_tracks()
 
     return jsonify(track.to_dict()), 200
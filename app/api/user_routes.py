@@ -3,6 +3,7 @@ from app.models import db, User, Parent, Student
 from app.forms import LoginForm, ParentSignUpForm, StudentSignUpForm, ParentProfileForm, StudentProfileForm
 from datetime import date
 from flask_login import login_user, logout_user, current_user, login_required
+from .helper_functions import requested_fields
 
 user_routes = Blueprint('users', __name__)
 
@@ -184,9 +185,13 @@ def deactivate_parent_and_kids(parent_id):
     db.session.commit()
     return jsonify({'parent_status': 'inactive', 'students_status': 'inactive'}), 200
 
-# A route that gets the current user's profile information
+# A route that gets the current user's profile information. view=summary or
+# fields=... limit the student profiles it includes, as on the course routes.
 @user_routes.route('/profile', methods=['GET'])
 def get_profile():
     if current_user.is_authenticated:
-        return jsonify(current_user.to_dict())
+        student_fields, error = requested_fields(request.args, Student)
+        if error:
+            return jsonify({'errors': error}), 400
+        return jsonify(current_user.to_dict(student_fields=student_fields))
     return jsonify({'errors': 'Not authenticated'}), 401
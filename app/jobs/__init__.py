@@ -0,0 +1,122 @@
+import click
+from flask.cli import AppGroup
+from app.api.community_helpers import rebuild_post_counters, refresh_hot_scores
+from app.api.moderation_helpers import rescan_content
+from app.api.search_helpers import reindex_search
+from app.api.recommendation_helpers import refresh_recommendations
+from app.api.helper_functions import recompute_points
+from app.api.leaderboard_helpers import refresh_leaderboards
+from app.api.art_helpers import backfill_variants
+from app.models import db
+
+# Creates a community group to hold maintenance jobs for the community feed
+# So we can type `flask community --help`
+community_commands = AppGroup('community')
+
+
+# Creates the `flask community rebuild-counters` command
+# Meant to be run periodically to correct any drift in the maintained counters
+@community_commands.command('rebuild-counters')
+def rebuild_counters():
+    result = rebuild_post_counters()
+    click.echo(
+        f"Rebuilt counters: {result['drifted_posts']} post(s) and {result['drifted_poll_options']} poll option(s) "
+        f"had drifted, {result['buckets']} bucket(s) written"
+    )
+
+
+# Creates the `flask community refresh-hot-scores` command
+# Meant to be run periodically; engagement updates scores as it happens,
+# this picks up weight changes, counter corrections and buffered poll votes
+@community_commands.command('refresh-hot-scores')
+@click.option('--batch-size', default=1000, show_default=True, help='Posts updated per batch.')
+def refresh_hot(batch_size):
+    refreshed = refresh_hot_scores(batch_size=batch_size)
+    click.echo(f"Refreshed hot scores for {refreshed} post(s)")
+
+
+# Creates the `flask community reindex-search` command
+# Rebuilds the sqlite FTS5 search table (e.g. after restoring posts outside the
+# app); postgres maintains its search indexes itself
+@community_commands.command('reindex-search')
+def reindex_search_command():
+    if db.engine.dialect.name != 'sqlite':
+        click.echo("Search indexes are maintained by postgres, nothing to rebuild")
+        return
+    indexed = reindex_search()
+    db.session.commit()
+    click.echo(f"Indexed {indexed} post(s) and comment(s)")
+
+
+# Creates a moderation group to hold content moderation jobs
+# So we can type `flask moderation --help`
+moderation_commands = AppGroup('moderation')
+
+
+# Creates the `flask moderation rescan` command
+# Re-checks stored posts, comments and poll options against the banned word
+# list, resuming from the last checkpoint unless the list has changed
+@moderation_commands.command('rescan')
+@click.option('--full', is_flag=True, help='Ignore checkpoints and rescan everything.')
+@click.option('--chunk-size', default=1000, show_default=True, help='Rows scanned per chunk.')
+@click.option('--workers', default=None, type=int, help='Scanner processes (defaults to the CPU count).')
+def rescan(full, chunk_size, workers):
+    flagged_counts = rescan_content(chunk_size=chunk_size, workers=workers, full=full)
+    for source, count in flagged_counts.items():
+        click.echo(f"{source}: {count} flagged and hidden")
+
+
+# Creates a courses group to hold course catalog jobs
+# So we can type `flask courses --help`
+course_commands = AppGroup('courses')
+
+
+# Creates the `flask courses refresh-recommendations` command
+# Meant to be run frequently to pick up students whose enrollments changed, and
+# with --full now and then so everyone sees new courses and co-enrollment trends
+@course_commands.command('refresh-recommendations')
+@click.option('--full', is_flag=True, help='Recompute every student, not only the stale ones.')
+@click.option('--batch-size', default=500, show_default=True, help='Students scored per batch.')
+def refresh_course_recommendations(full, batch_size):
+    refreshed = refresh_recommendations(full=full, batch_size=batch_size)
+    click.echo(f"Refreshed recommendations for {refreshed} student(s)")
+
+
+# Creates a points group to hold jobs for the points ledger
+# So we can type `flask points --help`
+points_commands = AppGroup('points')
+
+
+# Creates the `flask points recompute` command
+# Resets every student's points total to the sum of their ledger entries
+@points_commands.command('recompute')
+def recompute_points_totals():
+    drifted = recompute_points()
+    db.session.commit()
+    click.echo(f"Recomputed points totals: {drifted} student(s) had drifted")
+
+
+# Creates the `flask points refresh-leaderboards` command
+# Meant to be run every few minutes to fold newly awarded points into the
+# leaderboards, and with --full after a recompute
+@points_commands.command('refresh-leaderboards')
+@click.option('--full', is_flag=True, help='Rebuild every leaderboard, not only those with new points.')
+def refresh_points_leaderboards(full):
+    rebuilt = refresh_leaderboards(full=full)
+    click.echo(f"Rebuilt {rebuilt} leaderboard(s)")
+
+
+# Creates an art group to hold jobs for student artwork
+# So we can type `flask art --help`
+art_commands = AppGroup('art')
+
+
+# Creates the `flask art generate-variants` command
+# Renders the gallery variants of artwork uploaded before they existed, and
+# retries any whose rendering after upload failed or never finished
+@art_commands.command('generate-variants')
+@click.option('--batch-size', default=50, show_default=True, help='Originals downloaded per batch.')
+@click.option('--workers', default=None, type=int, help='Rendering processes (defaults to the CPU count).')
+def generate_art_variants(batch_size, workers):
+    counts = backfill_variants(batch_size=batch_size, workers=workers)
+    click.echo(f"Generated variants: {counts['ready']} artwork(s) ready, {counts['failed']} failed")
@@ -1,5 +1,5 @@
 from .db import db
-from .db import environment, SCHEMA, add_prefix_for_prod
+from .db import environment, SCHEMA, add_prefix_for_prod, dialect_insert
 
 # Models
 from .user import User
@@ -11,7 +11,7 @@ from .course import Course
 from .lesson import Lesson
 from .teacher import Teacher
 from .subject import Subject
-from .associations import course_type_table, course_subject_table, student_course_table, student_lesson_table, student_type_table, student_subject_table, StudentCourseProgress, track_course_table, student_track_table
+from .associations import course_type_table, course_subject_table, student_course_table, student_lesson_table, student_type_table, student_subject_table, StudentCourseProgress, StudentTrackProgress, track_course_table, student_track_table
 from .course_request import CourseRequest
 from .track import Track
 from .user_follow import UserFollow
@@ -19,3 +19,12 @@ from .community_comment import CommunityComment
 from .community_posts import CommunityPost
 from .poll_option import PollOption
 from .community_post_like import CommunityPostLike
+from .community_post_bucket import CommunityPostBucket
+from .timeline_entry import TimelineEntry
+from .moderation_checkpoint import ModerationCheckpoint
+from .poll_vote import PollVote
+from .course_recommendation import CourseRecommendation
+from .points_event import PointsEvent
+from .leaderboard_rank import LeaderboardRank
+from .leaderboard_checkpoint import LeaderboardCheckpoint
+from .art_feedback import ArtFeedback
@@ -4,20 +4,42 @@ from datetime import datetime
 class Art(db.Model):
     __tablename__ = 'artworks'
 
+    # Partial indexes over the artworks waiting for feedback, so the teacher
+    # queue is a range read whether or not it is narrowed to a course
+    __table_args__ = (
+        db.Index(
+            'ix_artworks_feedback_queue', 'created_date', 'id',
+            postgresql_where=db.text('open_to_feedback'), sqlite_where=db.text('open_to_feedback = 1')
+        ),
+        db.Index(
+            'ix_artworks_feedback_queue_course_id', 'course_id', 'created_date', 'id',
+            postgresql_where=db.text('open_to_feedback'), sqlite_where=db.text('open_to_feedback = 1')
+        ),
+    )
     if environment == "production":
-        __table_args__ = {'schema': SCHEMA}
+        __table_args__ = __table_args__ + ({'schema': SCHEMA},)
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     type = db.Column(db.String(50), nullable=False)  # gallery, course, and/or portfolio
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=True)  # Optional
-    media_url = db.Column(db.String(255), nullable=False)
+    # Unique, so a direct upload can only ever become one artwork
+    media_url = db.Column(db.String(255), nullable=False, unique=True, index=True)
+    # Resized copies of the original for galleries, filled in after upload:
+    # {name: {'url', 'width', 'height', 'format'}}
+    variants = db.Column(db.JSON, nullable=True)
+    variants_status = db.Column(db.String(20), nullable=False, default='pending', index=True)  # pending, ready, failed
+    width = db.Column(db.Integer, nullable=True)
+    height = db.Column(db.Integer, nullable=True)
     public = db.Column(db.Boolean, nullable=False, default=True)
     open_to_feedback = db.Column(db.Boolean, nullable=False, default=False)
-    feedback = db.Column(db.JSON, nullable=True, default=[])
+    # The teacher currently reviewing the artwork, until their claim expires
+    feedback_claimed_by = db.Column(db.Integer, db.ForeignKey('teachers.id'), nullable=True)
+    feedback_claim_expires = db.Column(db.DateTime, nullable=True)
     created_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    feedback = db.relationship('ArtFeedback', backref='art', lazy=True, order_by='ArtFeedback.id', cascade='all, delete-orphan')
 
     def to_dict(self):
         return {
@@ -27,9 +49,15 @@ class Art(db.Model):
             'user_id': self.user_id,
             'course_id': self.course_id,
             'media_url': self.media_url,
+            'variants': self.variants or {},
+            'variants_status': self.variants_status,
+            'width': self.width,
+            'height': self.height,
             'public': self.public,
             'open_to_feedback': self.open_to_feedback,
-            'feedback': self.feedback,
+            'feedback': [entry.to_dict() for entry in self.feedback],
+            'feedback_claimed_by': self.feedback_claimed_by,
+            'feedback_claim_expires': self.feedback_claim_expires.isoformat() if self.feedback_claim_expires else None,
             'created_date': self.created_date.isoformat(),
             'updated_date': self.updated_date.isoformat()
         }
@@ -0,0 +1,26 @@
+# models/art_feedback.py
+from .db import db, environment, SCHEMA, add_prefix_for_prod
+from datetime import datetime
+
+class ArtFeedback(db.Model):
+    __tablename__ = 'art_feedback'
+
+    if environment == "production":
+        __table_args__ = {'schema': SCHEMA}
+
+    id = db.Column(db.Integer, primary_key=True)
+    art_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('artworks.id')), nullable=False, index=True)
+    teacher_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('teachers.id')), nullable=False, index=True)
+    teacher_name = db.Column(db.String(100), nullable=False)  # As it was when the feedback was given
+    feedback = db.Column(db.Text, nullable=False, default='')
+    created_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Same shape as the entries of the old Art.feedback JSON list
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'teacher_id': self.teacher_id,
+            'teacher_name': self.teacher_name,
+            'feedback': self.feedback,
+            'date': self.created_date.isoformat()
+        }
@@ -1,16 +1,19 @@
 # models/associations.py
 from .db import db, environment, SCHEMA, add_prefix_for_prod
+from datetime import datetime
 
 # Association table for Courses and Types
 course_type_table = db.Table('course_types',
     db.Column('course_id', db.Integer, db.ForeignKey('courses.id'), primary_key=True),
-    db.Column('type_id', db.Integer, db.ForeignKey('types.id'), primary_key=True)
+    # Indexed on its own for catalog search; the primary key leads with course_id
+    db.Column('type_id', db.Integer, db.ForeignKey('types.id'), primary_key=True, index=True)
 )
 
 # Association table for Courses and Subjects
 course_subject_table = db.Table('course_subjects',
     db.Column('course_id', db.Integer, db.ForeignKey('courses.id'), primary_key=True),
-    db.Column('subject_id', db.Integer, db.ForeignKey('subjects.id'), primary_key=True)
+    # Indexed on its own for catalog search; the primary key leads with course_id
+    db.Column('subject_id', db.Integer, db.ForeignKey('subjects.id'), primary_key=True, index=True)
 )
 
 # Association table for Student and Types
@@ -29,7 +32,8 @@ student_subject_table = db.Table('student_subjects',
 student_course_table = db.Table(
     'student_courses',
     db.Column('student_id', db.Integer, db.ForeignKey(add_prefix_for_prod('students.id')), primary_key=True),
-    db.Column('course_id', db.Integer, db.ForeignKey(add_prefix_for_prod('courses.id')), primary_key=True)
+    # Indexed on its own for course rosters; the primary key leads with student_id
+    db.Column('course_id', db.Integer, db.ForeignKey(add_prefix_for_prod('courses.id')), primary_key=True, index=True)
 )
 
 # Association table for Student and Lessons (completed lessons)
@@ -64,6 +68,55 @@ class StudentCourseProgress(db.Model):
     course_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('courses.id')), primary_key=True)
     progress = db.Column(db.Float, nullable=False, default=0.0)
     completed = db.Column(db.Boolean, nullable=False, default=False)
+    # Maintained by the lesson routes so reading progress is a single row lookup
+    completed_lessons = db.Column(db.Integer, nullable=False, default=0)
+    total_lessons = db.Column(db.Integer, nullable=False, default=0)
+    # Set the first time the course is completed, so the bonus is only paid once
+    bonus_awarded = db.Column(db.Boolean, nullable=False, default=False)
+    updated_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'student_id': self.student_id,
+            'course_id': self.course_id,
+            'progress': self.progress,
+            'completed': self.completed,
+            'completed_lessons': self.completed_lessons,
+            'total_lessons': self.total_lessons,
+            'updated_date': self.updated_date.isoformat()
+        }
+
+
+class StudentTrackProgress(db.Model):
+    __tablename__ = 'student_track_progress'
+
+    if environment == "production":
+        __table_args__ = {'schema': SCHEMA}
+
+    # Rollup of a track member's course progress, maintained by the course and
+    # track routes so a student's progress through a track is one row lookup
+    student_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('students.id')), primary_key=True)
+    track_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('tracks.id')), primary_key=True, index=True)
+    completed_courses = db.Column(db.Integer, nullable=False, default=0)
+    total_courses = db.Column(db.Integer, nullable=False, default=0)
+    completed_lessons = db.Column(db.Integer, nullable=False, default=0)
+    total_lessons = db.Column(db.Integer, nullable=False, default=0)
+    progress = db.Column(db.Float, nullable=False, default=0.0)  # Share of the track's lessons completed
+    completed = db.Column(db.Boolean, nullable=False, default=False)
+    updated_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'student_id': self.student_id,
+            'track_id': self.track_id,
+            'progress': self.progress,
+            'completed': self.completed,
+            'completed_courses': self.completed_courses,
+            'total_courses': self.total_courses,
+            'completed_lessons': self.completed_lessons,
+            'total_lessons': self.total_lessons,
+            'updated_date': self.updated_date.isoformat()
+        }
 
 
 # # Association table for Student and Courses (progress)
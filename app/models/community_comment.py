@@ -13,6 +13,7 @@ class CommunityComment(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('users.id')), nullable=False)
     text = db.Column(db.Text, nullable=False)
     parent_comment_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('community_comments.id')), nullable=True)
+    hidden = db.Column(db.Boolean, nullable=False, default=False)
     created_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -28,5 +29,18 @@ class CommunityComment(db.Model):
             'parent_comment_id': self.parent_comment_id,
             'created_date': self.created_date.isoformat(),
             'updated_date': self.updated_date.isoformat(),
-            'replies': [reply.to_dict() for reply in self.replies]
+            'replies': [reply.to_dict() for reply in self.replies if not reply.hidden]
+        }
+
+    # Comment without its reply tree, only the number of direct replies
+    def to_preview_dict(self, reply_count):
+        return {
+            'id': self.id,
+            'post_id': self.post_id,
+            'user_id': self.user_id,
+            'text': self.text,
+            'parent_comment_id': self.parent_comment_id,
+            'created_date': self.created_date.isoformat(),
+            'updated_date': self.updated_date.isoformat(),
+            'reply_count': reply_count
         }
@@ -0,0 +1,26 @@
+# models/community_post_bucket.py
+from .db import db, environment, SCHEMA, add_prefix_for_prod
+
+class CommunityPostBucket(db.Model):
+    __tablename__ = 'community_post_buckets'
+
+    # Hourly rollup of likes/comments per post, so windowed feed sorts can
+    # sum a handful of buckets instead of aggregating the raw like/comment rows
+    __table_args__ = (
+        db.Index('ix_community_post_buckets_bucket_start_post_id', 'bucket_start', 'post_id'),
+    )
+    if environment == "production":
+        __table_args__ = __table_args__ + ({'schema': SCHEMA},)
+
+    post_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('community_posts.id')), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    like_count = db.Column(db.Integer, nullable=False, default=0)
+    comment_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'post_id': self.post_id,
+            'bucket_start': self.bucket_start.isoformat(),
+            'like_count': self.like_count,
+            'comment_count': self.comment_count
+        }
@@ -16,6 +16,9 @@ class CommunityPost(db.Model):
     created_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     hidden = db.Column(db.Boolean, nullable=False, default=False)
+    like_count = db.Column(db.Integer, nullable=False, default=0, index=True)
+    comment_count = db.Column(db.Integer, nullable=False, default=0, index=True)
+    hot_score = db.Column(db.Float, nullable=False, default=0.0, index=True)
 
     user = db.relationship('User', backref=db.backref('community_posts', lazy=True))
     poll_options = db.relationship('PollOption', backref='community_post', lazy=True)
@@ -34,5 +37,28 @@ class CommunityPost(db.Model):
             'hidden': self.hidden,
             'poll_options': [option.to_dict() for option in self.poll_options],
             'likes': [like.user_id for like in self.likes],
-            'comments': [comment.to_dict() for comment in self.comments]
+            'like_count': self.like_count,
+            'comment_count': self.comment_count,
+            'comments': [comment.to_dict() for comment in self.comments if not comment.hidden]
+        }
+
+    # Feed representation: like/comment aggregates instead of the full liker
+    # list and comment tree. The related rows are passed in, already bulk
+    # loaded for the whole page, so no relationship is touched here.
+    def to_feed_dict(self, poll_options, liked_by_me, comments):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'post_type': self.post_type,
+            'text': self.text,
+            'image_url': self.image_url,
+            'created_date': self.created_date.isoformat(),
+            'updated_date': self.updated_date.isoformat(),
+            'hidden': self.hidden,
+            'poll_options': [option.to_dict() for option in poll_options],
+            'like_count': self.like_count,
+            'liked_by_me': liked_by_me,
+            'comment_count': self.comment_count,
+            'hot_score': self.hot_score,
+            'comments': comments
         }
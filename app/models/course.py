@@ -12,7 +12,7 @@ class Course(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=False)
-    skill_level = db.Column(db.String(20), nullable=False)
+    skill_level = db.Column(db.String(20), nullable=False, index=True)
     type = db.Column(db.String(20), nullable=False)
     instructor_id = db.Column(db.Integer, db.ForeignKey('teachers.id'), nullable=True)
     materials = db.Column(db.JSON, nullable=True)
@@ -21,35 +21,53 @@ class Course(db.Model):
     tips = db.Column(db.Text, nullable=True)
     terms = db.Column(db.Text, nullable=True)
     files = db.Column(db.JSON, nullable=True)
+    # Maintained by join/withdraw so catalog search can sort by popularity
+    student_count = db.Column(db.Integer, nullable=False, default=0, index=True)
     types = db.relationship('Type', secondary=course_type_table, backref=db.backref('courses', lazy=True))
     subjects = db.relationship('Subject', secondary=course_subject_table, backref=db.backref('courses', lazy=True))
-    created_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    created_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
     updated_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     student_work = db.relationship('Art', backref='course', lazy=True)
-    lessons = db.relationship('Lesson', backref='course', lazy=True)
+    lessons = db.relationship('Lesson', backref='course', lazy=True, order_by='Lesson.position')
     students = db.relationship('Student', secondary=student_course_table, backref=db.backref('courses_joined', lazy=True))
     students_progress = db.relationship('StudentCourseProgress', backref='course', lazy=True)
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'title': self.title,
-            'description': self.description,
-            'skill_level': self.skill_level,
-            'type': self.type,
-            'instructor_id': self.instructor_id,
-            'materials': self.materials if self.materials else [],
-            'length': str(self.length),
-            'intro_video': self.intro_video,
-            'tips': self.tips,
-            'terms': self.terms,
-            'files': self.files if self.files else [],
-            'created_date': self.created_date.isoformat(),
-            'updated_date': self.updated_date.isoformat(),
-            'student_work': [art.id for art in self.student_work],  # Only include art IDs
-            'lessons': [lesson.id for lesson in self.lessons],  # Only include lesson IDs
-            'types': [type_.id for type_ in self.types],  # Only include type IDs
-            'subjects': [subject.id for subject in self.subjects],  # Only include subject IDs
-            'students': [student.id for student in self.students],  # Only include student IDs
-            'students_progress': {sp.student_id: {'progress': sp.progress, 'completed': sp.completed} for sp in self.students_progress}
+    # Every field to_dict can return, in the order it returns them
+    FIELDS = (
+        'id', 'title', 'description', 'skill_level', 'type', 'instructor_id', 'materials', 'length',
+        'intro_video', 'tips', 'terms', 'files', 'student_count', 'created_date', 'updated_date',
+        'student_work', 'lessons', 'types', 'subjects', 'students', 'students_progress'
+    )
+
+    # Fields returned by the summary view; none of them grow with enrollment
+    SUMMARY_FIELDS = (
+        'id', 'title', 'description', 'skill_level', 'type', 'instructor_id', 'length',
+        'intro_video', 'student_count', 'created_date', 'updated_date', 'types', 'subjects'
+    )
+
+    # Pass fields to serialize only those; relationships that aren't asked for are never loaded
+    def to_dict(self, fields=None):
+        serializers = {
+            'id': lambda: self.id,
+            'title': lambda: self.title,
+            'description': lambda: self.description,
+            'skill_level': lambda: self.skill_level,
+            'type': lambda: self.type,
+            'instructor_id': lambda: self.instructor_id,
+            'materials': lambda: self.materials if self.materials else [],
+            'length': lambda: str(self.length),
+            'intro_video': lambda: self.intro_video,
+            'tips': lambda: self.tips,
+            'terms': lambda: self.terms,
+            'files': lambda: self.files if self.files else [],
+            'student_count': lambda: self.student_count,
+            'created_date': lambda: self.created_date.isoformat(),
+            'updated_date': lambda: self.updated_date.isoformat(),
+            'student_work': lambda: [art.id for art in self.student_work],  # Only include art IDs
+            'lessons': lambda: [lesson.id for lesson in self.lessons],  # Only include lesson IDs
+            'types': lambda: [type_.id for type_ in self.types],  # Only include type IDs
+            'subjects': lambda: [subject.id for subject in self.subjects],  # Only include subject IDs
+            'students': lambda: [student.id for student in self.students],  # Only include student IDs
+            'students_progress': lambda: {sp.student_id: {'progress': sp.progress, 'completed': sp.completed} for sp in self.students_progress}
         }
+        return {name: serializers[name]() for name in (fields or serializers) if name in serializers}
@@ -0,0 +1,29 @@
+# models/course_recommendation.py
+from .db import db, environment, SCHEMA, add_prefix_for_prod
+from datetime import datetime
+
+class CourseRecommendation(db.Model):
+    __tablename__ = 'course_recommendations'
+
+    # Precomputed top-N courses per student, rewritten by the recommendation
+    # refresh job, so serving recommendations is one range scan by rank
+    __table_args__ = (
+        db.Index('ix_course_recommendations_student_id_rank', 'student_id', 'rank'),
+    )
+    if environment == "production":
+        __table_args__ = __table_args__ + ({'schema': SCHEMA},)
+
+    student_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('students.id')), primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('courses.id')), primary_key=True, index=True)
+    rank = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    created_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'student_id': self.student_id,
+            'course_id': self.course_id,
+            'rank': self.rank,
+            'score': self.score,
+            'created_date': self.created_date.isoformat()
+        }
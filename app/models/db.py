@@ -1,4 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 import os
 environment = os.getenv("FLASK_ENV")
@@ -13,3 +15,10 @@ def add_prefix_for_prod(attr):
         return f"{SCHEMA}.{attr}"
     else:
         return attr
+
+# helper function for building an INSERT that supports ON CONFLICT clauses
+# (upserts) on both postgres in production and sqlite in development
+def dialect_insert(table):
+    if db.engine.dialect.name == "postgresql":
+        return postgresql_insert(table)
+    return sqlite_insert(table)
@@ -0,0 +1,20 @@
+# models/leaderboard_checkpoint.py
+from .db import db, environment, SCHEMA
+from datetime import datetime
+
+class LeaderboardCheckpoint(db.Model):
+    __tablename__ = 'leaderboard_checkpoints'
+
+    if environment == "production":
+        __table_args__ = {'schema': SCHEMA}
+
+    name = db.Column(db.String(50), primary_key=True)
+    last_event_id = db.Column(db.Integer, nullable=False, default=0)  # Every points event up to here has committed and been folded into the leaderboards
+    updated_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'last_event_id': self.last_event_id,
+            'updated_date': self.updated_date.isoformat()
+        }
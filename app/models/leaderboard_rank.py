@@ -0,0 +1,28 @@
+# models/leaderboard_rank.py
+from .db import db, environment, SCHEMA, add_prefix_for_prod
+
+class LeaderboardRank(db.Model):
+    __tablename__ = 'leaderboard_ranks'
+
+    # Materialized leaderboards, rebuilt per scope by the refresh job: top-N is
+    # a range scan on (scope, scope_id, rank), a student's rank a key lookup
+    __table_args__ = (
+        db.Index('ix_leaderboard_ranks_scope_scope_id_rank', 'scope', 'scope_id', 'rank'),
+    )
+    if environment == "production":
+        __table_args__ = __table_args__ + ({'schema': SCHEMA},)
+
+    scope = db.Column(db.String(10), primary_key=True)  # global, course, track
+    scope_id = db.Column(db.Integer, primary_key=True)  # course or track id, 0 for global
+    student_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('students.id')), primary_key=True)
+    points = db.Column(db.Integer, nullable=False)
+    rank = db.Column(db.Integer, nullable=False)
+
+    def to_dict(self):
+        return {
+            'scope': self.scope,
+            'scope_id': self.scope_id,
+            'student_id': self.student_id,
+            'points': self.points,
+            'rank': self.rank
+        }
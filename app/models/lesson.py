@@ -4,13 +4,19 @@ from datetime import datetime
 class Lesson(db.Model):
     __tablename__ = 'lessons'
 
+    __table_args__ = (
+        db.Index('ix_lessons_course_id_position', 'course_id', 'position'),
+    )
+
     if environment == "production":
-        __table_args__ = {'schema': SCHEMA}
+        __table_args__ = __table_args__ + ({'schema': SCHEMA},)
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
     url = db.Column(db.String(255), nullable=False)
+    # Order of the lesson within its course, starting at 0
+    position = db.Column(db.Integer, nullable=False, default=0)
     created_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -20,6 +26,7 @@ class Lesson(db.Model):
             'title': self.title,
             'course_id': self.course_id,
             'url': self.url,
+            'position': self.position,
             'created_date': self.created_date.isoformat(),
             'updated_date': self.updated_date.isoformat()
         }
@@ -0,0 +1,22 @@
+# models/moderation_checkpoint.py
+from .db import db, environment, SCHEMA
+from datetime import datetime
+
+class ModerationCheckpoint(db.Model):
+    __tablename__ = 'moderation_checkpoints'
+
+    if environment == "production":
+        __table_args__ = {'schema': SCHEMA}
+
+    source = db.Column(db.String(50), primary_key=True)  # posts, comments, poll_options
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    word_list_version = db.Column(db.String(40), nullable=True)
+    updated_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'source': self.source,
+            'last_id': self.last_id,
+            'word_list_version': self.word_list_version,
+            'updated_date': self.updated_date.isoformat()
+        }
@@ -0,0 +1,33 @@
+# models/points_event.py
+from .db import db, environment, SCHEMA, add_prefix_for_prod
+from datetime import datetime
+
+class PointsEvent(db.Model):
+    __tablename__ = 'points_events'
+
+    # Append-only ledger of points awarded. Student.points is the running
+    # total; an award is recorded at most once per (student, reason, source).
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'reason', 'source_id', name='uq_points_events_student_id_reason_source_id'),
+    )
+    if environment == "production":
+        __table_args__ = __table_args__ + ({'schema': SCHEMA},)
+
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('students.id')), nullable=False)
+    reason = db.Column(db.String(50), nullable=False)  # lesson_completed, course_completed, art_upload, legacy_balance
+    source_id = db.Column(db.Integer, nullable=False)  # id of the lesson, course, art, ... the points are for
+    course_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('courses.id')), nullable=True, index=True)
+    points = db.Column(db.Integer, nullable=False)
+    created_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'student_id': self.student_id,
+            'reason': self.reason,
+            'source_id': self.source_id,
+            'course_id': self.course_id,
+            'points': self.points,
+            'created_date': self.created_date.isoformat()
+        }
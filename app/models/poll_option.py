@@ -8,9 +8,11 @@ class PollOption(db.Model):
         __table_args__ = {'schema': SCHEMA}
 
     id = db.Column(db.Integer, primary_key=True)
-    post_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('community_posts.id')), nullable=False)
+    post_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('community_posts.id')), nullable=False, index=True)
     text = db.Column(db.String(255), nullable=False)
     vote_count = db.Column(db.Integer, nullable=False, default=0)
+    # Votes cast before the poll_votes ledger existed, which have no voter row
+    legacy_vote_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     def to_dict(self):
         return {
@@ -0,0 +1,29 @@
+# models/poll_vote.py
+from .db import db, environment, SCHEMA, add_prefix_for_prod
+from datetime import datetime
+
+class PollVote(db.Model):
+    __tablename__ = 'poll_votes'
+
+    # One vote per user per poll; results are aggregated per option from here
+    __table_args__ = (
+        db.UniqueConstraint('post_id', 'user_id', name='uq_poll_votes_post_id_user_id'),
+        db.Index('ix_poll_votes_post_id_option_id', 'post_id', 'option_id'),
+    )
+    if environment == "production":
+        __table_args__ = __table_args__ + ({'schema': SCHEMA},)
+
+    id = db.Column(db.Integer, primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('community_posts.id')), nullable=False)
+    option_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('poll_options.id')), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('users.id')), nullable=False)
+    created_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'post_id': self.post_id,
+            'option_id': self.option_id,
+            'user_id': self.user_id,
+            'created_date': self.created_date.isoformat()
+        }
@@ -16,7 +16,9 @@ class Student(db.Model):
     bio = db.Column(db.Text, nullable=True)
     date_of_birth = db.Column(db.Date, nullable=True)
     skill_level = db.Column(db.String(20), nullable=True)
-    points = db.Column(db.Integer, nullable=False, default=0)
+    points = db.Column(db.Integer, nullable=False, default=0, index=True)
+    # Set when enrollments or interests change; the recommendation refresh only recomputes these students
+    recommendations_stale = db.Column(db.Boolean, nullable=False, default=True, index=True)
     types = db.relationship('Type', secondary=student_type_table, backref=db.backref('students', lazy=True))
     subjects = db.relationship('Subject', secondary=student_subject_table, backref=db.backref('students', lazy=True))
     joined_courses = db.relationship('Course', secondary=student_course_table, backref=db.backref('students_joined', lazy=True))
@@ -26,22 +28,37 @@ class Student(db.Model):
     created_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'parent_id': self.parent_id,
-            'profile_pic': self.profile_pic,
-            'bio': self.bio,
-            'date_of_birth': self.date_of_birth.isoformat() if self.date_of_birth else None,
-            'skill_level': self.skill_level,
-            'points': self.points,
-            'types': [type_.id for type_ in self.types],  # Only include type IDs
-            'subjects': [subject.id for subject in self.subjects],  # Only include subject IDs
-            'joined_courses': [course.id for course in self.joined_courses],  # Only include course IDs
-            'completed_lessons': [lesson.id for lesson in self.completed_lessons],  # Only include lesson IDs
-            'course_progress': {cp.course_id: {'progress': cp.progress, 'completed': cp.completed} for cp in self.course_progress},
-            'joined_tracks': [track.id for track in self.joined_tracks],  # Only include track IDs
-            'created_date': self.created_date.isoformat(),
-            'updated_date': self.updated_date.isoformat()
+    # Every field to_dict can return, in the order it returns them
+    FIELDS = (
+        'id', 'user_id', 'parent_id', 'profile_pic', 'bio', 'date_of_birth', 'skill_level', 'points',
+        'types', 'subjects', 'joined_courses', 'completed_lessons', 'course_progress', 'joined_tracks',
+        'created_date', 'updated_date'
+    )
+
+    # Fields returned by the summary view; none of them grow with the student's history
+    SUMMARY_FIELDS = (
+        'id', 'user_id', 'parent_id', 'profile_pic', 'bio', 'date_of_birth', 'skill_level',
+        'points', 'types', 'subjects', 'created_date', 'updated_date'
+    )
+
+    # Pass fields to serialize only those; relationships that aren't asked for are never loaded
+    def to_dict(self, fields=None):
+        serializers = {
+            'id': lambda: self.id,
+            'user_id': lambda: self.user_id,
+            'parent_id': lambda: self.parent_id,
+            'profile_pic': lambda: self.profile_pic,
+            'bio': lambda: self.bio,
+            'date_of_birth': lambda: self.date_of_birth.isoformat() if self.date_of_birth else None,
+            'skill_level': lambda: self.skill_level,
+            'points': lambda: self.points,
+            'types': lambda: [type_.id for type_ in self.types],  # Only include type IDs
+            'subjects': lambda: [subject.id for subject in self.subjects],  # Only include subject IDs
+            'joined_courses': lambda: [course.id for course in self.joined_courses],  # Only include course IDs
+            'completed_lessons': lambda: [lesson.id for lesson in self.completed_lessons],  # Only include lesson IDs
+            'course_progress': lambda: {cp.course_id: {'progress': cp.progress, 'completed': cp.completed} for cp in self.course_progress},
+            'joined_tracks': lambda: [track.id for track in self.joined_tracks],  # Only include track IDs
+            'created_date': lambda: self.created_date.isoformat(),
+            'updated_date': lambda: self.updated_date.isoformat()
         }
+        return {name: serializers[name]() for name in (fields or serializers) if name in serializers}
@@ -0,0 +1,26 @@
+# models/timeline_entry.py
+from .db import db, environment, SCHEMA, add_prefix_for_prod
+
+class TimelineEntry(db.Model):
+    __tablename__ = 'timeline_entries'
+
+    # Materialized home timeline: one row per (reader, post), written when a
+    # followed user posts, so reading a timeline is a single range scan
+    __table_args__ = (
+        db.Index('ix_timeline_entries_user_id_created_date', 'user_id', 'created_date', 'post_id'),
+    )
+    if environment == "production":
+        __table_args__ = __table_args__ + ({'schema': SCHEMA},)
+
+    user_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('users.id')), primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('community_posts.id')), primary_key=True, index=True)
+    author_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('users.id')), nullable=False)
+    created_date = db.Column(db.DateTime, nullable=False)
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'post_id': self.post_id,
+            'author_id': self.author_id,
+            'created_date': self.created_date.isoformat()
+        }
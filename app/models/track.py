@@ -20,8 +20,12 @@ class Track(db.Model):
     teacher = db.relationship('Teacher', backref=db.backref('tracks', lazy=True))
     courses = db.relationship('Course', secondary='track_courses', order_by='track_courses.c.order', backref=db.backref('tracks', lazy=True))
 
-    def to_dict(self):
-        return {
+    # Relationships that can be expanded in place with include: courses (their
+    # summary view), lessons (nested in each course) and teacher
+    INCLUDES = ('courses', 'lessons', 'teacher')
+
+    def to_dict(self, include=()):
+        track = {
             'id': self.id,
             'title': self.title,
             'description': self.description,
@@ -33,3 +37,15 @@ class Track(db.Model):
             'created_date': self.created_date.isoformat(),
             'updated_date': self.updated_date.isoformat()
         }
+        if 'courses' in include or 'lessons' in include:
+            track['courses'] = [self.course_dict(course, 'lessons' in include) for course in self.courses]
+        if 'teacher' in include:
+            track['teacher'] = self.teacher.to_dict()
+        return track
+
+    @staticmethod
+    def course_dict(course, with_lessons):
+        course_dict = course.to_dict(fields=course.SUMMARY_FIELDS)
+        if with_lessons:
+            course_dict['lessons'] = [lesson.to_dict() for lesson in course.lessons]
+        return course_dict
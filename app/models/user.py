@@ -21,6 +21,7 @@ class User(db.Model, UserMixin):
     _status = db.Column("status", db.String(50), default='inactive', nullable=False)
     stripe_customer_id = db.Column(db.String(120), unique=True)
     stripe_subscription_id = db.Column(db.String(120), unique=True)
+    follower_count = db.Column(db.Integer, nullable=False, default=0)
     created_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -56,13 +57,15 @@ class User(db.Model, UserMixin):
         if new_status != self._status:
             self._status = new_status
 
-    def to_dict(self):
+    # student_fields limits the student profiles that are nested in the user
+    def to_dict(self, student_fields=None):
         data = {
             'id': self.id,
             'username': self.username,
             'type': self.type,
             'banned': self.banned,
             'status': self.status,
+            'follower_count': self.follower_count,
             'created_date': self.created_date.isoformat(),
             'updated_date': self.updated_date.isoformat(),
             # 'followers_count': self.followers.count(),
@@ -70,14 +73,14 @@ class User(db.Model, UserMixin):
         }
 
         if self.type == 'student' and self.student:
-            data['profile'] = self.student.to_dict()
+            data['profile'] = self.student.to_dict(fields=student_fields)
         else:
             data['email'] = self.email
             data['stripe_customer_id'] = self.stripe_customer_id
             data['stripe_subscription_id'] = self.stripe_subscription_id
 
             if self.type == 'parent' and self.parent:
-                data['students'] = [student.to_dict() for student in self.parent.student]
+                data['students'] = [student.to_dict(fields=student_fields) for student in self.parent.student]
 
             if self.type == 'teacher' and self.teacher:
                 data['teacher'] = self.teacher.to_dict()
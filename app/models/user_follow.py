@@ -9,7 +9,7 @@ class UserFollow(db.Model):
         __table_args__ = {'schema': SCHEMA}
 
     follower_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('users.id')), primary_key=True, nullable=False)
-    followee_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('users.id')), primary_key=True, nullable=False)
+    followee_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('users.id')), primary_key=True, nullable=False, index=True)
     created_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
     follower = db.relationship('User', foreign_keys=[follower_id], backref=db.backref('following', lazy='dynamic'))
@@ -0,0 +1,147 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Response cache with generation-based invalidation. Entries live under a
+# namespace whose generation is part of every key, so invalidating a namespace
+# is one increment and every entry written under the old generation is simply
+# never read again (it ages out through the LRU or its TTL).
+
+CACHE_TTL = int(os.environ.get('CACHE_TTL', 300))
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 1024))
+REDIS_URL = os.environ.get('REDIS_URL')
+
+
+class MemoryBackend:
+    """In-process LRU with a TTL per entry. Each worker process has its own."""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        # Generations are kept apart from the entries so they are never evicted
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generation(self, namespace):
+        return self._generations.get(namespace, 0)
+
+    def bump(self, namespace):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+    def size(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Shared cache in redis, so invalidations reach every worker. Values are stored as JSON."""
+
+    def __init__(self, url, prefix='cache'):
+        import redis
+        self.redis = redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    # A redis outage degrades to cache misses rather than failed requests
+    def get(self, key):
+        try:
+            value = self.client.get(f'{self.prefix}:{key}')
+        except self.redis.RedisError:
+            return None
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl):
+        try:
+            self.client.set(f'{self.prefix}:{key}', json.dumps(value), ex=ttl)
+        except self.redis.RedisError:
+            pass
+
+    def generation(self, namespace):
+        try:
+            return int(self.client.get(f'{self.prefix}:generation:{namespace}') or 0)
+        except self.redis.RedisError:
+            return None
+
+    # Not swallowed: a failed invalidation must not go unnoticed
+    def bump(self, namespace):
+        self.client.incr(f'{self.prefix}:generation:{namespace}')
+
+    def size(self):
+        return None
+
+
+class ResponseCache:
+    """Caches JSON-ready values under invalidatable namespaces and counts hits and misses"""
+
+    def __init__(self, backend, ttl=CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    # Use redis when REDIS_URL is set, otherwise an in-process LRU
+    @classmethod
+    def from_env(cls, prefix):
+        if REDIS_URL:
+            return cls(RedisBackend(REDIS_URL, prefix=prefix))
+        return cls(MemoryBackend())
+
+    # Return the cached value for key in namespace, building and storing it on
+    # a miss. A build that returns None is not cached.
+    def get_or_set(self, namespace, key, build):
+        generation = self.backend.generation(namespace)
+        if generation is None:
+            # The backend is unreachable, so skip caching entirely
+            self.misses += 1
+            return build()
+
+        full_key = f'{namespace}:{generation}:{key}'
+        value = self.backend.get(full_key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = build()
+        if value is not None:
+            self.backend.set(full_key, value, self.ttl)
+        return value
+
+    # Drop every entry in the given namespaces. Call after the change is
+    # committed, so a concurrent miss can't cache the old data again.
+    def invalidate(self, *namespaces):
+        for namespace in namespaces:
+            self.backend.bump(namespace)
+
+    # Hit and miss counts are per process
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': 'redis' if isinstance(self.backend, RedisBackend) else 'memory',
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else None,
+            'entries': self.backend.size(),
+            'ttl': self.ttl
+        }
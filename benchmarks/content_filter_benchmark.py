@@ -0,0 +1,55 @@
+"""
+Per-call cost of the banned word check, compiled trie matcher vs. the old
+per-word regex loop, for short and long texts.
+
+Run from the repo root:
+    python benchmarks/content_filter_benchmark.py
+"""
+import importlib.util
+import os
+import re
+import timeit
+
+API_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app', 'api')
+
+
+# Load the modules straight from their files so the benchmark doesn't need
+# the Flask app (and its database/S3 configuration) to be importable
+def load_module(name):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(API_DIR, f'{name}.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+BANNED_WORDS = load_module('banned_words').BANNED_WORDS
+content_filter = load_module('content_filter')
+
+
+# The previous implementation, kept here for comparison
+def legacy_contains_inappropriate_content(text):
+    text = text.lower()
+    for word in BANNED_WORDS:
+        if re.search(rf"\b{word}\b", text):
+            return True
+    return False
+
+
+SHORT_TEXT = "Here is my watercolor of the lake at sunset, any tips on the reflections?"
+LONG_TEXT = " ".join([SHORT_TEXT] * 200)  # roughly 15 KB of clean text, the worst case
+
+
+def bench(label, func, text, number):
+    seconds = timeit.timeit(lambda: func(text), number=number)
+    print(f"{label:<28} {len(text):>7} chars  {seconds / number * 1e6:>12.1f} us/call")
+
+
+if __name__ == '__main__':
+    build_seconds = timeit.timeit(lambda: content_filter.BannedWordMatcher(BANNED_WORDS), number=5) / 5
+    print(f"{len(BANNED_WORDS)} banned words, matcher built in {build_seconds * 1e3:.1f} ms\n")
+
+    matcher = content_filter.BannedWordMatcher(BANNED_WORDS)
+    bench('trie matcher (short)', matcher.matches, SHORT_TEXT, 2000)
+    bench('trie matcher (long)', matcher.matches, LONG_TEXT, 50)
+    bench('legacy loop (short)', legacy_contains_inappropriate_content, SHORT_TEXT, 20)
+    bench('legacy loop (long)', legacy_contains_inappropriate_content, LONG_TEXT, 3)
@@ -0,0 +1,61 @@
+"""Community full-text search
+
+Revision ID: d72c4e1f8a93
+Revises: 9a6d2f58c1e0
+Create Date: 2026-10-18 13:41:02.118734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd72c4e1f8a93'
+down_revision = '9a6d2f58c1e0'
+branch_labels = None
+depends_on = None
+
+
+# The expressions must match search_helpers.search_matches for the indexes to be used
+SEARCH_INDEXES = {
+    'ix_community_posts_text_search': 'community_posts',
+    'ix_community_comments_text_search': 'community_comments',
+}
+
+
+def upgrade():
+    # GIN indexes only exist on postgres; sqlite mirrors posts and comments into
+    # an FTS5 table instead (must match search_helpers.SQLITE_SEARCH_DDL)
+    if op.get_bind().dialect.name != 'postgresql':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS community_search USING fts5("
+            "text, kind UNINDEXED, source_id UNINDEXED, post_id UNINDEXED, tokenize = 'porter unicode61')"
+        )
+        op.execute("DELETE FROM community_search")
+        op.execute(
+            "INSERT INTO community_search (text, kind, source_id, post_id) "
+            "SELECT text, 'posts', id, id FROM community_posts WHERE text IS NOT NULL"
+        )
+        op.execute(
+            "INSERT INTO community_search (text, kind, source_id, post_id) "
+            "SELECT text, 'comments', id, post_id FROM community_comments WHERE text IS NOT NULL"
+        )
+        return
+
+    for index_name, table_name in SEARCH_INDEXES.items():
+        op.create_index(
+            index_name,
+            table_name,
+            [sa.text("to_tsvector('english', coalesce(text, ''))")],
+            unique=False,
+            postgresql_using='gin'
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        op.execute("DROP TABLE IF EXISTS community_search")
+        return
+
+    for index_name, table_name in SEARCH_INDEXES.items():
+        op.drop_index(index_name, table_name=table_name)
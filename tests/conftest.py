@@ -0,0 +1,79 @@
+import os
+import tempfile
+
+# The app reads its configuration, binds its database and creates its S3
+# client at import time
+os.environ.setdefault('SECRET_KEY', 'test')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+os.environ.setdefault('S3_BUCKET', 'sparketh-test')
+os.environ.setdefault('S3_KEY', 'test')
+os.environ.setdefault('S3_SECRET', 'test')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+import boto3
+import pytest
+from moto import mock_aws
+
+# S3 calls made anywhere in the app go to moto for the whole test run
+s3_mock = mock_aws()
+s3_mock.start()
+
+from app import app as flask_app
+from app.models import db, User, Student, Teacher
+from app.api.aws_helpers import BUCKET_NAME
+
+
+# Tests query the database inside their own app context, never around a
+# request, so requests don't share g (and its cached user) with each other
+@pytest.fixture
+def app():
+    flask_app.config.update(TESTING=True)
+    with flask_app.app_context():
+        db.create_all()
+    yield flask_app
+    with flask_app.app_context():
+        db.drop_all()
+
+
+@pytest.fixture
+def s3():
+    client = boto3.client('s3', region_name='us-east-1')
+    client.create_bucket(Bucket=BUCKET_NAME)
+    yield client
+    for item in client.list_objects_v2(Bucket=BUCKET_NAME).get('Contents', []):
+        client.delete_object(Bucket=BUCKET_NAME, Key=item['Key'])
+    client.delete_bucket(Bucket=BUCKET_NAME)
+
+
+# Create a student or teacher, returning the user's id
+def make_user(app, username, type):
+    with app.app_context():
+        user = User(username=username, email=f'{username}@example.com', password='password', type=type)
+        db.session.add(user)
+        db.session.flush()
+        if type == 'student':
+            db.session.add(Student(user_id=user.id))
+        else:
+            db.session.add(Teacher(user_id=user.id, first_name='Test', last_name=username))
+        db.session.commit()
+        return user.id
+
+
+# A test client logged in as the user, holding a CSRF cookie for form routes
+def client_for(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    client.get('/api/auth')
+    return client
+
+
+@pytest.fixture
+def student(app):
+    return make_user(app, 'student', 'student')
+
+
+@pytest.fixture
+def teacher(app):
+    return make_user(app, 'teacher', 'teacher')
@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from app.api.search_helpers import reindex_search
+from app.models import db, CommunityPost
+from .conftest import client_for
+
+
+def search(client, terms):
+    response = client.get('/api/community/search', query_string={'q': terms})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_posted_text_stays_searchable(app, student):
+    client = client_for(app, student)
+    response = client.post('/api/community/posts', json={'post_type': 'text', 'text': 'Watercolor birds at dusk'})
+    assert response.status_code == 201
+
+    # Searching is read-only, so repeating it must not change the results
+    assert search(client, 'watercolor')['total'] == 1
+    assert search(client, 'watercolor')['total'] == 1
+
+
+def test_reindex_picks_up_rows_written_outside_the_app(app, student):
+    with app.app_context():
+        now = datetime.utcnow()
+        db.session.add(CommunityPost(user_id=student, post_type='text', text='Charcoal portraits', created_date=now, updated_date=now))
+        db.session.commit()
+
+    client = client_for(app, student)
+    assert search(client, 'charcoal')['total'] == 0
+
+    with app.app_context():
+        assert reindex_search() == 1
+        db.session.commit()
+
+    assert search(client, 'charcoal')['total'] == 1
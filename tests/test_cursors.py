@@ -0,0 +1,44 @@
+import pytest
+
+from app.api.community_helpers import encode_cursor
+from .conftest import client_for
+
+
+FEED_LISTING = ['created_date', 'desc', 'all_time', None, None]
+
+# Each cursor carries the right listing but is missing or mistypes a field
+@pytest.mark.parametrize('url, cursor', [
+    ('/api/community/timeline', {'listing': ['timeline']}),
+    ('/api/community/timeline', {'listing': ['timeline'], 'key': 'yesterday', 'id': 1}),
+    ('/api/community/timeline', {'listing': ['timeline'], 'key': 5, 'id': 1}),
+    ('/api/community/timeline', {'listing': ['timeline'], 'key': '2026-01-01T00:00:00', 'id': 'x'}),
+    ('/api/community/posts', {'listing': FEED_LISTING, 'id': 1}),
+    ('/api/community/posts', {'listing': FEED_LISTING, 'key': [], 'id': 1}),
+    ('/api/community/posts', {'listing': ['likes', 'desc', 'all_time', None, None], 'key': '3', 'id': 1}),
+    ('/api/community/posts', {'listing': ['likes', 'desc', 'last_week', None, None], 'key': 3, 'id': 1}),
+    ('/api/community/posts', {'listing': ['likes', 'desc', 'last_week', None, None], 'key': 3, 'id': True, 'window': None}),
+    ('/api/art/feedback_queue', {'listing': ['feedback_queue', None], 'created_date': 'soon', 'id': 1}),
+])
+def test_malformed_cursors_are_rejected(app, student, teacher, url, cursor):
+    listing = cursor['listing']
+    query = {'cursor': encode_cursor(cursor)}
+    if url == '/api/community/posts':
+        query.update(sort_by=listing[0], sort_order=listing[1], time_frame=listing[2])
+    client = client_for(app, teacher if 'feedback_queue' in url else student)
+
+    response = client.get(url, query_string=query)
+
+    assert response.status_code == 400
+    assert response.json == {'errors': 'Invalid cursor'}
+
+
+def test_timeline_cursor_pages_through_posts(app, student):
+    client = client_for(app, student)
+    for number in range(3):
+        assert client.post('/api/community/posts', json={'post_type': 'text', 'text': f'Post {number}'}).status_code == 201
+
+    first = client.get('/api/community/timeline', query_string={'per_page': 2}).json
+    second = client.get('/api/community/timeline', query_string={'per_page': 2, 'cursor': first['next_cursor']}).json
+
+    assert [post['text'] for post in first['posts'] + second['posts']] == ['Post 2', 'Post 1', 'Post 0']
+    assert second['next_cursor'] is None
@@ -0,0 +1,241 @@
+import base64
+import io
+import json
+
+import pytest
+import requests
+from PIL import Image
+
+from app.api import art_routes, track_routes
+from app.api.aws_helpers import BUCKET_NAME
+from app.models import db, Art, Track, Student, Teacher
+from .conftest import client_for, make_user
+
+
+def png_bytes(size=(64, 48)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 40, 40)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def post_upload(upload, data, content_type=None):
+    fields = dict(upload['fields'])
+    if content_type:
+        fields['Content-Type'] = content_type
+    response = requests.post(upload['url'], data=fields, files={'file': ('upload', data)})
+    assert response.status_code == 204
+
+
+@pytest.fixture
+def scheduled(monkeypatch):
+    # Variants are rendered in the background; only record that they were queued
+    calls = []
+    monkeypatch.setattr(art_routes, 'schedule_variants', lambda *args: calls.append(args))
+    return calls
+
+
+def art_count(app):
+    with app.app_context():
+        return Art.query.count()
+
+
+def start_art_upload(client, filename='drawing.png', size=1000):
+    return client.post('/api/art/uploads', json={'filename': filename, 'size': size})
+
+
+def confirm_art_upload(client, key):
+    return client.post('/api/art/uploads/confirm', json={'key': key, 'name': 'Sunset', 'type': 'gallery'})
+
+
+# ------- ART -------
+
+def test_presign_pins_key_type_and_size(app, s3, student):
+    client = client_for(app, student)
+
+    response = start_art_upload(client, size=1000)
+
+    assert response.status_code == 200
+    upload = response.json['upload']
+    assert upload['key'].startswith(f'uploads/art/{student}/')
+    assert upload['key'].endswith('.png')
+    assert upload['fields']['Content-Type'] == 'image/png'
+    policy = json.loads(base64.b64decode(upload['fields']['policy']))
+    assert ['content-length-range', 1, art_routes.MAX_FILE_SIZE] in policy['conditions']
+    assert {'Content-Type': 'image/png'} in policy['conditions']
+    assert {'key': upload['key']} in policy['conditions']
+
+
+@pytest.mark.parametrize('filename, size', [
+    ('notes.exe', 1000),
+    ('drawing.png', 0),
+    ('drawing.png', '1000'),
+    ('drawing.png', art_routes.MAX_FILE_SIZE + 1),
+])
+def test_presign_rejects_bad_files(app, s3, student, filename, size):
+    response = start_art_upload(client_for(app, student), filename, size)
+    assert response.status_code == 400
+
+
+def test_presign_is_for_students_only(app, s3, teacher):
+    assert start_art_upload(client_for(app, teacher)).status_code == 403
+
+
+def test_upload_and_confirm_creates_art(app, s3, student, scheduled):
+    client = client_for(app, student)
+    upload = start_art_upload(client).json['upload']
+    post_upload(upload, png_bytes())
+
+    response = confirm_art_upload(client, upload['key'])
+
+    assert response.status_code == 201
+    assert response.json['media_url'].endswith(upload['key'])
+    with app.app_context():
+        art = Art.query.one()
+        owner = Student.query.filter_by(user_id=student).one()
+        assert art.user_id == owner.id
+        assert owner.points == art_routes.ART_UPLOAD_POINTS
+        assert scheduled == [(art.id, art.media_url, None)]
+
+
+def test_confirm_before_upload(app, s3, student, scheduled):
+    client = client_for(app, student)
+    upload = start_art_upload(client).json['upload']
+
+    response = confirm_art_upload(client, upload['key'])
+
+    assert response.status_code == 400
+    assert art_count(app) == 0
+
+
+def test_confirm_rejects_oversize_object(app, s3, student, scheduled, monkeypatch):
+    client = client_for(app, student)
+    upload = start_art_upload(client).json['upload']
+    # moto doesn't enforce the policy, which stands in for a client that got around it
+    monkeypatch.setattr(art_routes, 'MAX_FILE_SIZE', 100)
+    post_upload(upload, png_bytes((400, 400)))
+
+    response = confirm_art_upload(client, upload['key'])
+
+    assert response.status_code == 400
+    assert art_count(app) == 0
+
+
+def test_confirm_rejects_wrong_content_type(app, s3, student, scheduled):
+    client = client_for(app, student)
+    upload = start_art_upload(client).json['upload']
+    post_upload(upload, b'#!/bin/sh', content_type='text/x-shellscript')
+
+    response = confirm_art_upload(client, upload['key'])
+
+    assert response.status_code == 400
+    assert art_count(app) == 0
+
+
+def test_confirm_rejects_another_users_key(app, s3, student, scheduled):
+    upload = start_art_upload(client_for(app, student)).json['upload']
+    post_upload(upload, png_bytes())
+    other = make_user(app, 'other', 'student')
+
+    response = confirm_art_upload(client_for(app, other), upload['key'])
+
+    assert response.status_code == 403
+    assert art_count(app) == 0
+
+
+def test_double_confirm_is_a_conflict(app, s3, student, scheduled):
+    client = client_for(app, student)
+    upload = start_art_upload(client).json['upload']
+    post_upload(upload, png_bytes())
+
+    assert confirm_art_upload(client, upload['key']).status_code == 201
+    response = confirm_art_upload(client, upload['key'])
+
+    assert response.status_code == 409
+    assert art_count(app) == 1
+    with app.app_context():
+        assert Student.query.filter_by(user_id=student).one().points == art_routes.ART_UPLOAD_POINTS
+
+
+# ------- TRACK FILES -------
+
+@pytest.fixture
+def track(app, teacher):
+    with app.app_context():
+        track = Track(title='Drawing basics', description='Start here', teacher_id=Teacher.query.filter_by(user_id=teacher).one().id)
+        db.session.add(track)
+        db.session.commit()
+        return track.id
+
+
+def test_track_file_flow(app, s3, teacher, track):
+    client = client_for(app, teacher)
+    files = [{'filename': 'worksheet.pdf', 'size': 10}, {'filename': 'slides.pptx', 'size': 20}]
+
+    response = client.post(f'/api/tracks/{track}/files/uploads', json={'files': files})
+
+    assert response.status_code == 200
+    uploads = response.json['uploads']
+    assert [upload['fields']['Content-Type'] for upload in uploads] == [
+        'application/pdf', 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
+    ]
+    for upload in uploads:
+        assert upload['key'].startswith(f'uploads/tracks/{teacher}/')
+        post_upload(upload, b'document')
+
+    keys = [upload['key'] for upload in uploads]
+    response = client.post(f'/api/tracks/{track}/files/confirm', json={'keys': keys + keys[:1]})
+
+    assert response.status_code == 200
+    urls = response.json['downloadable_files']
+    assert [url.rsplit('/', 1)[1] for url in urls] == [key.rsplit('/', 1)[1] for key in keys]
+
+    # Confirming again doesn't list a file twice
+    response = client.post(f'/api/tracks/{track}/files/confirm', json={'keys': keys[:1]})
+    assert response.json['downloadable_files'] == urls
+    with app.app_context():
+        assert db.session.get(Track, track).downloadable_files == urls
+
+
+def test_interleaved_track_confirms_keep_both_files(app, s3, teacher, track, monkeypatch):
+    client = client_for(app, teacher)
+    upload = client.post(f'/api/tracks/{track}/files/uploads', json={'files': [{'filename': 'worksheet.pdf', 'size': 10}]}).json['uploads'][0]
+    post_upload(upload, b'document')
+    other_url = 'https://example.com/slides.pdf'
+
+    # Another confirmation commits on its own connection while this one is
+    # checking its upload, after this one has already loaded the track
+    check_upload = track_routes.get_uploaded_object
+    def check_during_other_confirm(key):
+        with db.engine.begin() as connection:
+            connection.execute(Track.__table__.update().where(Track.id == track).values(downloadable_files=[other_url]))
+        return check_upload(key)
+    monkeypatch.setattr(track_routes, 'get_uploaded_object', check_during_other_confirm)
+
+    response = client.post(f'/api/tracks/{track}/files/confirm', json={'keys': [upload['key']]})
+
+    assert response.status_code == 200
+    urls = response.json['downloadable_files']
+    assert urls[0] == other_url
+    assert [url.rsplit('/', 1)[1] for url in urls[1:]] == [upload['key'].rsplit('/', 1)[1]]
+
+
+def test_track_files_reject_bad_requests(app, s3, teacher, track):
+    client = client_for(app, teacher)
+
+    response = client.post(f'/api/tracks/{track}/files/uploads', json={'files': [{'filename': 'virus.exe', 'size': 10}]})
+    assert response.status_code == 400
+
+    response = client.post(f'/api/tracks/{track}/files/confirm', json={'keys': [f'uploads/tracks/{teacher}/missing.pdf']})
+    assert response.status_code == 400
+
+    response = client.post(f'/api/tracks/{track}/files/confirm', json={'keys': ['uploads/tracks/999/notes.pdf']})
+    assert response.status_code == 403
+
+
+def test_track_files_for_the_tracks_teacher_only(app, s3, track):
+    other = make_user(app, 'other', 'teacher')
+    client = client_for(app, other)
+
+    response = client.post(f'/api/tracks/{track}/files/uploads', json={'files': [{'filename': 'a.pdf', 'size': 10}]})
+
+    assert response.status_code == 403
@@ -0,0 +1,30 @@
+import pytest
+
+from app.models import db, Track, Teacher
+from .conftest import client_for
+
+
+@pytest.fixture
+def track(app, teacher):
+    with app.app_context():
+        track = Track(title='Drawing basics', description='Start here', teacher_id=Teacher.query.filter_by(user_id=teacher).one().id)
+        db.session.add(track)
+        db.session.commit()
+        return track.id
+
+
+# JSON true is an int in python, but must not be taken for course 1
+@pytest.mark.parametrize('courses', [[True], [False], ['1'], [1.0]])
+def test_track_courses_must_be_ids(app, teacher, track, courses):
+    response = client_for(app, teacher).put(f'/api/tracks/{track}/courses', json={'courses': courses})
+
+    assert response.status_code == 400
+    assert response.json == {'errors': 'courses must be a list of course ids'}
+
+
+@pytest.mark.parametrize('course_id', [True, '1'])
+def test_feedback_claims_need_a_course_id(app, teacher, course_id):
+    response = client_for(app, teacher).post('/api/art/feedback_queue/claim', json={'course_id': course_id})
+
+    assert response.status_code == 400
+    assert response.json == {'errors': 'course_id must be a course id'}
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.api.leaderboard_helpers import refresh_leaderboards
+from app.models import db, Course, LeaderboardCheckpoint, LeaderboardRank, PointsEvent, Student, Teacher
+
+
+@pytest.fixture
+def courses(app, teacher):
+    with app.app_context():
+        instructor_id = Teacher.query.filter_by(user_id=teacher).one().id
+        courses = [
+            Course(title=title, description=title, skill_level='beginner', type='drawing',
+                   instructor_id=instructor_id, length=timedelta(hours=1), intro_video='intro')
+            for title in ('Drawing', 'Painting')
+        ]
+        db.session.add_all(courses)
+        db.session.commit()
+        return [course.id for course in courses]
+
+
+def award(student_id, course_id, event_id, age):
+    db.session.add(PointsEvent(
+        id=event_id, student_id=student_id, reason='lesson_completed', source_id=event_id,
+        course_id=course_id, points=10, created_date=datetime.utcnow() - age
+    ))
+    db.session.commit()
+
+
+def checkpoint():
+    return LeaderboardCheckpoint.query.get('points_events').last_event_id
+
+
+def test_refresh_sees_awards_that_commit_out_of_order(app, student, courses):
+    drawing, painting = courses
+    with app.app_context():
+        student_id = Student.query.filter_by(user_id=student).one().id
+
+        award(student_id, drawing, 1, timedelta(hours=1))
+        award(student_id, drawing, 3, timedelta(seconds=1))
+        refresh_leaderboards()
+        # Event 3 is too recent to be sure event 2 won't still commit
+        assert checkpoint() == 1
+
+        # Event 2's transaction commits after the refresh already saw event 3
+        award(student_id, painting, 2, timedelta(seconds=2))
+        refresh_leaderboards()
+
+        assert LeaderboardRank.query.get(('course', painting, student_id)).points == 10
+        assert LeaderboardRank.query.get(('course', drawing, student_id)).points == 20
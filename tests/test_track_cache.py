@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+import pytest
+
+from app.api.track_helpers import track_cache
+from app.models import db, Course, Lesson, Teacher
+from .conftest import client_for
+
+
+@pytest.fixture
+def course(app, teacher):
+    with app.app_context():
+        course = Course(
+            title='Drawing', description='Lines and shapes', skill_level='beginner', type='drawing',
+            instructor_id=Teacher.query.filter_by(user_id=teacher).one().id, length=timedelta(hours=1), intro_video='intro'
+        )
+        course.lessons.append(Lesson(title='Lines', url='lines', position=0))
+        db.session.add(course)
+        db.session.commit()
+        return course.id
+
+
+def tracks_generation():
+    return track_cache.backend.generation('tracks')
+
+
+def test_lesson_toggles_keep_cached_tracks(app, student, course):
+    client = client_for(app, student)
+    assert client.post(f'/api/courses/join/{course}').status_code == 200
+    generation = tracks_generation()
+
+    # Nothing an expanded track embeds changes when a student completes a lesson
+    assert client.post(f'/api/courses/{course}/toggle_lesson/1').status_code == 200
+
+    assert tracks_generation() == generation
+
+
+def test_enrollment_and_lesson_edits_invalidate_tracks(app, student, teacher, course):
+    generation = tracks_generation()
+    assert client_for(app, student).post(f'/api/courses/join/{course}').status_code == 200
+    assert tracks_generation() > generation
+
+    generation = tracks_generation()
+    response = client_for(app, teacher).post(f'/api/courses/{course}/lessons/bulk', json={'lessons': [{'id': 1, 'title': 'Straight lines'}]})
+    assert response.status_code == 200
+    assert tracks_generation() > generation